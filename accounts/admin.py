@@ -1,15 +1,21 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import User
+from django.core.exceptions import ObjectDoesNotExist
+from portfolio_builder.admin_utils import LargeTableAdminMixin
+from . import moderation
+from .models import User, UserDeletionJob
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(LargeTableAdminMixin, BaseUserAdmin):
     list_display = ['email', 'username', 'full_name', 'is_admin', 'is_staff', 'is_active', 'avatar_preview', 'portfolio_link', 'created_at']
     list_filter = ['is_admin', 'is_staff', 'is_active', 'is_superuser', 'created_at']
     search_fields = ['email', 'username', 'first_name', 'last_name', 'phone']
+    # Портфолио - тем же запросом (ссылка в каждой строке)
+    list_select_related = ['portfolio']
+    actions = ['block_selected', 'unblock_selected', 'delete_selected_in_background']
     readonly_fields = ['created_at', 'avatar_preview', 'portfolio_link']
     
     fieldsets = BaseUserAdmin.fieldsets + (
@@ -38,7 +44,7 @@ class UserAdmin(BaseUserAdmin):
     
     def avatar_preview(self, obj):
         if obj.avatar:
-            return format_html('<img src="{}" style="max-width: 50px; max-height: 50px; border-radius: 50%;" />', obj.avatar.url)
+            return format_html('<img src="{}" loading="lazy" style="max-width: 50px; max-height: 50px; border-radius: 50%;" />', obj.avatar.url)
         return "Нет аватара"
     avatar_preview.short_description = 'Аватар'
     
@@ -47,7 +53,53 @@ class UserAdmin(BaseUserAdmin):
             portfolio = obj.portfolio
             url = reverse('admin:portfolio_portfolio_change', args=[portfolio.id])
             return format_html('<a href="{}">Портфолио</a>', url)
-        except:
+        except ObjectDoesNotExist:
             return format_html('<span style="color: #999;">Нет портфолио</span>')
     portfolio_link.short_description = 'Портфолио'
+    
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Стандартное удаление каскадом в запросе заменено на фоновое
+        actions.pop('delete_selected', None)
+        return actions
+    
+    def _moderated(self, request, queryset):
+        # Себя и суперпользователей массовые действия не затрагивают (как в API)
+        return queryset.filter(is_superuser=False, deleted_at__isnull=True).exclude(pk=request.user.pk)
+    
+    @admin.action(description='Заблокировать выбранных пользователей', permissions=['change'])
+    def block_selected(self, request, queryset):
+        count = moderation.block_users(self._moderated(request, queryset))
+        self.message_user(request, f'Заблокировано пользователей: {count}', messages.SUCCESS)
+    
+    @admin.action(description='Разблокировать выбранных пользователей', permissions=['change'])
+    def unblock_selected(self, request, queryset):
+        count = moderation.unblock_users(self._moderated(request, queryset))
+        self.message_user(request, f'Разблокировано пользователей: {count}', messages.SUCCESS)
+    
+    @admin.action(description='Удалить выбранных пользователей (в фоне)', permissions=['delete'])
+    def delete_selected_in_background(self, request, queryset):
+        job = moderation.delete_users(self._moderated(request, queryset), actor=request.user)
+        if job is None:
+            self.message_user(request, 'Нет пользователей для удаления', messages.WARNING)
+            return
+        self.message_user(request, f'Пользователей помечено удаленными: {job.total}. '
+                                   f'Данные удаляются в фоне (задание #{job.pk})', messages.SUCCESS)
 
+
+@admin.register(UserDeletionJob)
+class UserDeletionJobAdmin(admin.ModelAdmin):
+    """Задания массового удаления пользователей (прогресс фоновой очистки)"""
+    list_display = ['id', 'total', 'progress', 'created_by', 'created_at']
+    list_select_related = ['created_by']
+    
+    def progress(self, obj):
+        progress = moderation.job_progress(obj)
+        return 'Готово' if progress['done'] else f"{progress['deleted']} из {progress['total']}"
+    progress.short_description = 'Прогресс'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -5,3 +5,10 @@ class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
 
+    def ready(self):
+        from django.core.signals import request_finished
+        from .sessions import check_session_cache, schedule_sweep
+
+        check_session_cache()
+        # Периодическая очистка истекших сессий (accounts.sessions)
+        request_finished.connect(schedule_sweep, dispatch_uid='accounts.sessions.schedule_sweep')
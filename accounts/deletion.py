@@ -0,0 +1,110 @@
+"""
+Удаление пользователей в два этапа.
+
+1. soft_delete_users - мгновенно: пользователь помечается deleted_at и
+   блокируется, запрос администратора сразу возвращается.
+2. purge_deleted_users - в фоне: работы, портфолио и сами пользователи
+   удаляются пачками в отдельных транзакциях, чтобы не держать блокировки.
+   Файлы освобождаются через счетчики ссылок (portfolio.media) и удаляются
+   командой gc_media.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from admin_panel import rollups
+from portfolio.models import Portfolio, PortfolioItem
+
+from .tokens import revoke_user_tokens
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def mark_users_deleted(queryset):
+    """
+    Помечает пользователей выборки удаленными одним UPDATE, отзывает их
+    refresh-токены и планирует очистку. Возвращает (число, deleted_at).
+    """
+    marked_at = timezone.now()
+    with transaction.atomic():
+        # Токены - до UPDATE: после него условие выборки может уже не совпасть
+        revoke_user_tokens(queryset.filter(deleted_at__isnull=True).values('pk'))
+        count = queryset.filter(deleted_at__isnull=True).update(is_active=False, deleted_at=marked_at)
+        if count:
+            rollups.users_soft_deleted(count)
+            transaction.on_commit(schedule_purge)
+    return count, marked_at
+
+
+def soft_delete_users(user_ids):
+    """Помечает пользователей удаленными одним UPDATE и планирует очистку. Возвращает число"""
+    return mark_users_deleted(User.objects.filter(pk__in=user_ids))[0]
+
+
+def _purge_items(user_ids, batch_size):
+    deleted = 0
+    while True:
+        batch = list(PortfolioItem.objects
+                     .filter(portfolio__user_id__in=user_ids)
+                     .values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        with transaction.atomic():
+            PortfolioItem.objects.filter(pk__in=batch).delete()
+        deleted += len(batch)
+
+
+def purge_deleted_users(batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Окончательно удаляет помеченных пользователей и их данные пачками.
+    progress(stats) вызывается после каждой пачки пользователей.
+    """
+    stats = {'users': 0, 'portfolios': 0, 'items': 0}
+    user_batch_size = max(batch_size // 10, 1)
+    while True:
+        user_ids = list(User.objects
+                        .filter(deleted_at__isnull=False)
+                        .order_by('deleted_at')
+                        .values_list('pk', flat=True)[:user_batch_size])
+        if not user_ids:
+            return stats
+
+        stats['items'] += _purge_items(user_ids, batch_size)
+        with transaction.atomic():
+            stats['portfolios'] += Portfolio.objects.filter(user_id__in=user_ids).delete()[1].get(
+                Portfolio._meta.label, 0)
+            # Пользователя могли восстановить, пока шла очистка
+            stats['users'] += User.objects.filter(pk__in=user_ids, deleted_at__isnull=False).delete()[1].get(
+                User._meta.label, 0)
+        if progress:
+            progress(stats)
+
+
+_purge_lock = threading.Lock()
+
+
+def _purge_in_thread():
+    try:
+        purge_deleted_users(getattr(settings, 'USER_PURGE_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+    except Exception:
+        logger.exception('Ошибка фоновой очистки удаленных пользователей')
+    finally:
+        close_old_connections()
+        _purge_lock.release()
+
+
+def schedule_purge():
+    """Запускает очистку в фоновом потоке (не больше одного потока на процесс)"""
+    if not getattr(settings, 'USER_PURGE_IN_BACKGROUND', True):
+        return
+    if not _purge_lock.acquire(blocking=False):
+        return
+    threading.Thread(target=_purge_in_thread, name='purge-deleted-users', daemon=True).start()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from accounts.deletion import DEFAULT_BATCH_SIZE, purge_deleted_users
+
+
+class Command(BaseCommand):
+    help = 'Окончательно удаляет помеченных удаленными пользователей и их данные'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Сколько работ удалять одним DELETE')
+
+    def handle(self, *args, **options):
+        def progress(stats):
+            self.stdout.write(
+                f"Пользователей: {stats['users']}, портфолио: {stats['portfolios']}, работ: {stats['items']}"
+            )
+
+        stats = purge_deleted_users(options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово. Удалено пользователей: {stats['users']}, работ: {stats['items']}"
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from accounts.tokens import DEFAULT_BATCH_SIZE, purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Удаляет истекшие refresh-токены и их записи в черном списке пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Сколько токенов удалять одним DELETE')
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_tokens(
+            options['batch_size'],
+            progress=lambda count: self.stdout.write(f'Удалено: {count}'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Готово. Удалено токенов: {deleted}'))
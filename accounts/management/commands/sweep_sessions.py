@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from accounts.sessions import DEFAULT_BATCH_SIZE, clear_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Удаляет истекшие сессии пачками (замена clearsessions для больших таблиц)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Сколько сессий удалять одним DELETE')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Пауза между пачками, секунд')
+
+    def handle(self, *args, **options):
+        deleted = clear_expired_sessions(
+            options['batch_size'], pause=options['pause'],
+            progress=lambda count: self.stdout.write(f'Удалено: {count}'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Готово. Удалено сессий: {deleted}'))
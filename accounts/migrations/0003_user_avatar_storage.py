@@ -0,0 +1,18 @@
+# Generated manually
+from django.db import migrations, models
+import portfolio_builder.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_profile_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=portfolio_builder.storage.media_storage, upload_to='user_avatars/'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated manually
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Индекс по сроку действия токенов simplejwt: purge_expired_tokens
+    выбирает истекшие токены пачками, не просматривая всю таблицу.
+
+    Миграция намеренно меняет таблицу чужого приложения (token_blacklist):
+    в модели OutstandingToken индекса по expires_at нет, а свои миграции
+    в стороннем пакете не добавить. Поэтому индекс создается здесь сырым SQL
+    под собственным именем и не попадает в состояние моделей token_blacklist
+    (makemigrations его не видит и не удаляет).
+
+    Что нужно помнить:
+    - IF NOT EXISTS/IF EXISTS: повторный запуск и откат безопасны;
+    - 'migrate token_blacklist zero' удаляет таблицу вместе с индексом -
+      после повторного создания таблицы выполните SQL из
+      'sqlmigrate accounts 0005' вручную (dbshell);
+    - если simplejwt добавит свой индекс по expires_at, этот можно удалить
+      новой миграцией accounts.
+    """
+
+    dependencies = [
+        ('accounts', '0004_user_deleted_at'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS token_blacklist_outstandingtoken_expires_at_idx '
+            'ON token_blacklist_outstandingtoken (expires_at)',
+            'DROP INDEX IF EXISTS token_blacklist_outstandingtoken_expires_at_idx',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated manually
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Индекс по времени отзыва в черном списке simplejwt: фильтр Блума
+    (accounts.tokens.BlacklistIndex) раз в SYNC_INTERVAL секунд догружает
+    записи за последние SYNC_OVERLAP секунд, не просматривая всю таблицу.
+
+    Как и accounts.0005, индекс создается в таблице чужого приложения
+    (token_blacklist) сырым SQL под собственным именем и не попадает в
+    состояние моделей. После 'migrate token_blacklist zero' выполните SQL из
+    'sqlmigrate accounts 0007' вручную (dbshell).
+    """
+
+    dependencies = [
+        ('accounts', '0006_userdeletionjob'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS token_blacklist_blacklistedtoken_blacklisted_at_idx '
+            'ON token_blacklist_blacklistedtoken (blacklisted_at)',
+            'DROP INDEX IF EXISTS token_blacklist_blacklistedtoken_blacklisted_at_idx',
+        ),
+    ]
@@ -1,16 +1,19 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from portfolio_builder.storage import media_storage
 
 
 class User(AbstractUser):
     """Расширенная модель пользователя"""
     email = models.EmailField(unique=True)
     is_admin = models.BooleanField(default=False)
-    avatar = models.ImageField(upload_to='user_avatars/', blank=True, null=True)
+    avatar = models.ImageField(upload_to='user_avatars/', storage=media_storage, blank=True, null=True)
     bio = models.TextField(blank=True, max_length=500, help_text="Краткая информация о себе")
     phone = models.CharField(max_length=20, blank=True)
     website = models.URLField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Мягкое удаление: данные удаляются в фоне (accounts.deletion)
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
@@ -18,3 +21,16 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
+
+class UserDeletionJob(models.Model):
+    """
+    Массовое удаление пользователей (accounts.moderation): все пользователи
+    задания помечены одним значением deleted_at, по нему считается прогресс
+    """
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    marked_at = models.DateTimeField()
+    total = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Удаление {self.total} пользователей ({self.created_at:%d.%m.%Y %H:%M})"
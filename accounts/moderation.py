@@ -0,0 +1,130 @@
+"""
+Массовая модерация пользователей: блокировка, разблокировка и удаление по
+списку id или по фильтрам (API админ-панели и действия админки).
+
+Блокировка и разблокировка - один UPDATE по выборке. При блокировке
+refresh-токены пользователей отзываются пачкой (accounts.tokens), access-
+токены и сессии перестают действовать сразу: simplejwt и ModelBackend
+проверяют is_active при каждом запросе. Удаление - мягкое (accounts.deletion):
+пометка одним UPDATE, данные удаляются пачками в фоне; прогресс задания
+(UserDeletionJob) - число его пользователей, которые еще не удалены.
+
+Администратор не может изменить сам себя; суперпользователи в массовые
+операции не попадают.
+"""
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .deletion import mark_users_deleted
+from .models import UserDeletionJob
+from .tokens import revoke_user_tokens
+
+User = get_user_model()
+
+MAX_IDS = 10000
+
+
+def _parse_moment(value):
+    moment = parse_datetime(str(value))
+    if moment is None:
+        day = parse_date(str(value))
+        if day is None:
+            raise ValueError(f'Неверная дата: {value}')
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ('1', 'true', 'yes'):
+        return True
+    if str(value).lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'Неверное логическое значение: {value}')
+
+
+FILTERS = {
+    'email_domain': lambda value: Q(email__iendswith='@' + str(value).lstrip('@')),
+    'search': lambda value: Q(email__icontains=value) | Q(username__icontains=value),
+    'created_after': lambda value: Q(created_at__gte=_parse_moment(value)),
+    'created_before': lambda value: Q(created_at__lt=_parse_moment(value)),
+    'is_active': lambda value: Q(is_active=_parse_bool(value)),
+    'never_logged_in': lambda value: Q(last_login__isnull=True) if _parse_bool(value) else Q(),
+}
+
+
+def select_users(ids=None, filters=None, actor=None):
+    """
+    QuerySet пользователей по списку id или по фильтрам (FILTERS).
+    ValueError с сообщением для пользователя, если условия неверны.
+    """
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise ValueError('ids должен быть непустым списком')
+        if len(ids) > MAX_IDS:
+            raise ValueError(f'Не больше {MAX_IDS} id за запрос')
+        try:
+            condition = Q(pk__in={int(pk) for pk in ids})
+        except (TypeError, ValueError):
+            raise ValueError('ids должен содержать числа')
+    elif filters:
+        if not isinstance(filters, dict):
+            raise ValueError('filter должен быть объектом')
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f'Неизвестные фильтры: {", ".join(sorted(unknown))}')
+        condition = Q()
+        for name, value in filters.items():
+            condition &= FILTERS[name](value)
+    else:
+        # Пустой фильтр выбрал бы всех пользователей
+        raise ValueError('Укажите ids или filter')
+
+    queryset = User.objects.filter(condition, deleted_at__isnull=True, is_superuser=False)
+    if actor is not None:
+        queryset = queryset.exclude(pk=actor.pk)
+    return queryset
+
+
+def block_users(queryset):
+    """Блокирует пользователей одним UPDATE и отзывает их токены; возвращает число"""
+    queryset = queryset.filter(is_active=True)
+    with transaction.atomic():
+        # Токены - до UPDATE: после него выборка (is_active=True) уже пуста
+        revoke_user_tokens(queryset.values('pk'))
+        return queryset.update(is_active=False)
+
+
+def unblock_users(queryset):
+    """Разблокирует пользователей одним UPDATE; возвращает число"""
+    return queryset.filter(is_active=False, deleted_at__isnull=True).update(is_active=True)
+
+
+def delete_users(queryset, actor=None):
+    """Помечает пользователей удаленными и создает задание очистки (или None, если некого удалять)"""
+    with transaction.atomic():
+        count, marked_at = mark_users_deleted(queryset)
+        if not count:
+            return None
+        return UserDeletionJob.objects.create(created_by=actor, marked_at=marked_at, total=count)
+
+
+def job_progress(job):
+    """Прогресс задания удаления: сколько пользователей уже удалено"""
+    remaining = User.objects.filter(deleted_at=job.marked_at).count()
+    return {
+        'id': job.pk,
+        'total': job.total,
+        'deleted': max(job.total - remaining, 0),
+        'remaining': remaining,
+        'done': remaining == 0,
+        'created_at': job.created_at.isoformat(),
+    }
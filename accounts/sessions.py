@@ -0,0 +1,149 @@
+"""
+Сессии: хранилище с кешем и очистка истекших записей.
+
+SESSION_TIER в настройках выбирает SESSION_ENGINE:
+- 'cached_db' (по умолчанию, если задан SESSION_CACHE_URL) -
+  accounts.sessions.SessionStore: чтение из кеша SESSION_CACHE_ALIAS,
+  запись в кеш и БД;
+- 'signed_cookies' (по умолчанию без общего кеша) - данные сессии в
+  подписанной cookie, таблица не нужна;
+- 'db' - стандартные сессии в БД (запрос к таблице на каждый запрос).
+
+Для cached_db нужен общий для всех процессов кеш (Redis, Memcached): в
+локальном кеше (LocMemCache) у каждого процесса своя копия, и после выхода
+в одном процессе сессия осталась бы действительной в другом. С локальным
+кешем приложение не запускается (check_session_cache). Запись в кеше живет
+не дольше SESSION_CACHE_MAX_AGE секунд (None - без ограничения).
+
+Django не удаляет истекшие сессии сам, а clearsessions удаляет их одним
+DELETE по всей таблице. clear_expired_sessions удаляет пачками по
+первичному ключу в отдельных транзакциях; в фоне очистка запускается не
+чаще раза в SESSION_SWEEP_INTERVAL секунд (после очередного запроса) или
+командой sweep_sessions.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.models import Session
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CACHE_MAX_AGE = 5 * 60
+DEFAULT_SWEEP_INTERVAL = 60 * 60
+
+# Кеши, которые не видны другим процессам
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+class _CappedCache:
+    """Кеш, в котором срок жизни записи не больше max_age"""
+
+    def __init__(self, cache, max_age):
+        self._cache = cache
+        self._max_age = max_age
+
+    def set(self, key, value, timeout=None):
+        self._cache.set(key, value, self._cap(timeout))
+
+    async def aset(self, key, value, timeout=None):
+        await self._cache.aset(key, value, self._cap(timeout))
+
+    def _cap(self, timeout):
+        if timeout is None:
+            return self._max_age
+        return min(timeout, self._max_age)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+
+class SessionStore(CachedDBStore):
+    """cached_db с ограниченным сроком жизни записи в кеше"""
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        max_age = getattr(settings, 'SESSION_CACHE_MAX_AGE', DEFAULT_CACHE_MAX_AGE)
+        if max_age is not None:
+            self._cache = _CappedCache(self._cache, max_age)
+
+
+def check_session_cache():
+    """ImproperlyConfigured, если сессии cached_db хранятся в локальном кеше процесса"""
+    if settings.SESSION_ENGINE != __name__:
+        return
+    alias = settings.SESSION_CACHE_ALIAS
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in LOCAL_CACHE_BACKENDS:
+        raise ImproperlyConfigured(
+            f'SESSION_TIER=cached_db требует общий кеш (Redis, Memcached): '
+            f'кеш {alias!r} ({backend}) у каждого процесса свой, выход не виден другим процессам'
+        )
+
+
+def _uses_database():
+    return settings.SESSION_ENGINE != 'django.contrib.sessions.backends.signed_cookies'
+
+
+def clear_expired_sessions(batch_size=DEFAULT_BATCH_SIZE, pause=0, progress=None):
+    """
+    Удаляет истекшие сессии пачками (по индексу expire_date), каждая пачка -
+    в своей транзакции. Возвращает число удаленных.
+    """
+    deleted = 0
+    now = timezone.now()
+    while True:
+        keys = list(Session.objects
+                    .filter(expire_date__lt=now)
+                    .values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            return deleted
+        with transaction.atomic():
+            deleted += Session.objects.filter(session_key__in=keys, expire_date__lt=now).delete()[0]
+        if progress:
+            progress(deleted)
+        if pause:
+            # Даем дорогу рабочим запросам между пачками
+            time.sleep(pause)
+
+
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+
+def _sweep_in_thread():
+    try:
+        clear_expired_sessions(getattr(settings, 'SESSION_SWEEP_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+                               pause=getattr(settings, 'SESSION_SWEEP_PAUSE', 0.05))
+    except Exception:
+        logger.exception('Ошибка фоновой очистки сессий')
+    finally:
+        close_old_connections()
+        _sweep_lock.release()
+
+
+def schedule_sweep(**kwargs):
+    """
+    Обработчик request_finished: запускает очистку в фоновом потоке, если
+    с прошлого запуска прошло SESSION_SWEEP_INTERVAL секунд.
+    """
+    global _last_sweep
+    interval = getattr(settings, 'SESSION_SWEEP_INTERVAL', DEFAULT_SWEEP_INTERVAL)
+    if not interval or time.monotonic() - _last_sweep < interval or not _uses_database():
+        return
+    if not _sweep_lock.acquire(blocking=False):
+        return
+    _last_sweep = time.monotonic()
+    threading.Thread(target=_sweep_in_thread, name='sweep-sessions', daemon=True).start()
@@ -0,0 +1,206 @@
+"""
+Refresh-токены JWT с черным списком (rest_framework_simplejwt.token_blacklist).
+
+При каждом обновлении токена (ROTATE_REFRESH_TOKENS) старый токен попадает в
+черный список, а при проверке токена simplejwt ищет его в БД. Чтобы проверка
+не зависела от размера таблицы, перед БД стоит фильтр Блума в памяти процесса:
+если jti в фильтре нет, токен точно не в черном списке и запроса нет;
+совпадение (в том числе ложное) проверяется по БД.
+
+Токены заблокированных и удаленных пользователей отзываются пачкой
+(revoke_user_tokens). Фильтр заполняется при первом обращении и не чаще раза
+в SYNC_INTERVAL секунд догружает записи по времени отзыва (blacklisted_at) с
+перекрытием SYNC_OVERLAP секунд: запись становится видна только после коммита
+своей транзакции, а время в ней - момент вставки, поэтому водяной знак по
+первичному ключу или времени без перекрытия пропустил бы записи долгих
+транзакций. Раз в REBUILD_INTERVAL секунд фильтр пересобирается целиком - это
+ловит и транзакции дольше перекрытия. Токены, отозванные в этом процессе,
+добавляются сразу. Истекшие токены удаляются пачками
+(purge_expired_tokens, команда purge_expired_tokens): после истечения
+срока токен отклоняется и без черного списка.
+
+Настройки: settings.JWT_BLACKLIST (см. DEFAULTS).
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+DEFAULTS = {
+    'CAPACITY': 100000,     # ожидаемое число записей; при превышении фильтр пересобирается вдвое больше
+    'ERROR_RATE': 0.001,    # доля ложных совпадений (они проверяются по БД)
+    'SYNC_INTERVAL': 1,     # секунд между догрузками записей, отозванных другими процессами
+    'SYNC_OVERLAP': 60,     # секунд: догрузка повторно просматривает записи за этот срок до прошлой
+    'REBUILD_INTERVAL': 600,  # секунд между полными пересборками фильтра
+}
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'JWT_BLACKLIST', {})}
+
+
+class BloomFilter:
+    """Фильтр Блума на bytearray (двойное хеширование blake2b)"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class BlacklistIndex:
+    """Фильтр Блума по jti отозванных токенов, синхронизируемый с БД"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._since = None  # время начала прошлой загрузки
+        self._rebuilt_at = 0.0
+        self._synced_at = 0.0
+
+    def _rebuild(self, config, capacity=None):
+        self._since = timezone.now()
+        self._rebuilt_at = time.monotonic()
+        # Истекшие токены в фильтр не нужны: simplejwt отклонит их по exp
+        active = (BlacklistedToken.objects
+                  .filter(token__expires_at__gt=self._since)
+                  .values_list('token__jti', flat=True))
+        bloom = BloomFilter(max(capacity or config['CAPACITY'], active.count() * 2), config['ERROR_RATE'])
+        for jti in active.iterator(chunk_size=DEFAULT_BATCH_SIZE):
+            bloom.add(jti)
+        self._bloom = bloom
+
+    def _sync(self):
+        config = get_config()
+        if self._bloom is not None and time.monotonic() - self._synced_at < config['SYNC_INTERVAL']:
+            return
+        with self._lock:
+            if self._bloom is None:
+                self._rebuild(config)
+            elif time.monotonic() - self._rebuilt_at >= config['REBUILD_INTERVAL']:
+                self._rebuild(config, self._bloom.capacity)
+            else:
+                started = timezone.now()
+                rows = (BlacklistedToken.objects
+                        .filter(blacklisted_at__gte=self._since - timedelta(seconds=config['SYNC_OVERLAP']))
+                        .values_list('token__jti', flat=True))
+                for jti in rows.iterator(chunk_size=DEFAULT_BATCH_SIZE):
+                    # Перекрытие возвращает уже добавленные записи - не считаем их повторно
+                    if jti not in self._bloom:
+                        self._bloom.add(jti)
+                self._since = started
+                if self._bloom.count > self._bloom.capacity:
+                    self._rebuild(config, self._bloom.capacity * 2)
+            self._synced_at = time.monotonic()
+
+    def might_contain(self, jti):
+        """False - токен точно не отозван; True - нужно проверить по БД"""
+        self._sync()
+        bloom = self._bloom
+        return bloom is None or jti in bloom
+
+    def add(self, jti):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+
+
+blacklist_index = BlacklistIndex()
+
+
+class RefreshToken(BaseRefreshToken):
+    """RefreshToken с проверкой черного списка через фильтр Блума"""
+
+    def check_blacklist(self):
+        if blacklist_index.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_index.add(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+def revoke_user_tokens(users, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Отзывает действующие refresh-токены пользователей (QuerySet или список id):
+    записи черного списка создаются пачками, jti сразу попадают в фильтр
+    этого процесса. Возвращает число отозванных токенов.
+    """
+    tokens = (OutstandingToken.objects
+              .filter(user__in=users, expires_at__gt=timezone.now(), blacklistedtoken__isnull=True)
+              .order_by('pk')
+              .values_list('pk', 'jti'))
+    revoked = 0
+    last_pk = 0
+    while True:
+        batch = list(tokens.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return revoked
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token_id=pk) for pk, _ in batch],
+                                             ignore_conflicts=True)
+        for _, jti in batch:
+            blacklist_index.add(jti)
+        revoked += len(batch)
+        last_pk = batch[-1][0]
+
+
+def purge_expired_tokens(batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Удаляет истекшие токены (и их записи в черном списке) пачками по
+    индексу expires_at, каждая пачка - в своей транзакции. Возвращает число.
+    """
+    deleted = 0
+    now = timezone.now()
+    while True:
+        ids = list(OutstandingToken.objects
+                   .filter(expires_at__lte=now)
+                   .order_by()
+                   .values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            deleted += OutstandingToken.objects.filter(pk__in=ids).delete()[0]
+        if progress:
+            progress(deleted)
+    if deleted:
+        # Следующая проверка пересоберет фильтр без удаленных записей
+        blacklist_index.reset()
+    return deleted
@@ -1,10 +1,12 @@
 from django.urls import path
+from rest_framework_simplejwt.views import TokenRefreshView
 from . import views
 
 urlpatterns = [
     # API endpoints
     path('api/register/', views.register_api, name='register_api'),
     path('api/login/', views.login_api, name='login_api'),
+    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
     # Web views для auth/
     path('register/', views.register_view, name='register'),
@@ -4,13 +4,15 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.http import JsonResponse
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login as django_login
 from django.contrib import messages
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.middleware.csrf import get_token
+from django.core.exceptions import ValidationError
+from portfolio_builder.uploads import validate_image
+from .tokens import RefreshToken
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
 from django.contrib.auth import get_user_model
 
@@ -120,15 +122,11 @@ def profile_view(request):
         
         # Обновление аватара
         if 'avatar' in request.FILES:
-            avatar_file = request.FILES['avatar']
-            # Проверка типа файла
-            if not avatar_file.content_type.startswith('image/'):
-                errors.append('Файл должен быть изображением')
-            # Проверка размера файла (5MB)
-            elif avatar_file.size > 5 * 1024 * 1024:
-                errors.append('Размер файла не должен превышать 5MB')
-            else:
-                user.avatar = avatar_file
+            # Формат, размер и число пикселей; EXIF-поворот и удаление метаданных
+            try:
+                user.avatar = validate_image(request.FILES['avatar'])
+            except ValidationError as exc:
+                errors.extend(exc.messages)
         
         # Проверка AJAX запроса
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -5,3 +5,8 @@ class AdminPanelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin_panel'
 
+    def ready(self):
+        from . import rollups
+
+        # Предрассчитанные метрики панели (admin_panel.rollups)
+        rollups.connect()
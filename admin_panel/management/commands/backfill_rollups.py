@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from admin_panel.rollups import backfill
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает метрики панели администратора (MetricRollup) по данным в БД'
+
+    def handle(self, *args, **options):
+        rows = backfill()
+        self.stdout.write(self.style.SUCCESS(f'Готово. Строк метрик: {rows}'))
@@ -0,0 +1,22 @@
+# Generated manually
+from django.db import migrations
+
+
+def backfill_rollups(apps, schema_editor):
+    """Начальные значения метрик по уже существующим данным (то же, что backfill_rollups)"""
+    from admin_panel.rollups import backfill
+
+    backfill(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0001_initial'),
+        ('accounts', '0004_user_deleted_at'),
+        ('portfolio', '0013_alter_portfolioitem_processing_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class MetricRollup(models.Model):
+    """
+    Предрассчитанная метрика панели администратора (см. admin_panel.rollups):
+    значение за день (date) или итог (date пустая)
+    """
+    metric = models.CharField(max_length=50)
+    key = models.CharField(max_length=100, blank=True)
+    date = models.DateField(null=True, blank=True)
+    value = models.BigIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'key', 'date'], name='metric_rollup_daily_unique'),
+            models.UniqueConstraint(fields=['metric', 'key'], condition=models.Q(date__isnull=True),
+                                    name='metric_rollup_total_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.metric}[{self.key}] {self.date or 'всего'}: {self.value}"
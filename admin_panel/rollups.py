@@ -0,0 +1,301 @@
+"""
+Предрассчитанные метрики панели администратора (MetricRollup).
+
+Панель читает готовые значения - несколько строк по индексу, - а не считает
+GROUP BY по таблицам пользователей, портфолио и работ. Метрики обновляются
+сигналами (и явными вызовами там, где запись идет мимо сигналов:
+QuerySet.update(), bulk_create/bulk_update). Изменения одной транзакции
+копятся и записываются одним пакетом после коммита (вне транзакции -
+сразу). У каждой точки сохранения свой пакет (см.
+portfolio_builder.transactions): при откате транзакции или точки
+сохранения накопленное в ней пропадает вместе с ней. Начальные значения
+заполняет миграция admin_panel 0002; пересчитать все с нуля - команда
+backfill_rollups.
+
+Метрики: за день и итог - регистрации (signups) и созданные портфолио
+(portfolios_created); только итог - активные пользователи, портфолио,
+шаблоны, использование шаблонов (ключ - id шаблона) и работы по типу
+контента (ключ - content_type).
+"""
+import datetime
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+from portfolio.models import Portfolio, PortfolioItem, Template
+from portfolio_builder.transactions import on_commit_once
+
+from .models import MetricRollup
+
+User = get_user_model()
+
+SIGNUPS = 'signups'
+ACTIVE_USERS = 'active_users'
+PORTFOLIOS_CREATED = 'portfolios_created'
+PORTFOLIOS = 'portfolios'
+TEMPLATES = 'templates'
+TEMPLATE_USAGE = 'template_usage'
+ITEMS = 'items'
+
+DAILY_METRICS = (SIGNUPS, PORTFOLIOS_CREATED)
+
+# Атрибут экземпляра со значением отслеживаемого поля на момент загрузки
+ORIGINAL_ATTR = '_rollup_original'
+_UNKNOWN = object()
+TRACKED_FIELDS = {
+    Portfolio: 'template_id',
+    PortfolioItem: 'content_type',
+}
+
+
+def apply(changes):
+    """Прибавляет изменения {(metric, key, date): delta} одной транзакцией"""
+    changes = {bucket: delta for bucket, delta in changes.items() if delta}
+    if not changes:
+        return
+    with transaction.atomic():
+        MetricRollup.objects.bulk_create(
+            [MetricRollup(metric=metric, key=key, date=date) for metric, key, date in changes],
+            ignore_conflicts=True,
+        )
+        for (metric, key, date), delta in changes.items():
+            MetricRollup.objects.filter(metric=metric, key=key, date=date).update(value=F('value') + delta)
+
+
+class _Pending:
+    """Изменения метрик текущего уровня транзакции; записываются после коммита"""
+
+    def __init__(self):
+        self.changes = Counter()
+
+    def __call__(self):
+        apply(self.changes)
+
+
+def _pending():
+    return on_commit_once('rollups', _Pending, per_savepoint=True)
+
+
+def count(metric, delta, key='', day=None):
+    """Изменяет итог метрики (и значение за день day)"""
+    if not delta:
+        return
+    changes = Counter({(metric, str(key), None): delta})
+    if day is not None:
+        changes[(metric, str(key), day)] += delta
+    if transaction.get_connection().in_atomic_block:
+        _pending().changes.update(changes)
+    else:
+        apply(changes)
+
+
+def _day(value):
+    return timezone.localdate(value) if value else timezone.localdate()
+
+
+# ==================== Явные вызовы ====================
+
+def users_soft_deleted(number):
+    """Пользователи помечены удаленными через QuerySet.update()"""
+    count(ACTIVE_USERS, -number)
+
+
+def template_changed(old_template_id, new_template_id):
+    """Шаблон портфолио изменен через QuerySet.update()"""
+    if old_template_id != new_template_id:
+        if old_template_id:
+            count(TEMPLATE_USAGE, -1, key=old_template_id)
+        if new_template_id:
+            count(TEMPLATE_USAGE, 1, key=new_template_id)
+
+
+def bulk_created(users=(), portfolios=(), items=()):
+    """Объекты созданы bulk_create (импорт): то же, что сделали бы сигналы"""
+    for user in users:
+        _user_saved(User, user, created=True)
+    for portfolio in portfolios:
+        _portfolio_saved(Portfolio, portfolio, created=True)
+    items_saved(created=items)
+
+
+def items_saved(created=(), updated=()):
+    """Работы сохранены bulk_create/bulk_update (без сигналов)"""
+    for item in created:
+        count(ITEMS, 1, key=item.content_type)
+    for item in updated:
+        _item_type_changed(item)
+        _remember(PortfolioItem, item)
+
+
+# ==================== Сигналы ====================
+
+def _remember(sender, instance, **kwargs):
+    attname = TRACKED_FIELDS[sender]
+    # Отложенное поле (.only()/.defer()) не загружаем: старое значение неизвестно
+    instance.__dict__[ORIGINAL_ATTR] = instance.__dict__.get(attname, _UNKNOWN)
+
+
+def _original(instance):
+    return instance.__dict__.get(ORIGINAL_ATTR, _UNKNOWN)
+
+
+def _item_type_changed(item):
+    original = _original(item)
+    if original is not _UNKNOWN and original != item.content_type:
+        count(ITEMS, -1, key=original)
+        count(ITEMS, 1, key=item.content_type)
+
+
+def _user_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    count(SIGNUPS, 1, day=_day(instance.created_at))
+    if instance.deleted_at is None:
+        count(ACTIVE_USERS, 1)
+
+
+def _user_deleted(sender, instance, **kwargs):
+    # Помеченные удаленными уже вычтены (users_soft_deleted)
+    if instance.deleted_at is None:
+        count(ACTIVE_USERS, -1)
+
+
+def _portfolio_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        count(PORTFOLIOS_CREATED, 1, day=_day(instance.created_at))
+        count(PORTFOLIOS, 1)
+        if instance.template_id:
+            count(TEMPLATE_USAGE, 1, key=instance.template_id)
+    elif update_fields is None or 'template' in update_fields or 'template_id' in update_fields:
+        original = _original(instance)
+        if original is not _UNKNOWN:
+            template_changed(original, instance.template_id)
+    _remember(sender, instance)
+
+
+def _portfolio_deleted(sender, instance, **kwargs):
+    count(PORTFOLIOS, -1)
+    if instance.template_id:
+        count(TEMPLATE_USAGE, -1, key=instance.template_id)
+
+
+def _template_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw and created:
+        count(TEMPLATES, 1)
+
+
+def _template_deleted(sender, instance, **kwargs):
+    count(TEMPLATES, -1)
+    # Портфолио остаются без шаблона (SET_NULL через UPDATE, без сигналов)
+    transaction.on_commit(
+        lambda: MetricRollup.objects.filter(metric=TEMPLATE_USAGE, key=str(instance.pk)).delete())
+
+
+def _item_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        count(ITEMS, 1, key=instance.content_type)
+    elif update_fields is None or 'content_type' in update_fields:
+        _item_type_changed(instance)
+    _remember(sender, instance)
+
+
+def _item_deleted(sender, instance, **kwargs):
+    count(ITEMS, -1, key=instance.content_type)
+
+
+def connect():
+    for model in TRACKED_FIELDS:
+        post_init.connect(_remember, sender=model, dispatch_uid=f'rollup_init_{model._meta.label}')
+    post_save.connect(_user_saved, sender=User, dispatch_uid='rollup_user_save')
+    post_delete.connect(_user_deleted, sender=User, dispatch_uid='rollup_user_delete')
+    post_save.connect(_portfolio_saved, sender=Portfolio, dispatch_uid='rollup_portfolio_save')
+    post_delete.connect(_portfolio_deleted, sender=Portfolio, dispatch_uid='rollup_portfolio_delete')
+    post_save.connect(_template_saved, sender=Template, dispatch_uid='rollup_template_save')
+    post_delete.connect(_template_deleted, sender=Template, dispatch_uid='rollup_template_delete')
+    post_save.connect(_item_saved, sender=PortfolioItem, dispatch_uid='rollup_item_save')
+    post_delete.connect(_item_deleted, sender=PortfolioItem, dispatch_uid='rollup_item_delete')
+
+
+# ==================== Пересчет и чтение ====================
+
+def _daily_rows(rollup_model, metric, queryset):
+    rows = []
+    total = 0
+    for row in queryset.annotate(day=TruncDate('created_at')).values('day').annotate(n=Count('pk')).order_by():
+        rows.append(rollup_model(metric=metric, date=row['day'], value=row['n']))
+        total += row['n']
+    rows.append(rollup_model(metric=metric, value=total))
+    return rows
+
+
+def backfill(apps=None):
+    """
+    Пересчитывает все метрики по таблицам; возвращает число строк.
+    apps - реестр моделей миграции (в RunPython), по умолчанию - текущие модели.
+    """
+    if apps is None:
+        user, portfolio, template, item, rollup = User, Portfolio, Template, PortfolioItem, MetricRollup
+    else:
+        user = apps.get_model(settings.AUTH_USER_MODEL)
+        portfolio = apps.get_model('portfolio', 'Portfolio')
+        template = apps.get_model('portfolio', 'Template')
+        item = apps.get_model('portfolio', 'PortfolioItem')
+        rollup = apps.get_model('admin_panel', 'MetricRollup')
+    rows = _daily_rows(rollup, SIGNUPS, user.objects.all())
+    rows += _daily_rows(rollup, PORTFOLIOS_CREATED, portfolio.objects.all())
+    rows.append(rollup(metric=ACTIVE_USERS, value=user.objects.filter(deleted_at__isnull=True).count()))
+    rows.append(rollup(metric=PORTFOLIOS, value=portfolio.objects.count()))
+    rows.append(rollup(metric=TEMPLATES, value=template.objects.count()))
+    for row in (portfolio.objects.filter(template__isnull=False)
+                .values('template_id').annotate(n=Count('pk')).order_by()):
+        rows.append(rollup(metric=TEMPLATE_USAGE, key=str(row['template_id']), value=row['n']))
+    for row in item.objects.values('content_type').annotate(n=Count('pk')).order_by():
+        rows.append(rollup(metric=ITEMS, key=row['content_type'], value=row['n']))
+    with transaction.atomic():
+        rollup.objects.all().delete()
+        rollup.objects.bulk_create(rows)
+    return len(rows)
+
+
+def dashboard(days=30, top_templates=10):
+    """Данные панели: итоги, ряды за days дней, популярные шаблоны, работы по типам"""
+    today = timezone.localdate()
+    since = today - datetime.timedelta(days=days - 1)
+    totals, series = Counter(), {metric: Counter() for metric in DAILY_METRICS}
+    usage, items = [], []
+    for metric, key, date, value in (MetricRollup.objects
+                                     .filter(Q(date__isnull=True) | Q(metric__in=DAILY_METRICS, date__gte=since))
+                                     .values_list('metric', 'key', 'date', 'value')):
+        if date is not None:
+            series[metric][date] = value
+        elif metric == TEMPLATE_USAGE:
+            usage.append((value, key))
+        elif metric == ITEMS:
+            items.append((value, key))
+        else:
+            totals[metric] = value
+
+    usage = sorted((value, key) for value, key in usage if value > 0)[::-1][:top_templates]
+    names = Template.objects.in_bulk([int(key) for _, key in usage]) if usage else {}
+    labels = dict(PortfolioItem.CONTENT_TYPE_CHOICES)
+    dates = [since + datetime.timedelta(days=offset) for offset in range(days)]
+    return {
+        'users_count': totals[ACTIVE_USERS],
+        'portfolios_count': totals[PORTFOLIOS],
+        'templates_count': totals[TEMPLATES],
+        'signups': [(date, series[SIGNUPS][date]) for date in dates],
+        'portfolios_created': [(date, series[PORTFOLIOS_CREATED][date]) for date in dates],
+        'template_popularity': [(names[int(key)].name if int(key) in names else f'#{key}', value)
+                                for value, key in usage],
+        'items_by_type': [(labels.get(key, key), value) for value, key in sorted(items)[::-1] if value > 0],
+    }
@@ -4,6 +4,7 @@ from . import views
 
 router = DefaultRouter()
 router.register(r'users', views.AdminUserViewSet, basename='admin-user')
+router.register(r'imports', views.AdminImportViewSet, basename='admin-import')
 
 urlpatterns = [
     path('', views.admin_panel_view, name='admin_panel'),
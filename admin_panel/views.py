@@ -1,12 +1,22 @@
+import os
+import tempfile
+
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
 from django.http import JsonResponse
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from portfolio.models import Portfolio, Template
+from portfolio import importer
+from portfolio_builder.replicas import use_primary
+from portfolio.models import ImportJob, Portfolio, Template
+from accounts import moderation
+from accounts.deletion import soft_delete_users
+from accounts.models import UserDeletionJob
+from . import rollups
 
 User = get_user_model()
 
@@ -17,15 +27,19 @@ def admin_panel_view(request):
     if not request.user.is_admin:
         return redirect('/')
     
-    users_count = User.objects.count()
-    portfolios_count = Portfolio.objects.count()
-    templates_count = Template.objects.count()
-    
-    return render(request, 'admin/panel.html', {
-        'users_count': users_count,
-        'portfolios_count': portfolios_count,
-        'templates_count': templates_count,
-    })
+    # Готовые метрики (admin_panel.rollups) вместо подсчета по таблицам
+    context = rollups.dashboard()
+    context['series_blocks'] = [
+        ('Регистрации за 30 дней', _bars(context['signups'])),
+        ('Новые портфолио за 30 дней', _bars(context['portfolios_created'])),
+    ]
+    return render(request, 'admin/panel.html', context)
+
+
+def _bars(series):
+    """[(дата, значение, высота столбца в %)]"""
+    peak = max((value for _, value in series), default=0) or 1
+    return [(date, value, round(value * 100 / peak)) for date, value in series]
 
 
 @login_required
@@ -34,7 +48,7 @@ def admin_users_view(request):
     if not request.user.is_admin:
         return redirect('/')
     
-    users = User.objects.all().order_by('-created_at')
+    users = User.objects.filter(deleted_at__isnull=True).order_by('-created_at')
     return render(request, 'admin/users.html', {'users': users})
 
 
@@ -44,7 +58,10 @@ def admin_portfolios_view(request):
     if not request.user.is_admin:
         return redirect('/')
     
-    portfolios = Portfolio.objects.all().select_related('user', 'template').order_by('-created_at')
+    portfolios = (Portfolio.objects
+                  .filter(user__deleted_at__isnull=True)
+                  .select_related('user', 'template')
+                  .order_by('-created_at'))
     return render(request, 'admin/portfolios.html', {'portfolios': portfolios})
 
 
@@ -66,7 +83,7 @@ class AdminUserViewSet(viewsets.ViewSet):
         if not request.user.is_admin:
             return Response({'error': 'Доступ запрещен'}, status=status.HTTP_403_FORBIDDEN)
         
-        users = User.objects.all()
+        users = User.objects.filter(deleted_at__isnull=True)
         data = [{
             'id': user.id,
             'email': user.email,
@@ -82,12 +99,13 @@ class AdminUserViewSet(viewsets.ViewSet):
             return Response({'error': 'Доступ запрещен'}, status=status.HTTP_403_FORBIDDEN)
         
         try:
-            user = User.objects.get(pk=pk)
-            user.is_active = False
-            user.save()
-            return Response({'message': 'Пользователь заблокирован'})
-        except User.DoesNotExist:
+            users = User.objects.filter(pk=int(pk))
+        except (TypeError, ValueError):
             return Response({'error': 'Пользователь не найден'}, status=status.HTTP_404_NOT_FOUND)
+        if not users.exists():
+            return Response({'error': 'Пользователь не найден'}, status=status.HTTP_404_NOT_FOUND)
+        moderation.block_users(users)
+        return Response({'message': 'Пользователь заблокирован'})
     
     @action(detail=True, methods=['delete'])
     def delete(self, request, pk=None):
@@ -95,11 +113,96 @@ class AdminUserViewSet(viewsets.ViewSet):
             return Response({'error': 'Доступ запрещен'}, status=status.HTTP_403_FORBIDDEN)
         
         try:
-            user = User.objects.get(pk=pk)
-            if user == request.user:
-                return Response({'error': 'Нельзя удалить самого себя'}, status=status.HTTP_400_BAD_REQUEST)
-            user.delete()
-            return Response({'message': 'Пользователь удален'})
-        except User.DoesNotExist:
+            user_id = int(pk)
+        except (TypeError, ValueError):
+            return Response({'error': 'Пользователь не найден'}, status=status.HTTP_404_NOT_FOUND)
+        if user_id == request.user.pk:
+            return Response({'error': 'Нельзя удалить самого себя'}, status=status.HTTP_400_BAD_REQUEST)
+        # Пользователь помечается удаленным сразу, его данные удаляются в фоне
+        if not soft_delete_users([user_id]):
             return Response({'error': 'Пользователь не найден'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'Пользователь удален'})
+    
+    def _bulk_users(self, request):
+        """(QuerySet, None) по телу {"ids": [...]} или {"filter": {...}}, иначе (None, Response)"""
+        if not request.user.is_admin:
+            return None, Response({'error': 'Доступ запрещен'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            users = moderation.select_users(request.data.get('ids'), request.data.get('filter'), actor=request.user)
+        except ValueError as exc:
+            return None, Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return users, None
+    
+    @action(detail=False, methods=['post'], url_path='bulk-block')
+    def bulk_block(self, request):
+        """Блокировка пользователей по списку id или фильтру (один UPDATE)"""
+        users, error = self._bulk_users(request)
+        if error:
+            return error
+        return Response({'blocked': moderation.block_users(users)})
+    
+    @action(detail=False, methods=['post'], url_path='bulk-unblock')
+    def bulk_unblock(self, request):
+        """Разблокировка пользователей по списку id или фильтру (один UPDATE)"""
+        users, error = self._bulk_users(request)
+        if error:
+            return error
+        return Response({'unblocked': moderation.unblock_users(users)})
+    
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Удаление пользователей: пометка сразу, данные - в фоне; прогресс - bulk-jobs/<id>/"""
+        users, error = self._bulk_users(request)
+        if error:
+            return error
+        job = moderation.delete_users(users, actor=request.user)
+        if job is None:
+            return Response({'deleted': 0})
+        return Response(moderation.job_progress(job), status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['get'], url_path=r'bulk-jobs/(?P<job_id>\d+)')
+    def bulk_job(self, request, job_id=None):
+        """Прогресс массового удаления"""
+        if not request.user.is_admin:
+            return Response({'error': 'Доступ запрещен'}, status=status.HTTP_403_FORBIDDEN)
+        # Задание создано только что и обновляется фоновым потоком - реплика может его еще не видеть
+        use_primary()
+        try:
+            job = UserDeletionJob.objects.get(pk=job_id)
+        except UserDeletionJob.DoesNotExist:
+            return Response({'error': 'Задание не найдено'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(moderation.job_progress(job))
+
 
+class AdminImportViewSet(viewsets.ViewSet):
+    """API импорта портфолио из файла (portfolio.importer); импорт идет в фоне"""
+    permission_classes = [IsAuthenticated]
+    
+    def create(self, request):
+        """POST multipart: file - NDJSON или JSON-массив, dry_run - только проверить"""
+        if not request.user.is_admin:
+            return Response({'error': 'Доступ запрещен'}, status=status.HTTP_403_FORBIDDEN)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Загрузите файл импорта (поле file)'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Загруженный файл удаляется после ответа - копируем для фонового потока
+        descriptor, path = tempfile.mkstemp(prefix='import-', suffix='.json')
+        with os.fdopen(descriptor, 'wb') as target:
+            for chunk in upload.chunks():
+                target.write(chunk)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        with transaction.atomic():
+            job = ImportJob.objects.create(created_by=request.user, source_name=upload.name[:255], dry_run=dry_run)
+            transaction.on_commit(lambda: importer.schedule_job(job.pk, path))
+        return Response(importer.job_progress(job), status=status.HTTP_202_ACCEPTED)
+    
+    def retrieve(self, request, pk=None):
+        """Прогресс и ошибки задания импорта"""
+        if not request.user.is_admin:
+            return Response({'error': 'Доступ запрещен'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            job = ImportJob.objects.get(pk=int(pk))
+        except (TypeError, ValueError, ImportJob.DoesNotExist):
+            return Response({'error': 'Задание не найдено'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(importer.job_progress(job))
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import Portfolio, PortfolioItem, Template
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from portfolio_builder.admin_utils import LargeTableAdminMixin, PaginatedInlineMixin
+from .models import ImportJob, Portfolio, PortfolioItem, Template
 
 
 @admin.register(Template)
@@ -32,25 +35,28 @@ class TemplateAdmin(admin.ModelAdmin):
     preview_image_display.short_description = 'Превью'
 
 
-class PortfolioItemInline(admin.TabularInline):
+class PortfolioItemInline(PaginatedInlineMixin, admin.TabularInline):
     model = PortfolioItem
     extra = 0
+    per_page = 20
     fields = ('title', 'content_type', 'order', 'image_preview', 'created_at')
     readonly_fields = ('created_at', 'image_preview')
     ordering = ('order', 'created_at')
     
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="max-width: 50px; max-height: 50px;" />', obj.image.url)
+            return format_html('<img src="{}" loading="lazy" style="max-width: 50px; max-height: 50px;" />', obj.image.url)
         return "Нет изображения"
     image_preview.short_description = 'Изображение'
 
 
 @admin.register(Portfolio)
-class PortfolioAdmin(admin.ModelAdmin):
+class PortfolioAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['user', 'name', 'template', 'items_count', 'avatar_preview', 'created_at', 'updated_at']
     list_filter = ['template', 'created_at', 'updated_at']
     search_fields = ['user__email', 'user__username', 'name', 'description', 'phone', 'email', 'location']
+    list_select_related = ['user', 'template']
+    autocomplete_fields = ['user']
     readonly_fields = ['created_at', 'updated_at', 'avatar_preview', 'items_count_display']
     inlines = [PortfolioItemInline]
     
@@ -77,27 +83,42 @@ class PortfolioAdmin(admin.ModelAdmin):
     
     def avatar_preview(self, obj):
         if obj.avatar:
-            return format_html('<img src="{}" style="max-width: 100px; max-height: 100px; border-radius: 50%;" />', obj.avatar.url)
+            return format_html('<img src="{}" loading="lazy" style="max-width: 100px; max-height: 100px; border-radius: 50%;" />', obj.avatar.url)
         return "Нет аватара"
     avatar_preview.short_description = 'Аватар'
     
+    def get_queryset(self, request):
+        # Подзапрос считается только для строк текущей страницы (в отличие от GROUP BY по всей выборке)
+        items_count = (PortfolioItem.objects
+                       .filter(portfolio=OuterRef('pk'))
+                       .order_by()
+                       .values('portfolio')
+                       .annotate(count=Count('pk'))
+                       .values('count'))
+        return super().get_queryset(request).annotate(
+            items_total=Coalesce(Subquery(items_count, output_field=IntegerField()), 0))
+    
     def items_count(self, obj):
-        return obj.items.count()
+        return obj.items_total
     items_count.short_description = 'Работ'
     
     def items_count_display(self, obj):
-        count = obj.items.count()
+        count = obj.items_total
         url = reverse('admin:portfolio_portfolioitem_changelist')
         return format_html('<a href="{}?portfolio__id__exact={}">{} работ</a>', url, obj.id, count)
     items_count_display.short_description = 'Количество работ'
 
 
 @admin.register(PortfolioItem)
-class PortfolioItemAdmin(admin.ModelAdmin):
+class PortfolioItemAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'portfolio', 'content_type', 'order', 'image_preview', 'created_at']
-    list_filter = ['content_type', 'created_at', 'updated_at', 'portfolio']
-    search_fields = ['title', 'description', 'portfolio__user__email', 'portfolio__name', 'category', 'tags']
-    readonly_fields = ['created_at', 'updated_at', 'image_preview']
+    # Без фильтра по portfolio: он выводит все портфолио; отбор - ?portfolio__id__exact=
+    list_filter = ['content_type', 'created_at', 'updated_at']
+    list_select_related = ['portfolio', 'portfolio__user']
+    raw_id_fields = ['portfolio']
+    search_fields = ['title', 'description', 'portfolio__user__email', 'portfolio__name', 'category', 'tags',
+                     'search_text']
+    readonly_fields = ['created_at', 'updated_at', 'image_preview', 'processing_status']
     list_editable = ['order']
     ordering = ['portfolio', 'order', 'created_at']
     
@@ -106,7 +127,7 @@ class PortfolioItemAdmin(admin.ModelAdmin):
             'fields': ('portfolio', 'title', 'description', 'image', 'image_preview')
         }),
         ('Тип контента', {
-            'fields': ('content_type', 'content_data')
+            'fields': ('content_type', 'content_data', 'file', 'processing_status')
         }),
         ('Категоризация', {
             'fields': ('category', 'tags', 'order')
@@ -119,11 +140,21 @@ class PortfolioItemAdmin(admin.ModelAdmin):
     
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="max-width: 200px; max-height: 200px;" />', obj.image.url)
+            return format_html('<img src="{}" loading="lazy" style="max-width: 200px; max-height: 200px;" />', obj.image.url)
         return "Нет изображения"
     image_preview.short_description = 'Превью изображения'
-    
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.select_related('portfolio', 'portfolio__user')
 
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    """Задания импорта портфолио (создаются через API админ-панели, только чтение)"""
+    list_display = ['created_at', 'source_name', 'status', 'dry_run', 'records', 'portfolios', 'items',
+                    'error_count', 'created_by']
+    list_filter = ['status']
+    list_select_related = ['created_by']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
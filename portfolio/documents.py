@@ -0,0 +1,280 @@
+"""
+Обработка PDF-работ: число страниц, заголовок, текст для поиска и миниатюра
+первой страницы. Карточки работ показывают миниатюру, а не весь документ.
+
+Обработка идет в пуле фоновых потоков (PDF_PROCESSING_WORKERS) после
+сохранения работы, либо командой process_documents. Работа забирается из
+очереди условным UPDATE (pending -> processing), поэтому один документ
+обрабатывает один обработчик. Файл не читается в память целиком: библиотеки
+открывают его по пути (из удаленного хранилища он копируется во временный
+файл по частям). PyMuPDF (если установлен) делает все за один проход,
+иначе pypdf извлекает данные, а миниатюру рисует pdftoppm (poppler), если он есть.
+Без обеих библиотек работы остаются в очереди.
+
+Результат записывается под блокировкой строки и только в ключи обработки
+в content_data; если файл за это время заменили, результат отбрасывается.
+"""
+import io
+import logging
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image
+
+from .models import PortfolioItem
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTH = 400
+# Текст извлекается с первых страниц: для поиска этого достаточно
+TEXT_MAX_PAGES = 50
+TEXT_MAX_LENGTH = 100000
+# Работа в статусе processing дольше этого срока считается брошенной (сбой процесса)
+PROCESSING_TIMEOUT = timedelta(minutes=30)
+
+
+class DocumentInfo:
+    """Результат разбора документа"""
+
+    def __init__(self):
+        self.pages = None
+        self.title = ''
+        self.text = ''
+        self.thumbnail = None  # PIL.Image
+
+
+def _append_text(parts, length, text):
+    text = ' '.join((text or '').split())
+    if text and length < TEXT_MAX_LENGTH:
+        text = text[:TEXT_MAX_LENGTH - length]
+        parts.append(text)
+        length += len(text) + 1
+    return length
+
+
+def _read_with_fitz(path):
+    info = DocumentInfo()
+    with fitz.open(path, filetype='pdf') as document:
+        info.pages = document.page_count
+        info.title = (document.metadata or {}).get('title') or ''
+        parts, length = [], 0
+        for page in document.pages(0, min(document.page_count, TEXT_MAX_PAGES)):
+            length = _append_text(parts, length, page.get_text())
+            if length >= TEXT_MAX_LENGTH:
+                break
+        info.text = ' '.join(parts)
+        if document.page_count:
+            page = document[0]
+            zoom = THUMBNAIL_WIDTH / max(page.rect.width, 1)
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            info.thumbnail = Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+    return info
+
+
+def _read_with_pypdf(path):
+    info = DocumentInfo()
+    reader = pypdf.PdfReader(path)
+    if reader.is_encrypted:
+        reader.decrypt('')
+    info.pages = len(reader.pages)
+    metadata = reader.metadata
+    info.title = (metadata.title if metadata else None) or ''
+    parts, length = [], 0
+    for page in reader.pages[:TEXT_MAX_PAGES]:
+        length = _append_text(parts, length, page.extract_text())
+        if length >= TEXT_MAX_LENGTH:
+            break
+    info.text = ' '.join(parts)
+    return info
+
+
+def _render_with_pdftoppm(path):
+    """Первая страница через poppler; None, если pdftoppm не установлен"""
+    binary = shutil.which('pdftoppm')
+    if not binary:
+        return None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        subprocess.run(
+            [binary, '-f', '1', '-l', '1', '-png', '-scale-to-x', str(THUMBNAIL_WIDTH), '-scale-to-y', '-1',
+             path, f'{tmp_dir}/page'],
+            check=True, timeout=60, capture_output=True,
+        )
+        for name in ('page-1.png', 'page-01.png', 'page-001.png'):
+            try:
+                with Image.open(f'{tmp_dir}/{name}') as image:
+                    return image.convert('RGB')
+            except FileNotFoundError:
+                continue
+    return None
+
+
+def can_process():
+    """Установлена ли библиотека разбора PDF (PyMuPDF или pypdf)"""
+    return fitz is not None or pypdf is not None
+
+
+def read_document(path):
+    """DocumentInfo для PDF-файла по пути"""
+    if fitz is not None:
+        return _read_with_fitz(path)
+    info = _read_with_pypdf(path)
+    info.thumbnail = _render_with_pdftoppm(path)
+    return info
+
+
+@contextmanager
+def _local_path(field_file):
+    """Путь к файлу в локальной ФС; из удаленного хранилища файл копируется по частям"""
+    storage = field_file.storage
+    try:
+        path = storage.path(field_file.name)
+    except NotImplementedError:
+        path = None
+    if path is not None:
+        yield path
+        return
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as tmp:
+        with storage.open(field_file.name, 'rb') as source:
+            for chunk in source.chunks():
+                tmp.write(chunk)
+        tmp.flush()
+        yield tmp.name
+
+
+def _thumbnail_file(image):
+    image.thumbnail((THUMBNAIL_WIDTH, THUMBNAIL_WIDTH * 2))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=80, optimize=True, progressive=True)
+    return ContentFile(buffer.getvalue())
+
+
+def _claim(item_id):
+    """Забирает работу из очереди; False, если ее уже забрал другой обработчик"""
+    return PortfolioItem.objects.filter(pk=item_id, processing_status='pending').update(
+        processing_status='processing', updated_at=timezone.now()) == 1
+
+
+def _save_result(item_id, file_name, info):
+    """Записывает результат, если работа все еще обрабатывает тот же файл"""
+    with transaction.atomic():
+        item = PortfolioItem.objects.select_for_update().filter(pk=item_id).first()
+        if item is None or item.processing_status != 'processing' or item.file.name != file_name:
+            # Работу удалили или загрузили новый файл - он уже стоит в очереди
+            return False
+        # Остальные ключи content_data могли измениться, пока шла обработка
+        content_data = dict(item.content_data or {})
+        content_data.update({
+            'file': item.file.url,
+            'pages': info.pages,
+            'title': info.title[:300],
+        })
+        update_fields = ['content_data', 'search_text', 'processing_status', 'updated_at']
+        if info.thumbnail is not None:
+            item.thumbnail.save('thumbnail.jpg', _thumbnail_file(info.thumbnail), save=False)
+            content_data['thumbnail'] = item.thumbnail.url
+            update_fields.append('thumbnail')
+        item.content_data = content_data
+        item.search_text = info.text
+        item.processing_status = 'done'
+        item.save(update_fields=update_fields)
+    return True
+
+
+def process_item(item_id):
+    """Обрабатывает PDF работы; результаты - в content_data, search_text и thumbnail"""
+    if not can_process():
+        logger.warning('PDF работы %s не обработан: не установлены PyMuPDF и pypdf', item_id)
+        return False
+    if not _claim(item_id):
+        return False
+    item = PortfolioItem.objects.get(pk=item_id)
+    if not item.file:
+        PortfolioItem.objects.filter(pk=item_id, processing_status='processing').update(processing_status='')
+        return False
+
+    try:
+        with _local_path(item.file) as path:
+            info = read_document(path)
+    except Exception:
+        logger.exception('Не удалось обработать PDF работы %s', item_id)
+        PortfolioItem.objects.filter(pk=item_id, processing_status='processing').update(processing_status='failed')
+        return False
+    return _save_result(item_id, item.file.name, info)
+
+
+def release_stale():
+    """Возвращает в очередь работы, брошенные в статусе processing; возвращает их число"""
+    return PortfolioItem.objects.filter(
+        processing_status='processing', updated_at__lt=timezone.now() - PROCESSING_TIMEOUT,
+    ).update(processing_status='pending')
+
+
+def process_pending(limit=None):
+    """Обрабатывает работы в очереди; возвращает (обработано, с ошибкой)"""
+    release_stale()
+    ids = PortfolioItem.objects.filter(processing_status='pending').order_by('pk').values_list('pk', flat=True)
+    processed = failed = 0
+    for item_id in list(ids[:limit] if limit else ids):
+        if process_item(item_id):
+            processed += 1
+        else:
+            failed += 1
+    return processed, failed
+
+
+def attach_document(item, uploaded_file):
+    """Сохраняет загруженный PDF в работу и ставит его в очередь обработки"""
+    item.file = uploaded_file
+    item.processing_status = 'pending'
+    content_data = dict(item.content_data or {})
+    content_data.pop('thumbnail', None)
+    item.content_data = content_data
+    item.save()
+    item_id = item.pk
+    transaction.on_commit(lambda: schedule(item_id))
+
+
+# ==================== Пул обработчиков ====================
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _run(item_id):
+    try:
+        process_item(item_id)
+    except Exception:
+        logger.exception('Ошибка фоновой обработки PDF работы %s', item_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(item_id):
+    """Ставит обработку в пул потоков (или оставляет для команды process_documents)"""
+    global _executor
+    if not getattr(settings, 'PDF_PROCESS_IN_BACKGROUND', True) or not can_process():
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'PDF_PROCESSING_WORKERS', 2),
+                                           thread_name_prefix='pdf-processing')
+    _executor.submit(_run, item_id)
@@ -0,0 +1,634 @@
+"""
+Массовый импорт пользователей с портфолио и работами (команда
+import_portfolios и API админ-панели).
+
+Вход - NDJSON (одна запись на строку) или JSON-массив записей; файл читается
+потоком, в памяти держится одна пачка. Запись:
+
+    {"user": {"email": ..., "username": ..., "first_name": ..., "last_name": ...,
+              "bio": ..., "phone": ..., "website": ..., "password": <хеш Django>},
+     "portfolio": {<поля PortfolioSerializer>, "template": <id или название>,
+                   "avatar": <путь к файлу>},
+     "items": [{<поля PortfolioItemSerializer>, "image": <путь>, "file": <путь к PDF>}]}
+
+Пачка проверяется целиком: поля - сериализаторами API (одним экземпляром на
+импорт), уникальность email и username - одним запросом на пачку и по уже
+прочитанным записям. Запись с ошибкой пропускается и попадает в отчет, она
+не мешает остальным. Пользователи, портфолио и работы пачки создаются
+bulk_create в одной транзакции. Сигналы при этом не вызываются, поэтому
+метрики (admin_panel.rollups) и счетчики ссылок на файлы (portfolio.media)
+обновляются явно; документы для чтения (portfolio.read_model) соберутся при
+первом чтении, PDF встают в очередь process_documents.
+
+Пути к файлам - относительно каталога медиа импорта; выходить за него
+нельзя. Изображения проверяются и очищаются как при загрузке
+(portfolio_builder.uploads), одинаковые файлы сохраняются один раз. Файлы
+проверяются при разборе записи, а в хранилище попадают только после проверки
+уникальности - у отклоненных записей файлы не сохраняются.
+
+Если такого пользователя создали параллельно (регистрация между проверкой
+уникальности и вставкой), транзакция пачки откатывается на IntegrityError и
+пачка сохраняется по одной записи: конфликтная попадает в отчет, остальные
+импортируются.
+
+Пароль - только готовый хеш Django (make_password): хеширование открытых
+паролей заняло бы часы. Без пароля пользователь входит после сброса пароля.
+"""
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from admin_panel import rollups
+from portfolio_builder.storage import media_storage
+from portfolio_builder.uploads import MAX_PDF_SIZE, validate_image
+
+from . import media
+from .models import ImportJob, Portfolio, PortfolioItem, Template
+from .serializers import PortfolioItemSerializer, PortfolioSerializer, validate_json
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 500
+# Сколько ошибок хранить в задании импорта (в отчете команды - все)
+MAX_STORED_ERRORS = 1000
+READ_CHUNK_SIZE = 64 * 1024
+
+USER_FIELDS = ('email', 'username', 'first_name', 'last_name', 'bio', 'phone', 'website')
+
+
+class ImportFileError(Exception):
+    """Файл импорта нельзя прочитать дальше"""
+
+
+# ==================== Чтение ====================
+
+def _iter_array(stream, buffer):
+    """Элементы JSON-массива по одному, без чтения всего файла"""
+    decoder = json.JSONDecoder()
+    position = buffer.index('[') + 1
+    number = 0
+    eof = False
+    while True:
+        # Пропускаем пробелы и запятую между элементами
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            chunk = stream.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+        if position >= len(buffer):
+            raise ImportFileError('Неожиданный конец файла: массив не закрыт')
+        if buffer[position] == ']':
+            return
+        while True:
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+                break
+            except json.JSONDecodeError as exc:
+                if eof:
+                    raise ImportFileError(f'Запись {number + 1}: неверный JSON ({exc.msg})')
+                chunk = stream.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+        number += 1
+        yield number, record
+        buffer, position = buffer[end:], 0
+
+
+def _parse_line(number, line):
+    try:
+        return number, json.loads(line)
+    except json.JSONDecodeError as exc:
+        return number, exc
+
+
+def iter_records(stream):
+    """
+    (номер, запись) из NDJSON или JSON-массива; номер - строка NDJSON или
+    порядковый номер элемента массива. Вместо строки NDJSON с неверным JSON -
+    исключение json.JSONDecodeError (чтение продолжается).
+    """
+    if not isinstance(stream, io.TextIOBase):
+        # Декодер с состоянием: многобайтный символ может попасть на границу блока
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    number = 0
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        number += 1
+        if line.strip():
+            break
+    if line.lstrip().startswith('['):
+        yield from _iter_array(stream, line)
+        return
+    yield _parse_line(number, line)
+    for line in stream:
+        number += 1
+        if line.strip():
+            yield _parse_line(number, line)
+
+
+# ==================== Проверка ====================
+
+class ImportPortfolioSerializer(PortfolioSerializer):
+    """Поля портфолио из файла импорта (шаблон и аватар разбирает импорт)"""
+
+    class Meta(PortfolioSerializer.Meta):
+        fields = [
+            'name', 'description', 'color_scheme', 'phone', 'email', 'website', 'location',
+            'social_links', 'skills', 'experience', 'education', 'certificates', 'languages',
+            'design_settings',
+        ]
+
+
+class ImportItemSerializer(PortfolioItemSerializer):
+    """Поля работы из файла импорта (файлы разбирает импорт)"""
+
+    class Meta(PortfolioItemSerializer.Meta):
+        fields = ['title', 'description', 'order', 'content_type', 'content_data', 'category', 'tags']
+
+    def validate_content_data(self, value):
+        # Экземпляр один на все работы: тип контента берется в validate()
+        return value if isinstance(value, dict) else {}
+
+    def validate(self, attrs):
+        if attrs.get('content_data'):
+            try:
+                attrs['content_data'] = validate_json('content_data', attrs['content_data'],
+                                                      attrs.get('content_type', 'image'))
+            except serializers.ValidationError as exc:
+                raise serializers.ValidationError({'content_data': exc.detail})
+        return attrs
+
+
+def _run(serializer, data):
+    """(validated_data, None) или (None, ошибки)"""
+    try:
+        return serializer.run_validation(data), None
+    except serializers.ValidationError as exc:
+        return None, exc.detail
+
+
+class MediaFiles:
+    """
+    Файлы каталога медиа импорта. Проверка (check) идет при разборе записи,
+    сохранение (store) - только для принятых записей; каждый файл
+    проверяется и сохраняется один раз. Перекодированное при проверке
+    изображение хранится (на диске) до сохранения и сохраняется без
+    повторной перекодировки; release закрывает те, что не понадобились.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root) if root else None
+        self.errors = {}  # реальный путь -> ошибка проверки (None - файл подходит)
+        self.names = {}  # реальный путь -> имя в хранилище
+        self.cleaned = {}  # реальный путь -> очищенное изображение, еще не сохраненное
+
+    def resolve(self, path):
+        if self.root is None:
+            raise ValueError('Каталог медиа для импорта не задан')
+        if not isinstance(path, str) or not path:
+            raise ValueError('Путь к файлу должен быть строкой')
+        real = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([self.root, real]) != self.root:
+            raise ValueError('Путь выходит за каталог медиа')
+        if not os.path.isfile(real):
+            raise ValueError(f'Файл не найден: {path}')
+        return real
+
+    @contextmanager
+    def _cleaned_image(self, real):
+        """Очищенное изображение (пока открыт контекст: анимация читается из исходного файла)"""
+        with open(real, 'rb') as source:
+            try:
+                cleaned = validate_image(File(source, name=os.path.basename(real)))
+            except DjangoValidationError as exc:
+                raise ValueError('; '.join(exc.messages))
+            yield cleaned
+
+    def _check_image(self, real):
+        with self._cleaned_image(real) as cleaned:
+            if isinstance(cleaned.file, tempfile.SpooledTemporaryFile):
+                # Перекодированный файл не зависит от исходного; на диск - чтобы
+                # пачка проверенных изображений не держалась в памяти
+                cleaned.file.rollover()
+                self.cleaned[real] = cleaned
+
+    def _check_pdf(self, real):
+        if os.path.getsize(real) > MAX_PDF_SIZE:
+            raise ValueError(f'Размер PDF не должен превышать {MAX_PDF_SIZE // (1024 * 1024)}MB')
+        with open(real, 'rb') as source:
+            if source.read(5) != b'%PDF-':
+                raise ValueError('Файл должен быть PDF')
+
+    def check(self, path, kind):
+        """Реальный путь к проверенному файлу (kind - 'image' или 'pdf'); ValueError, если не подходит"""
+        real = self.resolve(path)
+        if real not in self.errors:
+            try:
+                if kind == 'pdf':
+                    self._check_pdf(real)
+                else:
+                    self._check_image(real)
+                self.errors[real] = None
+            except ValueError as exc:
+                self.errors[real] = str(exc)
+        if self.errors[real]:
+            raise ValueError(self.errors[real])
+        return real
+
+    def store(self, real, kind):
+        """
+        Имя файла в хранилище. Сохраняется результат проверки; если его нет
+        (анимация или файл проверен в прошлой пачке), изображение очищается
+        заново - файл мог измениться после check.
+        """
+        if real not in self.names:
+            if kind == 'pdf':
+                self._check_pdf(real)
+                with open(real, 'rb') as source:
+                    self.names[real] = media_storage().save(os.path.basename(real), File(source))
+            elif real in self.cleaned:
+                with self.cleaned.pop(real) as cleaned:
+                    cleaned.seek(0)
+                    self.names[real] = media_storage().save(cleaned.name, cleaned)
+            else:
+                with self._cleaned_image(real) as cleaned:
+                    self.names[real] = media_storage().save(cleaned.name, cleaned)
+        return self.names[real]
+
+    def release(self):
+        """Закрывает очищенные изображения отклоненных записей"""
+        for cleaned in self.cleaned.values():
+            cleaned.close()
+        self.cleaned.clear()
+
+
+class Importer:
+    """
+    Импорт пачками. progress(stats) вызывается после каждой пачки,
+    on_error({'record': номер, 'errors': {...}}) - для каждой пропущенной записи.
+    """
+
+    def __init__(self, media_root=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False,
+                 progress=None, on_error=None):
+        self.batch_size = max(int(batch_size), 1)
+        self.dry_run = dry_run
+        self.progress = progress
+        self.on_error = on_error
+        self.media = MediaFiles(media_root)
+        self.portfolio_serializer = ImportPortfolioSerializer()
+        self.item_serializer = ImportItemSerializer()
+        self.templates = {}
+        for pk, name in Template.objects.values_list('pk', 'name').order_by('-pk'):
+            self.templates[str(pk)] = pk
+            self.templates[name] = pk
+        # email и username уже принятых записей (в базе их еще может не быть при dry_run)
+        self.emails = set()
+        self.usernames = set()
+        self.stats = {'records': 0, 'users': 0, 'portfolios': 0, 'items': 0, 'documents': 0, 'errors': 0}
+
+    def run(self, stream):
+        batch = []
+        for number, record in iter_records(stream):
+            batch.append((number, record))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.stats
+
+    def error(self, number, errors):
+        self.stats['errors'] += 1
+        if self.on_error:
+            self.on_error({'record': number, 'errors': errors})
+
+    # ---------- одна запись ----------
+
+    def build_user(self, data, errors):
+        if not isinstance(data, dict):
+            errors['user'] = 'Обязательный объект'
+            return None
+        unknown = set(data) - set(USER_FIELDS) - {'password'}
+        if unknown:
+            errors['user'] = f'Неизвестные поля: {", ".join(sorted(unknown))}'
+            return None
+        user = User(**{name: data[name] for name in USER_FIELDS if data.get(name) is not None})
+        user.email = User.objects.normalize_email(user.email)
+        password = data.get('password')
+        if password:
+            try:
+                identify_hasher(password)
+            except ValueError:
+                errors['user'] = {'password': 'Нужен хеш пароля Django, а не пароль'}
+                return None
+            user.password = password
+        else:
+            user.set_unusable_password()
+        try:
+            user.clean_fields(exclude=['last_login', 'date_joined', 'created_at', 'deleted_at'])
+        except DjangoValidationError as exc:
+            errors['user'] = exc.message_dict
+            return None
+        return user
+
+    def build_portfolio(self, data, errors, files):
+        if not isinstance(data or {}, dict):
+            errors['portfolio'] = 'Должен быть объектом'
+            return None
+        data = dict(data or {})
+        template = data.pop('template', None)
+        avatar = data.pop('avatar', None)
+        validated, field_errors = _run(self.portfolio_serializer, data)
+        field_errors = dict(field_errors or {})
+        template_id = None
+        if template not in (None, ''):
+            template_id = self.templates.get(str(template))
+            if template_id is None:
+                field_errors['template'] = f'Шаблон не найден: {template}'
+        if avatar:
+            try:
+                avatar = self.media.check(avatar, 'image')
+            except ValueError as exc:
+                field_errors['avatar'] = str(exc)
+        if field_errors:
+            errors['portfolio'] = field_errors
+            return None
+        portfolio = Portfolio(template_id=template_id, **validated)
+        if avatar:
+            files.append(('portfolio', portfolio, 'avatar', avatar))
+        return portfolio
+
+    def build_item(self, data, section, files):
+        """(PortfolioItem, None) или (None, ошибки); файлы работы добавляются в files"""
+        if not isinstance(data, dict):
+            return None, 'Должна быть объектом'
+        data = dict(data)
+        image = data.pop('image', None)
+        document = data.pop('file', None)
+        validated, field_errors = _run(self.item_serializer, data)
+        field_errors = dict(field_errors or {})
+        item = PortfolioItem(**(validated or {}))
+        item_files = []
+        if image:
+            try:
+                item_files.append((section, item, 'image', self.media.check(image, 'image')))
+            except ValueError as exc:
+                field_errors['image'] = str(exc)
+        if document:
+            if item.content_type != 'pdf':
+                field_errors['file'] = 'Файл можно прикрепить только к работе типа pdf'
+            else:
+                try:
+                    item_files.append((section, item, 'file', self.media.check(document, 'pdf')))
+                    item.processing_status = 'pending'
+                except ValueError as exc:
+                    field_errors['file'] = str(exc)
+        if field_errors:
+            return None, field_errors
+        files.extend(item_files)
+        return item, None
+
+    def build(self, number, record):
+        """
+        (user, portfolio, [items], [files]) или None, если запись с ошибкой.
+        files - (раздел, объект, поле, реальный путь): файлы проверены, но еще
+        не сохранены (см. attach_files)
+        """
+        if isinstance(record, json.JSONDecodeError):
+            self.error(number, {'json': f'Неверный JSON: {record.msg}'})
+            return None
+        if not isinstance(record, dict):
+            self.error(number, {'record': 'Запись должна быть объектом'})
+            return None
+        errors = {}
+        files = []
+        user = self.build_user(record.get('user'), errors)
+        portfolio = self.build_portfolio(record.get('portfolio'), errors, files)
+        items = []
+        raw_items = record.get('items') or []
+        if not isinstance(raw_items, list):
+            errors['items'] = 'Должен быть списком'
+            raw_items = []
+        for index, data in enumerate(raw_items):
+            section = f'items[{index}]'
+            item, item_errors = self.build_item(data, section, files)
+            if item_errors:
+                errors[section] = item_errors
+            else:
+                items.append(item)
+        if errors:
+            self.error(number, errors)
+            return None
+        return user, portfolio, items, files
+
+    def attach_files(self, number, files):
+        """Сохраняет файлы принятой записи в хранилище; False (и ошибка в отчете), если файл не подошел"""
+        errors = {}
+        for section, obj, field, real in files:
+            try:
+                setattr(obj, field, self.media.store(real, 'pdf' if field == 'file' else 'image'))
+            except ValueError as exc:
+                # Файл изменился после проверки; уже сохраненные файлы записи
+                # без ссылок удалит сборщик мусора (portfolio.media)
+                errors.setdefault(section, {})[field] = str(exc)
+        if errors:
+            self.error(number, errors)
+            return False
+        return True
+
+    # ---------- пачка ----------
+
+    def import_batch(self, batch):
+        self.stats['records'] += len(batch)
+        rows = [(number, row) for number, row in
+                ((number, self.build(number, record)) for number, record in batch) if row]
+
+        # Уникальность: одним запросом на пачку и по уже принятым записям
+        emails = {row[0].email for _, row in rows}
+        usernames = {row[0].username for _, row in rows}
+        taken_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        accepted = []
+        for number, (user, portfolio, items, files) in rows:
+            errors = {}
+            if user.email in taken_emails or user.email in self.emails:
+                errors['email'] = 'Пользователь с таким email уже существует'
+            if user.username in taken_usernames or user.username in self.usernames:
+                errors['username'] = 'Пользователь с таким username уже существует'
+            if errors:
+                self.error(number, {'user': errors})
+                continue
+            self.emails.add(user.email)
+            self.usernames.add(user.username)
+            accepted.append((number, (user, portfolio, items, files)))
+
+        try:
+            if not self.dry_run:
+                # Файлы сохраняются только для принятых записей
+                accepted = [(number, row) for number, row in accepted if self.attach_files(number, row[3])]
+                if accepted:
+                    accepted = self.save(accepted)
+        finally:
+            self.media.release()
+        self.stats['users'] += len(accepted)
+        self.stats['portfolios'] += len(accepted)
+        self.stats['items'] += sum(len(row[2]) for _, row in accepted)
+        self.stats['documents'] += sum(1 for _, row in accepted for item in row[2] if item.file)
+        if self.progress:
+            self.progress(dict(self.stats))
+
+    def save(self, accepted):
+        """
+        Сохраняет принятые записи; возвращает сохраненные. Если между проверкой
+        уникальности и вставкой такого пользователя создали параллельно
+        (регистрация), пачка откатывается и сохраняется по одной записи.
+        """
+        try:
+            self.save_rows([row for _, row in accepted])
+            return accepted
+        except IntegrityError:
+            logger.info('Конфликт при сохранении пачки импорта, сохранение по одной записи')
+        saved = []
+        for number, row in accepted:
+            user, portfolio, items, _ = row
+            # id, выданные в откатившейся транзакции, недействительны
+            for obj in (user, portfolio, *items):
+                obj.pk = None
+            try:
+                self.save_rows([row])
+            except IntegrityError:
+                self.error(number, {'user': 'Пользователь с таким email или username уже существует'})
+            else:
+                saved.append((number, row))
+        return saved
+
+    def save_rows(self, rows):
+        with transaction.atomic():
+            users = User.objects.bulk_create([row[0] for row in rows], batch_size=self.batch_size)
+            if users and users[0].pk is None:
+                # СУБД не возвращает id из bulk_create (MySQL) - читаем по email
+                ids = dict(User.objects.filter(email__in=[user.email for user in users]).values_list('email', 'pk'))
+                for user in users:
+                    user.pk = ids[user.email]
+
+            portfolios = []
+            for user, portfolio, _, _ in rows:
+                portfolio.user = user
+                portfolios.append(portfolio)
+            Portfolio.objects.bulk_create(portfolios, batch_size=self.batch_size)
+            if portfolios and portfolios[0].pk is None:
+                ids = dict(Portfolio.objects.filter(user__in=users).values_list('user_id', 'pk'))
+                for portfolio in portfolios:
+                    portfolio.pk = ids[portfolio.user_id]
+
+            items = []
+            for _, portfolio, portfolio_items, _ in rows:
+                for item in portfolio_items:
+                    item.portfolio = portfolio
+                    items.append(item)
+            PortfolioItem.objects.bulk_create(items, batch_size=self.batch_size)
+
+            rollups.bulk_created(users, portfolios, items)
+            names = [portfolio.avatar.name for portfolio in portfolios if portfolio.avatar]
+            names += [item.image.name for item in items if item.image]
+            names += [item.file.name for item in items if item.file]
+            if names:
+                transaction.on_commit(lambda: media.incref(names))
+
+
+def import_portfolios(stream, **options):
+    """Импортирует записи из потока; возвращает итоги (см. Importer)"""
+    return Importer(**options).run(stream)
+
+
+# ==================== Задания импорта (API) ====================
+
+def job_progress(job):
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'dry_run': job.dry_run,
+        'records': job.records,
+        'users': job.users,
+        'portfolios': job.portfolios,
+        'items': job.items,
+        'errors': job.error_count,
+        'error_details': job.errors,
+        'message': job.message,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def run_job(job_id, path):
+    """Выполняет задание импорта из файла path (файл удаляется после импорта)"""
+    job = ImportJob.objects.get(pk=job_id)
+    errors = []
+
+    def progress(stats):
+        ImportJob.objects.filter(pk=job_id).update(
+            records=stats['records'], users=stats['users'], portfolios=stats['portfolios'],
+            items=stats['items'], error_count=stats['errors'], errors=errors[:MAX_STORED_ERRORS])
+
+    def on_error(error):
+        if len(errors) < MAX_STORED_ERRORS:
+            errors.append(error)
+
+    ImportJob.objects.filter(pk=job_id).update(status=ImportJob.RUNNING)
+    try:
+        with open(path, 'rb') as stream:
+            import_portfolios(
+                stream,
+                media_root=getattr(settings, 'IMPORT_MEDIA_ROOT', None),
+                batch_size=getattr(settings, 'IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+                dry_run=job.dry_run, progress=progress, on_error=on_error,
+            )
+    except Exception as exc:
+        if not isinstance(exc, (ImportFileError, UnicodeDecodeError)):
+            logger.exception('Ошибка импорта портфолио (задание %s)', job_id)
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.FAILED, message=str(exc)[:500], finished_at=timezone.now())
+    else:
+        ImportJob.objects.filter(pk=job_id).update(status=ImportJob.DONE, finished_at=timezone.now())
+    finally:
+        os.remove(path)
+
+
+_import_lock = threading.Lock()
+
+
+def _run_in_thread(job_id, path):
+    # Одновременно - один импорт на процесс: пачки и так нагружают базу
+    with _import_lock:
+        try:
+            run_job(job_id, path)
+        except Exception:
+            logger.exception('Ошибка фонового импорта (задание %s)', job_id)
+        finally:
+            close_old_connections()
+
+
+def schedule_job(job_id, path):
+    """Запускает задание импорта в фоновом потоке"""
+    threading.Thread(target=_run_in_thread, args=(job_id, path),
+                     name=f'import-portfolios-{job_id}', daemon=True).start()
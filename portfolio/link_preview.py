@@ -0,0 +1,323 @@
+"""
+Превью ссылок (content_type == 'link'): заголовок, описание и картинка из
+Open Graph/Twitter-метатегов страницы.
+
+- Загрузка асинхронная с ограничением одновременных запросов (Semaphore),
+  каждый запрос - в отдельном потоке через urllib.
+- HTML разбирается потоково (HTMLParser) и чтение прекращается на </head>
+  или <body>; ограничены размер ответа, время и число редиректов.
+- Адреса во внутренней сети запрещены (проверяется фактический адрес
+  соединения, в том числе после редиректов).
+- Результаты хранятся в БД (LinkPreview) с TTL, неудачи - с коротким TTL
+  (негативный кеш). Одновременные запросы одного URL в процессе
+  выполняются один раз.
+
+Настройки: settings.LINK_PREVIEW (см. DEFAULTS).
+"""
+import asyncio
+import codecs
+import hashlib
+import http.client
+import ipaddress
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import timedelta
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import LinkPreview
+
+DEFAULTS = {
+    'TIMEOUT': 5,                   # секунд на загрузку страницы целиком
+    'MAX_BYTES': 512 * 1024,        # читаем не больше (метатеги - в начале страницы)
+    'MAX_REDIRECTS': 3,
+    'CONCURRENCY': 8,
+    'TTL': 7 * 24 * 60 * 60,
+    'NEGATIVE_TTL': 60 * 60,
+    'ALLOW_PRIVATE_NETWORKS': False,
+    'USER_AGENT': 'PortfolioBuilder-LinkPreview/1.0',
+}
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+CHUNK_SIZE = 16 * 1024
+
+
+class LinkPreviewError(Exception):
+    """Превью получить нельзя (сообщение показывается пользователю)"""
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'LINK_PREVIEW', {})}
+
+
+def normalize_url(url):
+    """URL без фрагмента; только http/https"""
+    if not isinstance(url, str) or len(url) > 2048:
+        raise LinkPreviewError('Неверный URL')
+    parts = urlsplit(url.strip())
+    if parts.scheme.lower() not in ('http', 'https') or not parts.hostname:
+        raise LinkPreviewError('Поддерживаются только ссылки http и https')
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, ''))
+
+
+def url_hash(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+# ==================== Загрузка ====================
+
+def _check_address(address, config):
+    if config['ALLOW_PRIVATE_NETWORKS']:
+        return
+    ip = ipaddress.ip_address(address.split('%')[0])
+    if not ip.is_global:
+        raise LinkPreviewError('Ссылки на адреса во внутренней сети не поддерживаются')
+
+
+def _safe_connection(base, config):
+    class SafeConnection(base):
+        # Проверяем адрес уже установленного соединения: DNS мог вернуть другой адрес
+        def connect(self):
+            super().connect()
+            try:
+                _check_address(self.sock.getpeername()[0], config)
+            except LinkPreviewError:
+                self.close()
+                raise
+    return SafeConnection
+
+
+def _build_opener(config):
+    http_connection = _safe_connection(http.client.HTTPConnection, config)
+    https_connection = _safe_connection(http.client.HTTPSConnection, config)
+
+    class SafeHTTPHandler(urllib.request.HTTPHandler):
+        def http_open(self, req):
+            return self.do_open(http_connection, req)
+
+    class SafeHTTPSHandler(urllib.request.HTTPSHandler):
+        def https_open(self, req):
+            return self.do_open(https_connection, req, context=self._context)
+
+    class LimitedRedirectHandler(urllib.request.HTTPRedirectHandler):
+        max_redirections = config['MAX_REDIRECTS']
+
+        def redirect_request(self, req, fp, code, msg, headers, newurl):
+            normalize_url(newurl)
+            return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+    return urllib.request.build_opener(SafeHTTPHandler, SafeHTTPSHandler, LimitedRedirectHandler)
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class MetaParser(HTMLParser):
+    """Собирает <title> и <meta> из <head>; останавливается на </head> или <body>"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta = {}
+        self.title = []
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            raise _StopParsing
+        if tag == 'title':
+            self._in_title = True
+        elif tag == 'meta':
+            attrs = dict(attrs)
+            key = (attrs.get('property') or attrs.get('name') or '').strip().lower()
+            content = (attrs.get('content') or '').strip()
+            if key and content and key not in self.meta:
+                self.meta[key] = content[:1000]
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+        elif tag == 'head':
+            raise _StopParsing
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title.append(data)
+
+    def result(self, base_url):
+        meta = self.meta
+        title = meta.get('og:title') or meta.get('twitter:title') or ''.join(self.title).strip()
+        description = meta.get('og:description') or meta.get('twitter:description') or meta.get('description', '')
+        image = meta.get('og:image') or meta.get('og:image:url') or meta.get('twitter:image') or ''
+        if image:
+            image = urljoin(base_url, image)
+            if urlsplit(image).scheme not in ('http', 'https'):
+                image = ''
+        return {
+            'url': base_url,
+            'title': title[:300],
+            'description': description[:1000],
+            'image': image,
+            'site_name': meta.get('og:site_name', '')[:200],
+        }
+
+
+def fetch_preview(url, config=None):
+    """Синхронная загрузка метаданных одной страницы"""
+    config = config or get_config()
+    deadline = time.monotonic() + config['TIMEOUT']
+    request = urllib.request.Request(url, headers={
+        'User-Agent': config['USER_AGENT'],
+        'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.1',
+    })
+    try:
+        response = _build_opener(config).open(request, timeout=config['TIMEOUT'])
+    except urllib.error.HTTPError as exc:
+        raise LinkPreviewError(f'Страница вернула ошибку {exc.code}')
+    except urllib.error.URLError as exc:
+        if isinstance(exc.reason, LinkPreviewError):
+            raise exc.reason
+        raise LinkPreviewError('Не удалось открыть страницу')
+
+    with response:
+        final_url = response.geturl()
+        content_type = response.headers.get_content_type()
+        if content_type not in HTML_CONTENT_TYPES:
+            # Не HTML (PDF, картинка): превью из адреса
+            return {'url': final_url, 'title': urlsplit(final_url).hostname, 'description': '',
+                    'image': final_url if content_type.startswith('image/') else '', 'site_name': ''}
+
+        charset = response.headers.get_content_charset() or 'utf-8'
+        try:
+            decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+        except LookupError:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        parser = MetaParser()
+        received = 0
+        try:
+            while received < config['MAX_BYTES'] and time.monotonic() < deadline:
+                chunk = response.read(min(CHUNK_SIZE, config['MAX_BYTES'] - received))
+                if not chunk:
+                    break
+                received += len(chunk)
+                parser.feed(decoder.decode(chunk))
+        except _StopParsing:
+            pass
+        except (socket.timeout, TimeoutError):
+            # Используем то, что успели получить
+            pass
+    return parser.result(final_url)
+
+
+async def fetch_many(urls, config=None):
+    """[(url, ok, data)] для списка URL; не больше CONCURRENCY одновременных запросов"""
+    config = config or get_config()
+    semaphore = asyncio.Semaphore(config['CONCURRENCY'])
+
+    async def fetch_one(url):
+        async with semaphore:
+            try:
+                data = await asyncio.wait_for(asyncio.to_thread(fetch_preview, url, config),
+                                              timeout=config['TIMEOUT'] + 1)
+                return url, True, data
+            except LinkPreviewError as exc:
+                return url, False, {'error': str(exc)}
+            except (asyncio.TimeoutError, OSError, ValueError, http.client.HTTPException):
+                return url, False, {'error': 'Не удалось получить превью'}
+
+    return await asyncio.gather(*(fetch_one(url) for url in dict.fromkeys(urls)))
+
+
+# ==================== Кеш ====================
+
+# Блокировки по частям пространства хешей: один URL в процессе загружается один раз
+_LOCK_STRIPES = [threading.Lock() for _ in range(64)]
+
+
+def _stripes(hashes):
+    return sorted({int(value[:8], 16) % len(_LOCK_STRIPES) for value in hashes})
+
+
+def _cached(hashes):
+    return {
+        preview.url_hash: preview
+        for preview in LinkPreview.objects.filter(url_hash__in=hashes, expires_at__gt=timezone.now())
+    }
+
+
+def get_previews(urls, force=False):
+    """
+    {url: (ok, data)} для нормализованных URL: из кеша или из сети.
+    Недопустимые URL возвращаются как (False, {'error': ...}) без запросов.
+    """
+    config = get_config()
+    results = {}
+    by_hash = {}
+    for url in urls:
+        try:
+            normalized = normalize_url(url)
+        except LinkPreviewError as exc:
+            results[url] = (False, {'error': str(exc)})
+            continue
+        by_hash[url_hash(normalized)] = normalized
+
+    cached = {} if force else _cached(list(by_hash))
+    missing = [value for value in by_hash if value not in cached]
+    if missing:
+        stripes = _stripes(missing)
+        for stripe in stripes:
+            _LOCK_STRIPES[stripe].acquire()
+        try:
+            # Пока ждали блокировку, URL мог загрузить другой поток
+            if not force:
+                cached.update(_cached(missing))
+            to_fetch = [by_hash[value] for value in missing if value not in cached]
+            if to_fetch:
+                # Синхронные view работают в потоке без своего цикла событий
+                fetched = asyncio.run(fetch_many(to_fetch, config))
+                now = timezone.now()
+                for url, ok, data in fetched:
+                    ttl = config['TTL'] if ok else config['NEGATIVE_TTL']
+                    cached[url_hash(url)], _ = LinkPreview.objects.update_or_create(
+                        url_hash=url_hash(url),
+                        defaults={'url': url, 'ok': ok, 'data': data, 'expires_at': now + timedelta(seconds=ttl)},
+                    )
+        finally:
+            for stripe in stripes:
+                _LOCK_STRIPES[stripe].release()
+
+    for value, url in by_hash.items():
+        preview = cached[value]
+        results[url] = (preview.ok, preview.data)
+    return results
+
+
+def get_preview(url, force=False):
+    """Метаданные одной ссылки; LinkPreviewError, если получить их не удалось"""
+    normalized = normalize_url(url)
+    ok, data = get_previews([normalized], force=force)[normalized]
+    if not ok:
+        raise LinkPreviewError(data.get('error') or 'Не удалось получить превью')
+    return data
+
+
+def apply_to_content_data(content_data, preview):
+    """content_data работы-ссылки в формате редактора"""
+    content_data = dict(content_data or {})
+    content_data.update({
+        'url': content_data.get('url') or preview['url'],
+        'title': preview['title'],
+        'description': preview['description'],
+        'preview': {
+            'image': preview['image'],
+            'title': preview['title'],
+            'description': preview['description'],
+        },
+    })
+    return content_data
@@ -0,0 +1,86 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from portfolio.models import Portfolio, PortfolioItem
+from portfolio.readers import get_read_plan
+from portfolio.serializers import PortfolioSerializer
+from portfolio_builder.renderers import FastJSONRenderer, orjson
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость сериализации портфолио: DRF + json и план полей + orjson'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=200, help='Число работ в тестовом портфолио')
+        parser.add_argument('--repeat', type=int, default=20, help='Число повторов каждого замера')
+
+    def handle(self, *args, **options):
+        items, repeat = options['items'], options['repeat']
+        # Тестовые данные создаются в транзакции и откатываются
+        try:
+            with transaction.atomic():
+                portfolio = self._create_portfolio(items)
+                results = self._measure(portfolio, repeat)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        baseline = results[0][1]
+        self.stdout.write(f'Работ: {items}, повторов: {repeat}, orjson: {"да" if orjson else "нет"}')
+        for name, seconds in results:
+            per_item = seconds / repeat / items * 1e6
+            self.stdout.write(f'{name:<32} {seconds / repeat * 1000:8.2f} мс/запрос '
+                              f'{per_item:8.1f} мкс/работа  x{baseline / seconds:.1f}')
+
+    def _create_portfolio(self, items):
+        user = User.objects.create(email='benchmark@example.invalid', username='benchmark-serializers')
+        portfolio = Portfolio.objects.create(
+            user=user, name='Benchmark',
+            skills=[{'name': f'Навык {i}', 'level': i % 5} for i in range(30)],
+            experience=[{'company': f'Компания {i}', 'position': 'Разработчик', 'description': 'x' * 500}
+                        for i in range(10)],
+            design_settings={'font': 'Inter', 'blocks': [{'type': 'hero', 'options': {'size': i}} for i in range(20)]},
+        )
+        PortfolioItem.objects.bulk_create([
+            PortfolioItem(
+                portfolio=portfolio, title=f'Работа {i}', description='Описание ' * 20, order=i,
+                content_type='text', content_data={'text': 'Текст ' * 50, 'meta': {'n': i}},
+                category='web', tags=['django', 'drf', str(i)],
+            )
+            for i in range(items)
+        ])
+        return portfolio
+
+    def _measure(self, portfolio, repeat):
+        def drf():
+            instance = Portfolio.objects.prefetch_related('items').get(pk=portfolio.pk)
+            return JSONRenderer().render(PortfolioSerializer(instance).data)
+
+        def drf_orjson():
+            instance = Portfolio.objects.prefetch_related('items').get(pk=portfolio.pk)
+            return FastJSONRenderer().render(PortfolioSerializer(instance).data)
+
+        def fast():
+            plan = get_read_plan(PortfolioSerializer)
+            return FastJSONRenderer().render(plan.read(Portfolio.objects.filter(pk=portfolio.pk))[0])
+
+        results = []
+        for name, func in (('DRF ModelSerializer + json', drf),
+                           ('DRF ModelSerializer + orjson', drf_orjson),
+                           ('values() plan + orjson', fast)):
+            func()  # прогрев
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            results.append((name, time.perf_counter() - start))
+        return results
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from portfolio import read_model
+from portfolio.models import Portfolio, PortfolioDocument
+
+
+class Command(BaseCommand):
+    help = 'Сверяет документы портфолио (portfolio.read_model) с текущими данными'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Пересобрать отсутствующие и устаревшие документы')
+        parser.add_argument('--batch-size', type=int, default=500, help='Сколько портфолио читать за раз')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = missing = stale = 0
+        last_pk = 0
+        while True:
+            ids = list(Portfolio.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_pk = ids[-1]
+            stored = dict(PortfolioDocument.objects.filter(portfolio_id__in=ids).values_list('portfolio_id', 'body'))
+            for portfolio_id in ids:
+                checked += 1
+                if portfolio_id not in stored:
+                    # Допустимо (соберется при первом чтении), --fix собирает сразу
+                    missing += 1
+                elif stored[portfolio_id] != read_model.render_document(portfolio_id):
+                    stale += 1
+                    self.stdout.write(self.style.WARNING(f'Устаревший документ: портфолио {portfolio_id}'))
+                else:
+                    continue
+                if options['fix']:
+                    read_model.build(portfolio_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено: {checked}, без документа: {missing}, устаревших: {stale}'
+        ))
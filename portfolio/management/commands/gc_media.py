@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from portfolio import media
+
+
+class Command(BaseCommand):
+    help = 'Удаляет медиафайлы, на которые не ссылается ни одна запись'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Пересчитать счетчики ссылок по данным в БД перед очисткой')
+        parser.add_argument('--grace', type=int, default=None,
+                            help='Не удалять файлы, загруженные меньше указанного числа секунд назад')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет удалено')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        with transaction.atomic():
+            if options['rebuild']:
+                stats = media.rebuild_ref_counts()
+                self.stdout.write(
+                    f"Зарегистрировано файлов: {stats['registered']}, "
+                    f"{'нужно исправить' if dry_run else 'исправлено'} счетчиков: {stats['recounted']}"
+                )
+            if dry_run:
+                deleted, freed = media.collect_garbage(grace_period=options['grace'], dry_run=True)
+                # --dry-run ничего не меняет: пересчет (--rebuild) только для отчета
+                transaction.set_rollback(True)
+        if not dry_run:
+            # Вне транзакции: файлы удаляются после коммита удаления записи
+            deleted, freed = media.collect_garbage(grace_period=options['grace'])
+        verb = 'Будет удалено' if dry_run else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(f'{verb} файлов: {deleted} ({freed / (1024 * 1024):.1f} MB)'))
@@ -0,0 +1,65 @@
+import json
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.importer import DEFAULT_BATCH_SIZE, ImportFileError, import_portfolios
+
+
+class Command(BaseCommand):
+    help = 'Импортирует пользователей с портфолио и работами из NDJSON или JSON-массива'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл импорта ("-" - стандартный ввод)')
+        parser.add_argument('--media-dir', default=getattr(settings, 'IMPORT_MEDIA_ROOT', None),
+                            help='Каталог с файлами, на которые ссылаются записи (avatar, image, file)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Сколько записей проверять и сохранять одной транзакцией')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить, ничего не сохранять')
+        parser.add_argument('--errors-file', help='Записать ошибки в файл (NDJSON)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        errors_file = open(options['errors_file'], 'w', encoding='utf-8') if options['errors_file'] else None
+        shown = 0
+
+        def on_error(error):
+            nonlocal shown
+            if errors_file:
+                errors_file.write(json.dumps(error, ensure_ascii=False) + '\n')
+            elif shown < 20:
+                shown += 1
+                self.stderr.write(f"Запись {error['record']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+
+        def progress(stats):
+            rate = stats['records'] / max(time.monotonic() - started, 0.001)
+            self.stdout.write(
+                f"Записей: {stats['records']}, портфолио: {stats['portfolios']}, работ: {stats['items']}, "
+                f"ошибок: {stats['errors']} ({rate:.0f} записей/с)"
+            )
+
+        stream = sys.stdin.buffer if options['path'] == '-' else open(options['path'], 'rb')
+        try:
+            stats = import_portfolios(
+                stream, media_root=options['media_dir'], batch_size=options['batch_size'],
+                dry_run=options['dry_run'], progress=progress, on_error=on_error,
+            )
+        except (ImportFileError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+            if errors_file:
+                errors_file.close()
+
+        verb = 'Проверено' if options['dry_run'] else 'Импортировано'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} за {time.monotonic() - started:.1f} с: пользователей и портфолио: {stats['portfolios']}, "
+            f"работ: {stats['items']}, пропущено записей с ошибками: {stats['errors']}"
+        ))
+        if stats['documents'] and not options['dry_run']:
+            self.stdout.write(f"PDF в очереди: {stats['documents']} (python manage.py process_documents)")
+        if stats['errors'] and not errors_file and shown < stats['errors']:
+            self.stdout.write('Полный список ошибок: --errors-file')
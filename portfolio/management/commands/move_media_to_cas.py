@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from portfolio import media
+
+
+class Command(BaseCommand):
+    help = 'Переносит файлы, загруженные до хранилища по хешу содержимого, в cas/ (одинаковые - в один файл)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать, ничего не переносить')
+        parser.add_argument('--batch-size', type=int, default=500, help='Записей в одной транзакции')
+
+    def handle(self, *args, **options):
+        stats = media.move_to_cas(dry_run=options['dry_run'], batch_size=options['batch_size'])
+        for name in stats['missing']:
+            self.stderr.write(f'  файл не найден: {name}')
+        verb = 'Будет перенесено' if options['dry_run'] else 'Перенесено'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} файлов: {stats['files']} (записей: {stats['rows']}); "
+            f"записано в cas/ {stats['stored'] / (1024 * 1024):.1f} MB, "
+            f"освобождено {stats['freed'] / (1024 * 1024):.1f} MB"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from portfolio import documents
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает PDF-работы в очереди: страницы, текст для поиска, миниатюра'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Обработать не больше указанного числа работ')
+
+    def handle(self, *args, **options):
+        if not documents.can_process():
+            raise CommandError('Не установлена библиотека для PDF: pip install pypdf (или PyMuPDF)')
+        processed, failed = documents.process_pending(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Обработано: {processed}, с ошибкой: {failed}'))
@@ -0,0 +1,48 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from portfolio import media
+
+
+class Command(BaseCommand):
+    help = 'Находит медиафайлы, на которые не ссылается ни одна запись, и при --delete удаляет их'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help='Удалить найденные файлы')
+        parser.add_argument('--min-age', type=int, default=None,
+                            help='Пропускать файлы моложе указанного числа секунд')
+
+    def handle(self, *args, **options):
+        min_age = options['min_age']
+        if min_age is None:
+            min_age = getattr(settings, 'MEDIA_GC_GRACE_PERIOD', 24 * 60 * 60)
+
+        # Файлы в cas/ учитываются через MediaBlob - приводим счетчики в соответствие
+        # (без --delete - только считаем: пересчет откатывается)
+        with transaction.atomic():
+            stats = media.rebuild_ref_counts()
+            orphan_blobs, orphan_blob_size = media.collect_garbage(grace_period=min_age, dry_run=True)
+            if not options['delete']:
+                transaction.set_rollback(True)
+        fixed = 'исправлено' if options['delete'] else 'нужно исправить'
+        self.stdout.write(
+            f"cas/: зарегистрировано {stats['registered']}, {fixed} счетчиков {stats['recounted']}, "
+            f"без ссылок {orphan_blobs} ({orphan_blob_size / (1024 * 1024):.1f} MB) - удалит gc_media"
+        )
+
+        storage = media.media_storage()
+        count = 0
+        total = 0
+        for name, size in media.find_unreferenced_files(min_age):
+            count += 1
+            total += size
+            self.stdout.write(f'  {name} ({size} байт)')
+            if options['delete']:
+                os.remove(storage.path(name))
+
+        verb = 'Удалено' if options['delete'] else 'Найдено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} файлов без ссылок вне cas/: {count} ({total / (1024 * 1024):.1f} MB)'
+        ))
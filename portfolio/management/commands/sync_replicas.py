@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from portfolio_builder.replicas import get_config
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную SQLite-базу в реплики (READ_REPLICAS) для локальной проверки чтения с реплик'
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        aliases = get_config()['ALIASES']
+        if primary.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite; реплики других СУБД настраиваются репликацией')
+        if not aliases:
+            raise CommandError('Реплики не настроены (READ_REPLICAS["ALIASES"])')
+
+        for alias in aliases:
+            replica = connections[alias]
+            if replica.vendor != 'sqlite':
+                self.stdout.write(f'{alias}: не SQLite, пропущено')
+                continue
+            source = sqlite3.connect(primary.settings_dict['NAME'])
+            target = sqlite3.connect(replica.settings_dict['NAME'])
+            try:
+                # Резервное копирование SQLite: согласованный снимок без остановки записи
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            self.stdout.write(f'{alias}: скопировано в {replica.settings_dict["NAME"]}')
+        self.stdout.write(self.style.SUCCESS('Готово'))
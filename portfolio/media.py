@@ -0,0 +1,283 @@
+"""
+Учет ссылок на файлы в хранилище с адресацией по содержимому.
+
+Счетчики MediaBlob.ref_count поддерживаются сигналами (portfolio.signals).
+Массовые операции (QuerySet.update и т.п.) сигналы не вызывают, поэтому
+gc_media --rebuild пересчитывает счетчики по фактическим данным.
+
+Файлы, загруженные до перехода на ContentAddressedStorage, переносит в cas/
+команда move_media_to_cas (move_to_cas): одинаковые файлы становятся одним.
+"""
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import Count, F, FileField, Sum
+from django.utils import timezone
+
+from portfolio_builder.storage import ContentAddressedStorage, media_storage
+from .models import GalleryImage, MediaBlob, PortfolioItem
+
+
+def file_fields():
+    """[(model, field)] для всех файловых полей проекта"""
+    result = []
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField):
+                result.append((model, field))
+    return result
+
+
+def media_fields():
+    """[(model, field)] для всех файловых полей, использующих ContentAddressedStorage"""
+    return [(model, field) for model, field in file_fields() if isinstance(field.storage, ContentAddressedStorage)]
+
+
+def _change_refs(names, delta):
+    counts = Counter(name for name in names if media_storage().is_blob(name))
+    for name, count in counts.items():
+        updated = MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + delta * count)
+        if not updated and delta > 0:
+            # Файл попал в хранилище в обход save() (например, импорт) - заводим запись
+            storage = media_storage()
+            size = storage.size(name) if storage.exists(name) else 0
+            MediaBlob.objects.get_or_create(name=name, defaults={'size': size, 'ref_count': count})
+
+
+def incref(names):
+    _change_refs(names, 1)
+
+
+def decref(names):
+    _change_refs(names, -1)
+
+
+def referenced_names(fields=None):
+    """Counter имен файлов, на которые ссылаются записи в БД (по умолчанию - только cas/)"""
+    blobs_only = fields is None
+    counts = Counter()
+    for model, field in (media_fields() if blobs_only else fields):
+        names = (model._base_manager
+                 .exclude(**{field.attname: ''})
+                 .exclude(**{f'{field.attname}__isnull': True})
+                 .values_list(field.attname, flat=True)
+                 .iterator(chunk_size=2000))
+        counts.update(name for name in names if not blobs_only or media_storage().is_blob(name))
+    return counts
+
+
+def find_unreferenced_files(min_age=0):
+    """
+    Файлы в MEDIA_ROOT вне cas/, на которые не ссылается ни одна запись
+    (остались после удаления записей до перехода на ContentAddressedStorage).
+    Файлы моложе min_age секунд пропускаются: их запись могла еще не сохраниться.
+    """
+    storage = media_storage()
+    referenced = set(referenced_names(file_fields()))
+    cutoff = timezone.now().timestamp() - min_age
+    for dirpath, dirnames, filenames in os.walk(storage.location):
+        rel_dir = os.path.relpath(dirpath, storage.location).replace(os.sep, '/')
+        if rel_dir == storage.prefix or rel_dir.startswith(storage.prefix + '/'):
+            dirnames[:] = []
+            continue
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            if name not in referenced and os.path.getmtime(path) < cutoff:
+                yield name, os.path.getsize(path)
+
+
+@transaction.atomic
+def rebuild_ref_counts():
+    """Пересчитывает ref_count по данным и регистрирует файлы на диске без записи MediaBlob"""
+    storage = media_storage()
+    counts = referenced_names()
+
+    known = set(MediaBlob.objects.values_list('name', flat=True))
+    root = storage.path(storage.prefix)
+    new_blobs = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in ('tmp', storage.lock_dir)]
+        for filename in filenames:
+            name = os.path.relpath(os.path.join(dirpath, filename), storage.location).replace(os.sep, '/')
+            if name not in known:
+                new_blobs.append(MediaBlob(name=name, size=os.path.getsize(os.path.join(dirpath, filename))))
+    MediaBlob.objects.bulk_create(new_blobs, batch_size=1000, ignore_conflicts=True)
+
+    to_update = []
+    for blob in MediaBlob.objects.only('id', 'name', 'ref_count').iterator(chunk_size=2000):
+        actual = counts.get(blob.name, 0)
+        if blob.ref_count != actual:
+            blob.ref_count = actual
+            to_update.append(blob)
+    for start in range(0, len(to_update), 1000):
+        MediaBlob.objects.bulk_update(to_update[start:start + 1000], ['ref_count'])
+    return {'registered': len(new_blobs), 'recounted': len(to_update)}
+
+
+def _collect_blob(storage, pk, name, cutoff):
+    """
+    Удаляет запись и файл без ссылок под блокировкой имени (см. ContentAddressedStorage.lock).
+    False, если файл снова используется или запись занята транзакцией сохранения.
+    """
+    with storage.lock(name):
+        try:
+            with transaction.atomic():
+                # Повторная проверка: файл могли загрузить заново. Запись, которую
+                # сейчас обновляет сохранение, не ждем (skip_locked) - пропускаем
+                claimed = (MediaBlob.objects.select_for_update(skip_locked=True)
+                           .filter(pk=pk, ref_count__lte=0, updated_at__lt=cutoff)
+                           .values_list('pk', flat=True).first())
+                if claimed is None:
+                    return False
+                MediaBlob.objects.filter(pk=pk).delete()
+        except OperationalError:
+            # SQLite: база занята транзакцией, которая сохраняет файлы - в следующий раз
+            return False
+        # Файл - после коммита и под той же блокировкой: сохранение того же
+        # содержимого дождется удаления и запишет файл заново
+        try:
+            os.remove(storage.path(name))
+        except FileNotFoundError:
+            pass
+    return True
+
+
+def collect_garbage(grace_period=None, dry_run=False, batch_size=500):
+    """
+    Удаляет файлы без ссылок, которые не загружались повторно дольше grace_period.
+    Возвращает (число файлов, освобождено байт).
+    """
+    if grace_period is None:
+        grace_period = getattr(settings, 'MEDIA_GC_GRACE_PERIOD', 24 * 60 * 60)
+    storage = media_storage()
+    cutoff = timezone.now() - timedelta(seconds=grace_period)
+    orphans = MediaBlob.objects.filter(ref_count__lte=0, updated_at__lt=cutoff).order_by('pk')
+
+    if dry_run:
+        totals = orphans.aggregate(count=Count('id'), size=Sum('size'))
+        return totals['count'], totals['size'] or 0
+
+    deleted = 0
+    freed = 0
+    last_pk = 0
+    while True:
+        batch = list(orphans.filter(pk__gt=last_pk).values_list('pk', 'name', 'size')[:batch_size])
+        if not batch:
+            break
+        for pk, name, size in batch:
+            if _collect_blob(storage, pk, name, cutoff):
+                deleted += 1
+                freed += size
+        last_pk = batch[-1][0]
+
+    # Временные файлы прерванных загрузок
+    tmp_dir = storage.path(os.path.join(storage.prefix, 'tmp'))
+    if os.path.isdir(tmp_dir):
+        for filename in os.listdir(tmp_dir):
+            path = os.path.join(tmp_dir, filename)
+            if os.path.getmtime(path) < cutoff.timestamp():
+                os.remove(path)
+    return deleted, freed
+
+
+# ==================== Перенос старых файлов в cas/ ====================
+
+def _replace_urls(value, urls):
+    """value (JSON) с замененными URL файлов"""
+    if isinstance(value, str):
+        return urls.get(value, value)
+    if isinstance(value, list):
+        return [_replace_urls(element, urls) for element in value]
+    if isinstance(value, dict):
+        return {key: _replace_urls(element, urls) for key, element in value.items()}
+    return value
+
+
+def move_to_cas(dry_run=False, batch_size=500):
+    """
+    Переносит файлы вне cas/, на которые ссылаются поля с ContentAddressedStorage,
+    в хранилище по содержимому: файл сохраняется под хешем, поле переназначается
+    (через save() - счетчики ссылок и документы для чтения обновляют сигналы),
+    URL в content_data работ заменяются, старый файл удаляется, когда на него
+    больше никто не ссылается. Повторный запуск продолжает с оставшихся записей.
+
+    Возвращает {'files', 'rows', 'missing', 'freed', 'stored'}: перенесено
+    файлов и записей, имена отсутствующих файлов, освобождено и записано байт.
+    При dry_run ничего не меняется, только считаются хеши.
+    """
+    storage = media_storage()
+    moved = {}  # старое имя -> имя в cas/ (None - файла нет)
+    new_blobs = set()
+    stats = {'files': 0, 'rows': 0, 'missing': [], 'freed': 0, 'stored': 0}
+
+    def blob_name(name):
+        if name not in moved:
+            if not storage.exists(name):
+                stats['missing'].append(name)
+                moved[name] = None
+                return None
+            with storage.open(name) as source:
+                target = storage.content_name(name, source)
+                if target not in new_blobs and not storage.exists(target):
+                    stats['stored'] += source.size
+                if not dry_run:
+                    target = storage.save(name, source)
+            new_blobs.add(target)
+            moved[name] = target
+            stats['files'] += 1
+        return moved[name]
+
+    for model, field in media_fields():
+        attname = field.attname
+        rows = (model._base_manager
+                .exclude(**{f'{attname}__startswith': storage.prefix + '/'})
+                .exclude(**{attname: ''})
+                .exclude(**{f'{attname}__isnull': True})
+                .order_by('pk'))
+        last_pk = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk).values_list('pk', attname)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            targets = {pk: blob_name(name) for pk, name in batch}
+            if dry_run:
+                stats['rows'] += sum(1 for target in targets.values() if target)
+                continue
+            with transaction.atomic():
+                galleries = set()
+                for instance in model._base_manager.select_for_update().filter(pk__in=list(targets)):
+                    old_name = getattr(instance, attname).name
+                    target = targets[instance.pk]
+                    if not target or moved.get(old_name) != target:
+                        # Файла нет или поле изменили после выборки
+                        continue
+                    old_url = getattr(instance, attname).url
+                    setattr(instance, attname, target)
+                    update_fields = [field.name]
+                    if isinstance(instance, PortfolioItem):
+                        instance.content_data = _replace_urls(instance.content_data,
+                                                              {old_url: getattr(instance, attname).url})
+                        update_fields.append('content_data')
+                    instance.save(update_fields=update_fields)
+                    if isinstance(instance, GalleryImage):
+                        galleries.add(instance.item_id)
+                    stats['rows'] += 1
+                for item in PortfolioItem.objects.filter(pk__in=galleries):
+                    item.sync_gallery()
+
+    if not dry_run:
+        # Новых ссылок на старые имена не появляется: загрузки идут в cas/
+        referenced = referenced_names(file_fields())
+        for name, target in moved.items():
+            if target and name not in referenced and storage.exists(name):
+                stats['freed'] += storage.size(name)
+                storage.delete(name)
+    else:
+        stats['freed'] = sum(storage.size(name) for name, target in moved.items() if target)
+    return stats
@@ -1,36 +1,61 @@
-from django.shortcuts import redirect
-from django.urls import reverse
+import re
 
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.utils.cache import patch_cache_control
+
+# Имена вида editor.bundle.3f2a9c1b7d4e.js (ManifestStaticFilesStorage добавляет 12 hex-символов)
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[A-Za-z0-9]+$')
+
+
+class StaticCacheControlMiddleware:
+    """Заголовки кеширования для статики: файлы с хешем в имени кешируются "навсегда" """
 
-class AuthRequiredMiddleware:
-    """Middleware для проверки авторизации на всех страницах, кроме страниц входа/регистрации"""
-    
     def __init__(self, get_response):
         self.get_response = get_response
-        self.exempt_paths = [
-            '/auth/login/',
-            '/auth/register/',
-            '/api/auth/login/',
-            '/api/auth/register/',
-        ]
+        self.static_url = settings.STATIC_URL
+        self.max_age = getattr(settings, 'STATIC_IMMUTABLE_MAX_AGE', 365 * 24 * 60 * 60)
 
     def __call__(self, request):
-        if not request.user.is_authenticated:
-            path = request.path
-            # Пропускаем статические файлы, медиа, админку и API
-            if (path.startswith('/static/') or 
-                path.startswith('/media/') or 
-                path.startswith('/admin/') or
-                path.startswith('/api/')):
-                response = self.get_response(request)
-                return response
-            
-            # Проверяем, не является ли путь исключением
-            if not any(path.startswith(exempt) for exempt in self.exempt_paths):
-                # Перенаправляем на страницу входа только если это не исключение
-                if path != '/auth/login/' and path != '/auth/register/':
-                    return redirect('/auth/login/')
-        
         response = self.get_response(request)
+        path = request.path_info
+        if path.startswith(self.static_url) and response.status_code in (200, 304):
+            if HASHED_NAME_RE.search(path):
+                patch_cache_control(response, public=True, max_age=self.max_age, immutable=True)
+            else:
+                # Без хеша содержимое может измениться - только с ревалидацией
+                patch_cache_control(response, public=True, no_cache=True)
         return response
 
+
+class AuthRequiredMiddleware:
+    """
+    Требует входа на всех HTML-страницах, кроме страниц входа/регистрации.
+
+    Путь сначала классифицируется одним скомпилированным регулярным выражением
+    по префиксам (статика, медиа, API, админка) и множеству точных путей;
+    request.user (сессия и пользователь из БД) загружается только для
+    защищенных страниц. Настройки: settings.AUTH_REQUIRED.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = {
+            'PUBLIC_PREFIXES': [settings.STATIC_URL, settings.MEDIA_URL, '/admin/', '/api/', '/auth/api/'],
+            'EXEMPT_PATHS': ['/auth/login/', '/auth/register/'],
+            'LOGIN_URL': settings.LOGIN_URL,
+            **getattr(settings, 'AUTH_REQUIRED', {}),
+        }
+        prefixes = sorted({prefix for prefix in config['PUBLIC_PREFIXES'] if prefix}, key=len, reverse=True)
+        self.public_match = re.compile('|'.join(re.escape(prefix) for prefix in prefixes)).match if prefixes else None
+        self.exempt_paths = frozenset(config['EXEMPT_PATHS'])
+        self.login_url = config['LOGIN_URL']
+
+    def is_public(self, path):
+        return path in self.exempt_paths or (self.public_match is not None and self.public_match(path) is not None)
+
+    def __call__(self, request):
+        path = request.path_info
+        if path != self.login_url and not self.is_public(path) and not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), self.login_url)
+        return self.get_response(request)
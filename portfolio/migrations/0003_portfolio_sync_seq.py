@@ -0,0 +1,17 @@
+# Generated manually
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0002_extend_portfolio_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolio',
+            name='sync_seq',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
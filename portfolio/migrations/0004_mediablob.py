@@ -0,0 +1,40 @@
+# Generated manually
+from django.db import migrations, models
+import portfolio_builder.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0003_portfolio_sync_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField(default=0)),
+                ('ref_count', models.IntegerField(db_index=True, default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        # Существующие файлы остаются на прежних путях, новые загрузки - в cas/
+        migrations.AlterField(
+            model_name='portfolio',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=portfolio_builder.storage.media_storage, upload_to='avatars/'),
+        ),
+        migrations.AlterField(
+            model_name='portfolioitem',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=portfolio_builder.storage.media_storage, upload_to='portfolio_items/'),
+        ),
+        migrations.AlterField(
+            model_name='template',
+            name='preview_image',
+            field=models.ImageField(blank=True, null=True, storage=portfolio_builder.storage.media_storage, upload_to='templates/'),
+        ),
+    ]
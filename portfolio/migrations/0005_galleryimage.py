@@ -0,0 +1,104 @@
+# Generated manually
+import base64
+import binascii
+import hashlib
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import migrations, models
+from django.db.models import F
+import django.db.models.deletion
+import portfolio_builder.storage
+from portfolio_builder.uploads import validate_image
+
+# Только растровые форматы: SVG из /media/ на том же домене выполнил бы скрипты
+DATA_URL_RE = re.compile(r'^data:image/(?:png|jpe?g|gif|webp);base64,(?P<data>.+)$', re.S | re.I)
+
+
+def store_blob(MediaBlob, content):
+    """
+    Сохраняет файл по хешу содержимого (схема имен ContentAddressedStorage) и
+    увеличивает счетчик ссылок; возвращает (имя, URL). Живое хранилище не
+    используется: оно регистрирует файлы через текущую, а не историческую
+    модель MediaBlob.
+    """
+    data = content.read()
+    ext = posixpath.splitext(content.name)[1]
+    digest = hashlib.sha256(data).hexdigest()
+    name = posixpath.join('cas', digest[:2], digest[2:4], f'{digest}{ext}')
+    storage = FileSystemStorage(location=settings.MEDIA_ROOT)
+    if not storage.exists(name):
+        storage.save(name, ContentFile(data))
+    MediaBlob.objects.get_or_create(name=name, defaults={'size': len(data)})
+    MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+    return name, storage.url(name)
+
+
+def extract_base64_images(apps, schema_editor):
+    """
+    Переносит data:-URL из content_data галерей в файлы GalleryImage.
+    Изображение проверяется и очищается как при загрузке (validate_image);
+    неподходящие (SVG, поврежденные, слишком большие) остаются в content_data как есть.
+    """
+    PortfolioItem = apps.get_model('portfolio', 'PortfolioItem')
+    GalleryImage = apps.get_model('portfolio', 'GalleryImage')
+    MediaBlob = apps.get_model('portfolio', 'MediaBlob')
+
+    item_ids = list(PortfolioItem.objects.filter(content_type='gallery').values_list('pk', flat=True))
+    for item_id in item_ids:
+        item = PortfolioItem.objects.get(pk=item_id)
+        content_data = item.content_data if isinstance(item.content_data, dict) else {}
+        images = content_data.get('images')
+        if not isinstance(images, list):
+            continue
+
+        urls = []
+        changed = False
+        for order, src in enumerate(images):
+            match = DATA_URL_RE.match(src) if isinstance(src, str) else None
+            if not match:
+                urls.append(src)
+                continue
+            try:
+                data = base64.b64decode(match.group('data'), validate=False)
+                cleaned = validate_image(ContentFile(data, name='gallery'))
+            except (binascii.Error, ValueError, ValidationError):
+                urls.append(src)
+                continue
+            name, url = store_blob(MediaBlob, cleaned)
+            GalleryImage.objects.create(item_id=item_id, order=order, image=name)
+            urls.append(url)
+            changed = True
+
+        if changed:
+            content_data['images'] = urls
+            content_data.pop('imageFiles', None)
+            PortfolioItem.objects.filter(pk=item_id).update(content_data=content_data)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0004_mediablob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GalleryImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(storage=portfolio_builder.storage.media_storage, upload_to='gallery/')),
+                ('order', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gallery_images', to='portfolio.portfolioitem')),
+            ],
+            options={
+                'ordering': ['order', 'id'],
+            },
+        ),
+        migrations.RunPython(extract_base64_images, migrations.RunPython.noop),
+    ]
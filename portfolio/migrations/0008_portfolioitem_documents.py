@@ -0,0 +1,33 @@
+# Generated manually
+from django.db import migrations, models
+import portfolio_builder.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0007_linkpreview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolioitem',
+            name='file',
+            field=models.FileField(blank=True, storage=portfolio_builder.storage.media_storage, upload_to='documents/'),
+        ),
+        migrations.AddField(
+            model_name='portfolioitem',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, storage=portfolio_builder.storage.media_storage, upload_to='thumbnails/'),
+        ),
+        migrations.AddField(
+            model_name='portfolioitem',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False, help_text='Текст документа для поиска'),
+        ),
+        migrations.AddField(
+            model_name='portfolioitem',
+            name='processing_status',
+            field=models.CharField(blank=True, choices=[('', 'Не требуется'), ('pending', 'В очереди'), ('done', 'Обработан'), ('failed', 'Ошибка')], db_index=True, default='', editable=False, max_length=10),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated manually
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0008_portfolioitem_documents'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioDocument',
+            fields=[
+                ('portfolio', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True,
+                                                   related_name='document', serialize=False,
+                                                   to='portfolio.portfolio')),
+                ('body', models.TextField()),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE,
+                                              related_name='portfolio_document', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated manually
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0011_importjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='portfolioitem',
+            name='processing_status',
+            field=models.CharField(blank=True, choices=[('', 'Не требуется'), ('pending', 'В очереди'), ('processing', 'Обрабатывается'), ('done', 'Обработан'), ('failed', 'Ошибка')], db_index=True, default='', editable=False, max_length=10),
+        ),
+    ]
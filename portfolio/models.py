@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from portfolio_builder.storage import media_storage
 import json
 
 User = get_user_model()
@@ -8,7 +9,7 @@ User = get_user_model()
 class Template(models.Model):
     """Шаблон портфолио"""
     name = models.CharField(max_length=100)
-    preview_image = models.ImageField(upload_to='templates/', blank=True, null=True)
+    preview_image = models.ImageField(upload_to='templates/', storage=media_storage, blank=True, null=True)
     config = models.JSONField(default=dict, help_text="JSON конфигурация шаблона")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -24,7 +25,7 @@ class Portfolio(models.Model):
     description = models.TextField(blank=True)
     template = models.ForeignKey(Template, on_delete=models.SET_NULL, null=True, blank=True)
     color_scheme = models.JSONField(default=dict, help_text="Цветовая схема портфолио")
-    avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    avatar = models.ImageField(upload_to='avatars/', storage=media_storage, blank=True, null=True)
     
     # Контактная информация
     phone = models.CharField(max_length=20, blank=True)
@@ -43,6 +44,9 @@ class Portfolio(models.Model):
     # Расширенные настройки дизайна
     design_settings = models.JSONField(default=dict, help_text="Расширенные настройки дизайна")
     
+    # Номер последней операции совместного редактирования (см. portfolio.realtime)
+    sync_seq = models.PositiveBigIntegerField(default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -64,7 +68,7 @@ class PortfolioItem(models.Model):
     portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name='items')
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to='portfolio_items/', blank=True, null=True)
+    image = models.ImageField(upload_to='portfolio_items/', storage=media_storage, blank=True, null=True)
     order = models.IntegerField(default=0)
     
     # Новые поля для типов контента
@@ -73,6 +77,20 @@ class PortfolioItem(models.Model):
     category = models.CharField(max_length=100, blank=True, help_text="Категория работы")
     tags = models.JSONField(default=list, help_text="Теги для работы")
     
+    # Документ (content_type == 'pdf') и результаты его обработки (см. portfolio.documents)
+    PROCESSING_CHOICES = [
+        ('', 'Не требуется'),
+        ('pending', 'В очереди'),
+        ('processing', 'Обрабатывается'),
+        ('done', 'Обработан'),
+        ('failed', 'Ошибка'),
+    ]
+    file = models.FileField(upload_to='documents/', storage=media_storage, blank=True)
+    thumbnail = models.ImageField(upload_to='thumbnails/', storage=media_storage, blank=True, editable=False)
+    search_text = models.TextField(blank=True, editable=False, help_text="Текст документа для поиска")
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_CHOICES, blank=True, default='',
+                                         db_index=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -81,4 +99,104 @@ class PortfolioItem(models.Model):
     
     def __str__(self):
         return f"{self.portfolio.user.email} - {self.title}"
+    
+    def sync_gallery(self, save=True):
+        """Записывает в content_data['images'] ссылки на файлы галереи (вместо base64)"""
+        content_data = dict(self.content_data or {})
+        # Внешние ссылки (http/https) оставляем как есть
+        external = [src for src in content_data.get('images') or []
+                    if isinstance(src, str) and src.startswith(('http://', 'https://'))]
+        content_data['images'] = [image.image.url for image in self.gallery_images.all()] + external
+        content_data.pop('imageFiles', None)
+        self.content_data = content_data
+        if save:
+            self.save(update_fields=['content_data', 'updated_at'])
+
+
+class GalleryImage(models.Model):
+    """Изображение галереи (работа с content_type == 'gallery')"""
+    item = models.ForeignKey(PortfolioItem, on_delete=models.CASCADE, related_name='gallery_images')
+    image = models.ImageField(upload_to='gallery/', storage=media_storage)
+    order = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['order', 'id']
+    
+    def __str__(self):
+        return f"{self.item.title} - {self.image.name}"
+
+
+class MediaBlob(models.Model):
+    """Файл в хранилище с адресацией по содержимому и число ссылок на него"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Время последней загрузки: сборщик не трогает недавно загруженные файлы
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+class LinkPreview(models.Model):
+    """Кеш метаданных ссылок (Open Graph/Twitter), см. portfolio.link_preview"""
+    url_hash = models.CharField(max_length=64, unique=True)
+    url = models.TextField()
+    data = models.JSONField(default=dict)
+    # False - страницу получить не удалось (негативный кеш с коротким сроком)
+    ok = models.BooleanField(default=True)
+    fetched_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return self.url
+
+
+class PortfolioDocument(models.Model):
+    """
+    Готовый JSON портфолио (вывод PortfolioSerializer) для чтения одним
+    запросом по ключу; пересобирается при изменениях, см. portfolio.read_model
+    """
+    portfolio = models.OneToOneField(Portfolio, on_delete=models.CASCADE, primary_key=True, related_name='document')
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='portfolio_document')
+    body = models.TextField()
+    built_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Документ портфолио {self.portfolio_id}"
 
+
+class ImportJob(models.Model):
+    """Импорт портфолио из файла через API админ-панели, см. portfolio.importer"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Завершен'),
+        (FAILED, 'Ошибка'),
+    ]
+    
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    source_name = models.CharField(max_length=255, blank=True)
+    dry_run = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    records = models.PositiveIntegerField(default=0)
+    users = models.PositiveIntegerField(default=0)
+    portfolios = models.PositiveIntegerField(default=0)
+    items = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, help_text="Первые ошибки: [{record, errors}]")
+    message = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Импорт {self.source_name or self.pk} ({self.get_status_display()})"
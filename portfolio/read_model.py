@@ -0,0 +1,160 @@
+"""
+Модель для чтения: готовый JSON портфолио в PortfolioDocument.
+
+Чтение портфолио (my_portfolio, страница просмотра) - один запрос по
+уникальному ключу и ответ готовой строкой, без JOIN и сериализации.
+
+Запись:
+- любое изменение портфолио, его работ или шаблона удаляет документ в той
+  же транзакции (invalidate), поэтому после коммита устаревший документ
+  прочитать нельзя;
+- после коммита документ собирается заново (один раз на портфолио за
+  транзакцию), а если сборка не случилась (сбой процесса) - после первого
+  чтения, в фоновом потоке (get_document).
+
+Чтение ничего не пишет в рамках запроса: на промахе ответ собирается в памяти,
+поэтому GET не блокирует строку портфолио и не закрепляет пользователя за
+основной БД (portfolio_builder.replicas).
+
+Для шаблона документы только удаляются: у шаблона может быть много
+портфолио, они пересоберутся при чтении. Сверка с сериализатором - команда
+check_read_model.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from portfolio_builder.renderers import FastJSONRenderer
+from portfolio_builder.transactions import on_commit_once
+
+from .models import Portfolio, PortfolioDocument, PortfolioItem, Template
+from .readers import get_read_plan
+from .serializers import PortfolioSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def render_document(portfolio_id):
+    """JSON портфолио в формате PortfolioSerializer (URL файлов без хоста, как в API) или None"""
+    data = get_read_plan(PortfolioSerializer).read(Portfolio.objects.filter(pk=portfolio_id))
+    if not data:
+        return None
+    return FastJSONRenderer().render(data[0]).decode('utf-8')
+
+
+def build(portfolio_id):
+    """Собирает и сохраняет документ; возвращает PortfolioDocument или None"""
+    with transaction.atomic():
+        # Сборки одного портфолио идут по очереди: последней записывается та,
+        # что начала читать последней, и устаревший документ не остается
+        portfolio = Portfolio.objects.select_for_update().select_related('template').filter(pk=portfolio_id).first()
+        if portfolio is None:
+            return None
+        document, _ = PortfolioDocument.objects.update_or_create(
+            portfolio_id=portfolio_id,
+            defaults={'user_id': portfolio.user_id, 'body': render_document(portfolio_id)},
+        )
+    return document
+
+
+class _Rebuild:
+    """Сборка после коммита"""
+
+    def __init__(self, portfolio_id):
+        self.portfolio_id = portfolio_id
+
+    def __call__(self):
+        build(self.portfolio_id)
+
+
+def invalidate(portfolio_id):
+    """Удаляет документ в текущей транзакции и планирует сборку после коммита"""
+    if portfolio_id is None:
+        return
+    PortfolioDocument.objects.filter(portfolio_id=portfolio_id).delete()
+    # Одна сборка на портфолио за транзакцию
+    on_commit_once(('read_model', portfolio_id), lambda: _Rebuild(portfolio_id))
+
+
+_executor = None
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _build_in_background(portfolio_id):
+    try:
+        build(portfolio_id)
+    except Exception:
+        logger.exception('Ошибка фоновой сборки документа портфолио %s', portfolio_id)
+    finally:
+        with _pending_lock:
+            _pending.discard(portfolio_id)
+        close_old_connections()
+
+
+def build_later(portfolio_id):
+    """Сборка вне запроса; повторные вызовы до ее окончания ничего не делают"""
+    global _executor
+    with _pending_lock:
+        if portfolio_id in _pending:
+            return
+        _pending.add(portfolio_id)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='read-model')
+    _executor.submit(_build_in_background, portfolio_id)
+
+
+def get_document(user_id):
+    """
+    PortfolioDocument пользователя или None, если портфолио нет.
+    При отсутствии документа возвращается несохраненный документ, собранный
+    в памяти, а сохранение откладывается в фоновый поток.
+    """
+    document = PortfolioDocument.objects.filter(user_id=user_id).first()
+    if document is not None:
+        return document
+    portfolio_id = Portfolio.objects.filter(user_id=user_id).values_list('pk', flat=True).first()
+    if portfolio_id is None:
+        return None
+    body = render_document(portfolio_id)
+    if body is None:
+        return None
+    build_later(portfolio_id)
+    return PortfolioDocument(portfolio_id=portfolio_id, user_id=user_id, body=body)
+
+
+# ==================== Сигналы ====================
+
+def _portfolio_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate(instance.pk)
+
+
+def _item_changed(sender, instance, raw=False, origin=None, **kwargs):
+    if raw:
+        return
+    # При удалении портфолио (или пользователя) работы удаляются каскадом - документ удалится тоже
+    if origin is not None and not isinstance(origin, PortfolioItem) \
+            and getattr(origin, 'model', None) is not PortfolioItem:
+        return
+    invalidate(instance.portfolio_id)
+
+
+def _template_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Пересборка - при чтении: портфолио с этим шаблоном может быть много
+    PortfolioDocument.objects.filter(portfolio__template_id=instance.pk).delete()
+
+
+def connect():
+    post_save.connect(_portfolio_saved, sender=Portfolio, dispatch_uid='read_model_portfolio')
+    post_save.connect(_item_changed, sender=PortfolioItem, dispatch_uid='read_model_item_save')
+    post_delete.connect(_item_changed, sender=PortfolioItem, dispatch_uid='read_model_item_delete')
+    post_save.connect(_template_saved, sender=Template, dispatch_uid='read_model_template_save')
+    # До удаления: после него у портфолио template_id уже NULL
+    pre_delete.connect(_template_saved, sender=Template, dispatch_uid='read_model_template_delete')
@@ -0,0 +1,160 @@
+"""
+Быстрое чтение для API: строки из QuerySet.values() сразу превращаются в dict
+по заранее составленному плану полей, без создания моделей и без вызова
+to_representation у каждого поля DRF.
+
+План строится один раз на (класс сериализатора, набор полей) и повторяет
+вывод сериализатора: те же имена полей, URL файлов, формат дат. Поля, которые
+план описать не может (SerializerMethodField и т.п.), приводят к
+UnsupportedField - в этом случае используется обычный сериализатор.
+"""
+from collections import defaultdict
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import serializers
+
+
+class UnsupportedField(Exception):
+    """Поле сериализатора нельзя прочитать через values()"""
+
+
+def _datetime(value, tz):
+    # Как DRF DateTimeField: текущая зона, UTC записывается как Z
+    if value is None:
+        return None
+    if value.tzinfo is not None and value.tzinfo is not tz:
+        value = value.astimezone(tz)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class ReadPlan:
+    """
+    Описание чтения одного сериализатора:
+    columns - аргументы values(), steps - (поле ответа, колонка, преобразование),
+    nested - (поле ответа, внешний ключ во вложенной модели, вложенный план).
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        self.model = serializer_class.Meta.model
+        self.columns = [self.model._meta.pk.attname]
+        self.steps = []
+        self.nested = []
+        self.file_storages = {}
+        self.relative_files = set()
+
+        for name, field in serializer_class().fields.items():
+            if fields is not None and name not in fields:
+                continue
+            if field.write_only:
+                continue
+            self._add_field(name, field)
+
+    def _add_field(self, name, field):
+        source = field.source
+        if isinstance(field, serializers.ListSerializer):
+            relation = self.model._meta.get_field(source)
+            if not relation.one_to_many:
+                raise UnsupportedField(name)
+            self.nested.append((name, relation.field.attname, ReadPlan(type(field.child))))
+            self.steps.append((name, None, 'nested'))
+            return
+        if '.' in source:
+            column = source.replace('.', '__')
+            self._add_step(name, column, None)
+            return
+        try:
+            model_field = self.model._meta.get_field(source)
+        except FieldDoesNotExist:
+            raise UnsupportedField(name)
+        if not model_field.concrete:
+            raise UnsupportedField(name)
+        if isinstance(field, serializers.FileField):
+            self.file_storages[name] = model_field.storage
+            if getattr(field, 'relative_url', False):
+                self.relative_files.add(name)
+            self._add_step(name, model_field.attname, 'file')
+        elif isinstance(field, serializers.DateTimeField):
+            self._add_step(name, model_field.attname, 'datetime')
+        elif isinstance(field, (serializers.RelatedField, serializers.JSONField, serializers.CharField,
+                                serializers.IntegerField, serializers.BooleanField, serializers.ChoiceField,
+                                serializers.EmailField, serializers.URLField)):
+            self._add_step(name, model_field.attname, None)
+        else:
+            raise UnsupportedField(name)
+
+    def _add_step(self, name, column, transform):
+        if column not in self.columns:
+            self.columns.append(column)
+        self.steps.append((name, column, transform))
+
+    def read(self, queryset, request=None):
+        """Список dict в формате сериализатора"""
+        queryset = queryset.prefetch_related(None).select_related(None)
+        rows = list(queryset.values(*self.columns))
+        pk = self.model._meta.pk.attname
+        # Текущая зона определяется один раз, а не для каждого значения
+        tz = timezone.get_current_timezone()
+
+        nested_data = {}
+        if rows and self.nested:
+            ids = [row[pk] for row in rows]
+            for name, fk, plan in self.nested:
+                groups = defaultdict(list)
+                child_qs = plan.model._default_manager.filter(**{f'{fk}__in': ids})
+                for child, parent_id in plan.read_with_parent(child_qs, fk, request, tz):
+                    groups[parent_id].append(child)
+                nested_data[name] = groups
+
+        url_cache = {}
+        return [self._build(row, request, url_cache, nested_data, tz) for row in rows]
+
+    def read_with_parent(self, queryset, fk, request, tz):
+        """(dict, id родителя) для вложенных записей"""
+        columns = list(self.columns)
+        if fk not in columns:
+            columns.append(fk)
+        url_cache = {}
+        for row in queryset.values(*columns):
+            yield self._build(row, request, url_cache, {}, tz), row[fk]
+
+    def _build(self, row, request, url_cache, nested_data, tz):
+        data = {}
+        for name, column, transform in self.steps:
+            if transform == 'nested':
+                value = nested_data[name].get(row[self.model._meta.pk.attname], [])
+            elif transform == 'datetime':
+                value = _datetime(row[column], tz)
+            elif transform == 'file':
+                value = self._file_url(name, row[column], request, url_cache)
+            else:
+                value = row[column]
+            data[name] = value
+        return data
+
+    def _file_url(self, name, value, request, url_cache):
+        # Как DRF FileField: None для пустого файла, абсолютный URL при наличии
+        # запроса (кроме полей с relative_url, см. serializers.RelativeURLMixin)
+        if not value:
+            return None
+        key = (name, value)
+        if key not in url_cache:
+            url = self.file_storages[name].url(value)
+            if request is not None and name not in self.relative_files:
+                url = request.build_absolute_uri(url)
+            url_cache[key] = url
+        return url_cache[key]
+
+
+@lru_cache(maxsize=64)
+def _cached_plan(serializer_class, fields):
+    return ReadPlan(serializer_class, set(fields) if fields is not None else None)
+
+
+def get_read_plan(serializer_class, fields=None):
+    """План чтения для сериализатора (кешируется по набору полей)"""
+    return _cached_plan(serializer_class, frozenset(fields) if fields is not None else None)
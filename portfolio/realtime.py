@@ -0,0 +1,472 @@
+"""
+Синхронизация редактора портфолио в реальном времени через WebSocket (ASGI).
+
+Каждое портфолио - отдельный канал. Клиент отправляет операции над отдельными
+полями, сервер валидирует их, записывает в БД вместе с увеличением
+``Portfolio.sync_seq`` (серверная нумерация) и рассылает остальным сессиям
+через брокер. Брокер настраивается в ``settings.REALTIME_SYNC``.
+
+Вход - по сессионной cookie или по access-токену в первом сообщении.
+Доступ перепроверяется каждые ``AUTH_RECHECK_INTERVAL`` секунд и перед
+операциями: заблокированный или удаленный пользователь, выход из сессии и
+смена пароля закрывают открытые соединения.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from admin_panel import rollups
+
+from . import read_model
+from .models import Portfolio, PortfolioItem
+from .serializers import PortfolioSerializer, PortfolioItemSerializer
+
+logger = logging.getLogger(__name__)
+
+# Поля, которые можно менять отдельными операциями
+PORTFOLIO_SYNC_FIELDS = {
+    'name', 'description', 'template', 'color_scheme',
+    'phone', 'email', 'website', 'location', 'social_links',
+    'skills', 'experience', 'education', 'certificates', 'languages',
+    'design_settings',
+}
+ITEM_SYNC_FIELDS = {'title', 'description', 'order', 'category', 'tags', 'content_data'}
+
+# Максимальный размер одного сообщения от клиента (в байтах)
+MAX_MESSAGE_SIZE = 256 * 1024
+
+
+class SyncError(Exception):
+    """Операция отклонена: ошибка валидации или объект не найден"""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+# ==================== Брокеры ====================
+
+class BaseBroker:
+    """Интерфейс брокера сообщений для рассылки операций между сессиями"""
+
+    def __init__(self, **options):
+        self.options = options
+
+    async def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Возвращает подписку: асинхронный контекстный менеджер и итератор сообщений"""
+        raise NotImplementedError
+
+
+class _MemorySubscription:
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    async def __aenter__(self):
+        self.broker._subscribers.setdefault(self.channel, set()).add(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        subscribers = self.broker._subscribers.get(self.channel)
+        if subscribers is not None:
+            subscribers.discard(self)
+            if not subscribers:
+                del self.broker._subscribers[self.channel]
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Медленный клиент: сбрасываем очередь и просим полную ресинхронизацию
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'resync_required'})
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+
+class InMemoryBroker(BaseBroker):
+    """Брокер в памяти процесса - для одного узла (runserver, один воркер uvicorn)"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.queue_size = options.get('QUEUE_SIZE', 1000)
+        self._subscribers = {}
+
+    async def publish(self, channel, message):
+        for subscription in list(self._subscribers.get(channel, ())):
+            subscription.deliver(message)
+
+    def subscribe(self, channel):
+        return _MemorySubscription(self, channel, self.queue_size)
+
+
+class _RedisSubscription:
+    def __init__(self, client, channel):
+        self.client = client
+        self.channel = channel
+        self.pubsub = None
+
+    async def __aenter__(self):
+        self.pubsub = self.client.pubsub()
+        await self.pubsub.subscribe(self.channel)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.pubsub.unsubscribe(self.channel)
+        await self.pubsub.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            raw = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+            if raw and raw.get('type') == 'message':
+                return json.loads(raw['data'])
+
+
+class RedisBroker(BaseBroker):
+    """Брокер на Redis pub/sub - для нескольких узлов. Требует пакет redis>=4.2"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise ImproperlyConfigured('Для RedisBroker установите пакет redis') from e
+        self.prefix = options.get('PREFIX', 'portfolio-sync:')
+        self.client = redis_asyncio.from_url(options.get('URL', 'redis://localhost:6379/0'))
+
+    async def publish(self, channel, message):
+        await self.client.publish(self.prefix + channel, json.dumps(message, ensure_ascii=False))
+
+    def subscribe(self, channel):
+        return _RedisSubscription(self.client, self.prefix + channel)
+
+
+_broker = None
+
+
+def get_broker():
+    """Брокер из settings.REALTIME_SYNC (создается один раз на процесс)"""
+    global _broker
+    if _broker is None:
+        config = getattr(settings, 'REALTIME_SYNC', {})
+        broker_class = import_string(config.get('BROKER', 'portfolio.realtime.InMemoryBroker'))
+        _broker = broker_class(**config.get('OPTIONS', {}))
+    return _broker
+
+
+def channel_name(portfolio_id):
+    return f'portfolio.{portfolio_id}'
+
+
+# ==================== Операции ====================
+
+def apply_operation(portfolio_id, op):
+    """
+    Валидирует и применяет операцию над одним полем.
+    Запись поля и увеличение sync_seq выполняются в одной транзакции,
+    поэтому порядок номеров совпадает с порядком записи в БД.
+    """
+    target = op.get('target', 'portfolio')
+    field = op.get('field')
+    value = op.get('value')
+    now = timezone.now()
+
+    with transaction.atomic():
+        portfolio = Portfolio.objects.select_for_update().only('id', 'sync_seq').get(pk=portfolio_id)
+
+        if target == 'portfolio':
+            if field not in PORTFOLIO_SYNC_FIELDS:
+                raise SyncError({field or 'field': ['Поле нельзя синхронизировать']})
+            serializer = PortfolioSerializer(portfolio, data={field: value}, partial=True)
+            if not serializer.is_valid():
+                raise SyncError(serializer.errors)
+            validated = serializer.validated_data[field]
+            # Для FK храним id, чтобы рассылать JSON-совместимое значение
+            if field == 'template':
+                value = validated.pk if validated else None
+                previous = Portfolio.objects.filter(pk=portfolio_id).values_list('template_id', flat=True).get()
+                Portfolio.objects.filter(pk=portfolio_id).update(template_id=value, updated_at=now)
+                rollups.template_changed(previous, value)
+            else:
+                value = validated
+                Portfolio.objects.filter(pk=portfolio_id).update(**{field: value, 'updated_at': now})
+
+        elif target == 'item':
+            if field not in ITEM_SYNC_FIELDS:
+                raise SyncError({field or 'field': ['Поле нельзя синхронизировать']})
+            try:
+                item = PortfolioItem.objects.get(pk=op.get('id'), portfolio_id=portfolio_id)
+            except (PortfolioItem.DoesNotExist, ValueError, TypeError):
+                raise SyncError({'id': ['Работа не найдена']})
+            serializer = PortfolioItemSerializer(item, data={field: value}, partial=True)
+            if not serializer.is_valid():
+                raise SyncError(serializer.errors)
+            value = serializer.validated_data[field]
+            PortfolioItem.objects.filter(pk=item.pk).update(**{field: value, 'updated_at': now})
+
+        else:
+            raise SyncError({'target': ['Неизвестный тип объекта']})
+
+        Portfolio.objects.filter(pk=portfolio_id).update(sync_seq=F('sync_seq') + 1)
+        seq = portfolio.sync_seq + 1
+        # QuerySet.update() не посылает сигналы
+        read_model.invalidate(portfolio_id)
+
+    message = {'type': 'op', 'seq': seq, 'target': target, 'field': field, 'value': value}
+    if target == 'item':
+        message['id'] = item.pk
+    return message
+
+
+def get_snapshot(portfolio_id):
+    """Полное состояние портфолио для ресинхронизации клиента"""
+    portfolio = Portfolio.objects.select_related('template').prefetch_related('items').get(pk=portfolio_id)
+    return {'type': 'snapshot', 'seq': portfolio.sync_seq, 'portfolio': PortfolioSerializer(portfolio).data}
+
+
+# ==================== Аутентификация ====================
+
+# Коды закрытия соединения: учетные данные недействительны / нет доступа к портфолио
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_FORBIDDEN = 4403
+
+
+def _session_user_id(session_key):
+    """Пользователь сессии с проверкой хеша пароля и is_active (как у HTTP-запросов)"""
+    engine = import_module(settings.SESSION_ENGINE)
+    user = get_user(SimpleNamespace(session=engine.SessionStore(session_key)))
+    return user.pk if user.is_authenticated else None
+
+
+def _token_user_id(token):
+    try:
+        return AccessToken(token).get('user_id')
+    except TokenError:
+        return None
+
+
+def _authorize(portfolio_id, session_key=None, token=None):
+    """
+    (user_id, sync_seq): user_id - None, если учетные данные недействительны,
+    sync_seq - None, если у пользователя нет доступа к портфолио
+    """
+    user_id = _token_user_id(token) if token else _session_user_id(session_key) if session_key else None
+    if not user_id:
+        return None, None
+    seq = (Portfolio.objects
+           .filter(pk=portfolio_id, user_id=user_id, user__is_active=True, user__deleted_at__isnull=True)
+           .values_list('sync_seq', flat=True)
+           .first())
+    return user_id, seq
+
+
+def _session_key(scope):
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+    session_cookie = cookies.get(settings.SESSION_COOKIE_NAME)
+    return session_cookie.value if session_cookie else None
+
+
+class _Access:
+    """
+    Доступ соединения к портфолио. Перепроверяется не реже раза в
+    AUTH_RECHECK_INTERVAL секунд: блокировка, удаление пользователя, выход и
+    смена пароля закрывают уже открытые соединения.
+    """
+
+    def __init__(self, portfolio_id, session_key=None, token=None):
+        self.portfolio_id = portfolio_id
+        self.session_key = session_key
+        self.token = token
+        self.interval = getattr(settings, 'REALTIME_SYNC', {}).get('AUTH_RECHECK_INTERVAL', 10)
+        self.checked_at = None
+        self.seq = None
+        self.close_code = None
+        self.closed = False
+
+    async def check(self, force=False):
+        """sync_seq на момент проверки, если доступ есть; иначе None и код закрытия в close_code"""
+        if self.close_code is not None:
+            return None
+        if not force and self.checked_at is not None and time.monotonic() - self.checked_at < self.interval:
+            return self.seq
+        user_id, self.seq = await sync_to_async(_authorize)(self.portfolio_id, self.session_key, self.token)
+        self.checked_at = time.monotonic()
+        if self.seq is None:
+            self.close_code = CLOSE_UNAUTHENTICATED if user_id is None else CLOSE_FORBIDDEN
+        return self.seq
+
+    async def close(self, send):
+        """Закрывает соединение с кодом close_code (один раз)"""
+        if not self.closed:
+            self.closed = True
+            await send({'type': 'websocket.close', 'code': self.close_code})
+
+
+async def _receive_token(receive):
+    """Токен из первого сообщения {"type": "auth", "token": ...} (не в URL - он попадает в логи)"""
+    timeout = getattr(settings, 'REALTIME_SYNC', {}).get('AUTH_TIMEOUT', 10)
+    try:
+        event = await asyncio.wait_for(receive(), timeout)
+    except asyncio.TimeoutError:
+        return None
+    if event['type'] != 'websocket.receive':
+        return None
+    try:
+        data = json.loads(event.get('text') or '')
+    except ValueError:
+        return None
+    if isinstance(data, dict) and data.get('type') == 'auth' and isinstance(data.get('token'), str):
+        return data['token']
+    return None
+
+
+# ==================== ASGI-приложение ====================
+
+def _parse_portfolio_id(path):
+    """/ws/portfolio/<id>/ -> id"""
+    parts = [part for part in path.split('/') if part]
+    if len(parts) == 3 and parts[:2] == ['ws', 'portfolio'] and parts[2].isdigit():
+        return int(parts[2])
+    return None
+
+
+async def _send_json(send, data):
+    await send({'type': 'websocket.send', 'text': json.dumps(data, ensure_ascii=False, default=str)})
+
+
+async def _forward(subscription, send, session_id):
+    """Пересылает клиенту операции других сессий"""
+    async for message in subscription:
+        if message.get('origin') == session_id:
+            continue
+        await _send_json(send, message)
+
+
+async def _watch_access(access, send):
+    """Закрывает соединение, когда доступ отозван (даже если клиент ничего не отправляет)"""
+    while True:
+        await asyncio.sleep(access.interval)
+        if await access.check() is None:
+            await access.close(send)
+            return
+
+
+async def websocket_application(scope, receive, send):
+    """
+    ASGI-приложение канала синхронизации: /ws/portfolio/<id>/.
+    Вход - по сессионной cookie или по access-токену в первом сообщении
+    {"type": "auth", "token": ...}; токен ждем и тогда, когда cookie есть,
+    но сессия по ней не найдена (истекла, вышли из системы).
+    """
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    portfolio_id = _parse_portfolio_id(scope.get('path', ''))
+    if not portfolio_id:
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+    await send({'type': 'websocket.accept'})
+
+    session_key = _session_key(scope)
+    access = _Access(portfolio_id, session_key=session_key)
+    seq = await access.check(force=True) if session_key else None
+    if seq is None and access.close_code != CLOSE_FORBIDDEN:
+        # Cookie нет или сессия истекла - вход по токену из первого сообщения
+        access = _Access(portfolio_id, token=await _receive_token(receive))
+        seq = await access.check(force=True)
+    if seq is None:
+        await access.close(send)
+        return
+
+    session_id = uuid.uuid4().hex
+    broker = get_broker()
+    channel = channel_name(portfolio_id)
+
+    async with broker.subscribe(channel) as subscription:
+        forwarder = asyncio.ensure_future(_forward(subscription, send, session_id))
+        watcher = asyncio.ensure_future(_watch_access(access, send))
+        await _send_json(send, {'type': 'hello', 'seq': seq, 'session': session_id})
+        try:
+            while True:
+                event = await receive()
+                if event['type'] == 'websocket.disconnect':
+                    break
+                if event['type'] != 'websocket.receive':
+                    continue
+                # Изменения - только с действующим доступом, не дожидаясь проверки по таймеру
+                if await access.check() is None:
+                    await access.close(send)
+                    break
+                await _handle_message(event, portfolio_id, session_id, broker, channel, send)
+        finally:
+            forwarder.cancel()
+            watcher.cancel()
+
+
+async def _handle_message(event, portfolio_id, session_id, broker, channel, send):
+    raw = event.get('text') or (event.get('bytes') or b'').decode('utf-8', 'replace')
+    if len(raw) > MAX_MESSAGE_SIZE:
+        await _send_json(send, {'type': 'error', 'errors': {'message': ['Сообщение слишком большое']}})
+        return
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        await _send_json(send, {'type': 'error', 'errors': {'message': ['Некорректный JSON']}})
+        return
+    if not isinstance(data, dict):
+        return
+
+    if data.get('type') == 'resync':
+        snapshot = await sync_to_async(get_snapshot)(portfolio_id)
+        await _send_json(send, snapshot)
+        return
+
+    if data.get('type') != 'op':
+        return
+
+    client_op_id = data.get('client_op_id')
+    try:
+        message = await sync_to_async(apply_operation)(portfolio_id, data)
+    except SyncError as e:
+        await _send_json(send, {'type': 'error', 'client_op_id': client_op_id, 'errors': e.errors})
+        return
+    except Portfolio.DoesNotExist:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    message['origin'] = session_id
+    await _send_json(send, {'type': 'ack', 'client_op_id': client_op_id, 'seq': message['seq'],
+                            'value': message['value']})
+    await broker.publish(channel, json.loads(json.dumps(message, default=str)))
@@ -0,0 +1,312 @@
+"""
+Схемы JSON-полей портфолио и работ.
+
+Схема описывается декларативно (Object, Array, String, ...) и компилируется
+при импорте в дерево замыканий: регулярные выражения собираются один раз,
+проверка значения - один обход без рекурсивного json.dumps. Во время обхода
+ограничиваются глубина вложенности и примерный размер данных, поэтому
+огромные или слишком глубокие JSON отклоняются, не доходя до базы.
+
+Использование: validate('content_data', value, content_type='link').
+"""
+import re
+
+
+# Общие ограничения для любого JSON-поля
+MAX_DEPTH = 8
+MAX_SIZE = 256 * 1024  # примерный размер в байтах (длины строк и ключей)
+MAX_STRING_LENGTH = 10000
+# Изображения пользовательских блоков хранятся в design_settings как data URL
+# (base64 файла до 5 МБ), поэтому для них и для всего поля лимиты выше
+MAX_DATA_URL_LENGTH = 7 * 1024 * 1024
+
+
+class SchemaError(Exception):
+    """Значение не соответствует схеме; path - путь до ошибочного элемента"""
+
+    def __init__(self, message, path=()):
+        super().__init__(message)
+        self.message = message
+        self.path = tuple(path)
+
+    def __str__(self):
+        if not self.path:
+            return self.message
+        return f"{'.'.join(str(part) for part in self.path)}: {self.message}"
+
+
+class _Budget:
+    """Оставшийся размер при обходе одного значения"""
+    __slots__ = ('remaining',)
+
+    def __init__(self, size):
+        self.remaining = size
+
+    def spend(self, size, path):
+        self.remaining -= size
+        if self.remaining < 0:
+            raise SchemaError('Слишком большой объем данных', path)
+
+
+# ==================== Узлы схемы ====================
+
+class Node:
+    """Узел схемы; compile() возвращает функцию check(value, path, depth, budget)"""
+
+    def compile(self):
+        raise NotImplementedError
+
+
+class AnyJSON(Node):
+    """Произвольный JSON (только общие ограничения на размер и глубину)"""
+
+    def __init__(self, max_string_length=MAX_STRING_LENGTH):
+        self.max_string_length = max_string_length
+
+    def compile(self):
+        max_string_length = self.max_string_length
+
+        def check(value, path, depth, budget):
+            if isinstance(value, str):
+                if len(value) > max_string_length:
+                    raise SchemaError(f'Строка длиннее {max_string_length} символов', path)
+                budget.spend(len(value) + 2, path)
+            elif isinstance(value, dict):
+                if depth >= MAX_DEPTH:
+                    raise SchemaError('Слишком глубокая вложенность', path)
+                budget.spend(2, path)
+                for key, item in value.items():
+                    budget.spend(len(str(key)) + 3, path)
+                    check(item, path + (key,), depth + 1, budget)
+            elif isinstance(value, list):
+                if depth >= MAX_DEPTH:
+                    raise SchemaError('Слишком глубокая вложенность', path)
+                budget.spend(2, path)
+                for index, item in enumerate(value):
+                    check(item, path + (index,), depth + 1, budget)
+            elif value is None or isinstance(value, (bool, int, float)):
+                budget.spend(8, path)
+            else:
+                raise SchemaError('Недопустимый тип значения', path)
+            return value
+
+        return check
+
+
+class Scalar(Node):
+    """Строка, число, логическое значение или null"""
+
+    def __init__(self, max_length=MAX_STRING_LENGTH):
+        self.max_length = max_length
+
+    def compile(self):
+        max_length = self.max_length
+
+        def check(value, path, depth, budget):
+            if isinstance(value, str):
+                if len(value) > max_length:
+                    raise SchemaError(f'Строка длиннее {max_length} символов', path)
+                budget.spend(len(value) + 2, path)
+            elif value is None or isinstance(value, (bool, int, float)):
+                budget.spend(8, path)
+            else:
+                raise SchemaError('Ожидается строка или число', path)
+            return value
+
+        return check
+
+
+class String(Node):
+    """
+    Строка с ограничением длины и, при необходимости, шаблоном.
+    message может содержать {key} (последний элемент пути) и {value}.
+    """
+
+    def __init__(self, max_length=MAX_STRING_LENGTH, pattern=None, message='Неверный формат', allow_blank=True,
+                 allow_null=False):
+        self.max_length = max_length
+        self.pattern = pattern
+        self.message = message
+        self.allow_blank = allow_blank
+        self.allow_null = allow_null
+
+    def compile(self):
+        max_length = self.max_length
+        match = re.compile(self.pattern).match if self.pattern else None
+        message = self.message
+        allow_blank = self.allow_blank
+        allow_null = self.allow_null
+
+        def check(value, path, depth, budget):
+            if value is None and allow_null:
+                budget.spend(8, path)
+                return value
+            if not isinstance(value, str):
+                raise SchemaError('Ожидается строка', path)
+            if len(value) > max_length:
+                raise SchemaError(f'Строка длиннее {max_length} символов', path)
+            budget.spend(len(value) + 2, path)
+            if not value:
+                if not allow_blank:
+                    raise SchemaError('Значение не может быть пустым', path)
+                return value
+            if match is not None and not match(value):
+                key = path[-1] if path else ''
+                raise SchemaError(message.format(key=key, value=value), path)
+            return value
+
+        return check
+
+
+class Array(Node):
+    def __init__(self, items, max_items=1000):
+        self.items = items
+        self.max_items = max_items
+
+    def compile(self):
+        check_item = self.items.compile()
+        max_items = self.max_items
+
+        def check(value, path, depth, budget):
+            if not isinstance(value, list):
+                raise SchemaError('Ожидается список', path)
+            if len(value) > max_items:
+                raise SchemaError(f'Не больше {max_items} элементов', path)
+            if depth >= MAX_DEPTH:
+                raise SchemaError('Слишком глубокая вложенность', path)
+            budget.spend(2, path)
+            for index, item in enumerate(value):
+                check_item(item, path + (index,), depth + 1, budget)
+            return value
+
+        return check
+
+
+class Object(Node):
+    """
+    Словарь с описанными полями fields; required - обязательные ключи
+    (пустой словарь допускается без них), extra - схема для остальных ключей
+    (None - остальные ключи запрещены).
+    """
+
+    def __init__(self, fields=None, required=(), extra=None, max_keys=200):
+        self.fields = fields or {}
+        self.required = tuple(required)
+        self.extra = extra
+        self.max_keys = max_keys
+
+    def compile(self):
+        checks = {key: node.compile() for key, node in self.fields.items()}
+        check_extra = self.extra.compile() if self.extra is not None else None
+        required = self.required
+        max_keys = self.max_keys
+
+        def check(value, path, depth, budget):
+            if not isinstance(value, dict):
+                raise SchemaError('Ожидается объект', path)
+            if len(value) > max_keys:
+                raise SchemaError(f'Не больше {max_keys} ключей', path)
+            if depth >= MAX_DEPTH:
+                raise SchemaError('Слишком глубокая вложенность', path)
+            for key in required if value else ():
+                if key not in value:
+                    raise SchemaError(f'Обязательное поле {key}', path)
+            budget.spend(2, path)
+            for key, item in value.items():
+                budget.spend(len(str(key)) + 3, path)
+                check_item = checks.get(key, check_extra)
+                if check_item is None:
+                    raise SchemaError(f'Неизвестное поле {key}', path)
+                check_item(item, path + (key,), depth + 1, budget)
+            return value
+
+        return check
+
+
+class OneOf(Node):
+    """Первая подходящая схема по типу значения (str, list или dict)"""
+
+    def __init__(self, *variants):
+        self.variants = variants
+
+    def compile(self):
+        compiled = [variant.compile() for variant in self.variants]
+
+        def check(value, path, depth, budget):
+            error = None
+            for check_variant in compiled:
+                try:
+                    return check_variant(value, path, depth, budget)
+                except SchemaError as exc:
+                    error = exc
+            raise error
+
+        return check
+
+
+# ==================== Схемы проекта ====================
+
+HEX_COLOR = String(max_length=7, pattern=r'^#([A-Fa-f0-9]{6}|[A-Fa-f0-9]{3})$', allow_null=True,
+                   message='Неверный формат hex-цвета. Используйте формат #RRGGBB или #RGB')
+HTTP_URL = String(max_length=2048, pattern=r'^https?://.+', allow_null=True,
+                  message='Неверный URL для {key}: {value}')
+CUSTOM_BLOCK = Object({
+    'image': String(max_length=MAX_DATA_URL_LENGTH, allow_null=True),
+}, extra=AnyJSON())
+ENTRY = Object(extra=Scalar(max_length=5000), max_keys=20)
+
+CONTENT_DATA_SCHEMAS = {
+    'image': Object(extra=AnyJSON()),
+    'video': Object({'url': String(max_length=2048)}, extra=AnyJSON()),
+    'link': Object({'url': String(max_length=2048)}, required=('url',), extra=AnyJSON()),
+    'gallery': Object({
+        'images': Array(String(max_length=2048, pattern=r'^(?!data:)',
+                               message='Изображения галереи загружаются файлами через '
+                                       '/items/<id>/gallery/, а не base64'),
+                        max_items=100),
+    }, extra=AnyJSON()),
+    'pdf': Object(extra=AnyJSON()),
+    'text': Object({'text': String(max_length=100000)}, required=('text',), extra=AnyJSON()),
+}
+
+FIELD_SCHEMAS = {
+    'color_scheme': Object({
+        'primary_color': HEX_COLOR,
+        'secondary_color': HEX_COLOR,
+        'accent_color': HEX_COLOR,
+        'text_color': HEX_COLOR,
+        'background_color': HEX_COLOR,
+    }, extra=AnyJSON(max_string_length=200)),
+    'social_links': Object(extra=HTTP_URL, max_keys=50),
+    'design_settings': Object({
+        'custom_blocks': Array(CUSTOM_BLOCK, max_items=100),
+    }, extra=AnyJSON(max_string_length=2000)),
+    'skills': Array(OneOf(String(max_length=200), ENTRY), max_items=200),
+    'experience': Array(ENTRY, max_items=100),
+    'education': Array(ENTRY, max_items=100),
+    'certificates': Array(ENTRY, max_items=200),
+    'languages': Array(ENTRY, max_items=50),
+    'tags': Array(String(max_length=100), max_items=50),
+}
+
+# Компиляция при импорте
+_CONTENT_DATA_VALIDATORS = {key: node.compile() for key, node in CONTENT_DATA_SCHEMAS.items()}
+_FIELD_VALIDATORS = {key: node.compile() for key, node in FIELD_SCHEMAS.items()}
+_DEFAULT_VALIDATOR = AnyJSON().compile()
+
+# Поля, для которых общий MAX_SIZE слишком мал
+FIELD_MAX_SIZES = {
+    'design_settings': MAX_DATA_URL_LENGTH + MAX_SIZE,
+}
+
+
+def validate(field, value, content_type=None):
+    """
+    Проверяет значение JSON-поля и возвращает его; SchemaError при ошибке.
+    Для content_data схема выбирается по content_type.
+    """
+    if field == 'content_data':
+        check = _CONTENT_DATA_VALIDATORS.get(content_type, _DEFAULT_VALIDATOR)
+    else:
+        check = _FIELD_VALIDATORS.get(field, _DEFAULT_VALIDATOR)
+    return check(value, (), 0, _Budget(FIELD_MAX_SIZES.get(field, MAX_SIZE)))
@@ -1,28 +1,68 @@
+from django.db import models
 from rest_framework import serializers
-import re
+from . import schemas
 from .models import Portfolio, PortfolioItem, Template
 
 
-def validate_hex_color(value):
-    """Валидация hex-цвета"""
-    if value:
-        hex_pattern = r'^#([A-Fa-f0-9]{6}|[A-Fa-f0-9]{3})$'
-        if not re.match(hex_pattern, value):
-            raise serializers.ValidationError('Неверный формат hex-цвета. Используйте формат #RRGGBB или #RGB')
-    return value
+def validate_json(field, value, content_type=None):
+    """Проверка JSON-поля по схеме из portfolio.schemas"""
+    try:
+        return schemas.validate(field, value, content_type)
+    except schemas.SchemaError as exc:
+        raise serializers.ValidationError(str(exc))
 
 
-def validate_url_list(value):
-    """Валидация списка URL для социальных сетей"""
-    if isinstance(value, dict):
-        url_pattern = r'^https?://.+'
-        for key, url in value.items():
-            if url and not re.match(url_pattern, url):
-                raise serializers.ValidationError(f'Неверный URL для {key}: {url}')
-    return value
+class SparseFieldsetMixin:
+    """
+    Оставляет в корневом сериализаторе только поля из context['fields'].
+    Набор полей вычисляет SparseFieldsetViewMixin по ?fields=, ?omit=, ?expand=;
+    вложенные сериализаторы (items внутри портфолио) не затрагиваются.
+    """
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        allowed = self.context.get('fields')
+        is_root = self.parent is None or (isinstance(self.parent, serializers.ListSerializer)
+                                          and self.parent.parent is None)
+        if allowed is not None and is_root:
+            for name in list(fields):
+                if name not in allowed:
+                    fields.pop(name)
+        return fields
+
+
+class RelativeURLMixin:
+    """
+    URL файла без хоста, с запросом и без него. В таком виде URL лежат в
+    content_data и в документе read_model, поэтому ответ портфолио не
+    зависит от того, каким путем он собран.
+    """
+    relative_url = True
+    
+    def to_representation(self, value):
+        if not value:
+            return None
+        return value.url
+
+
+class RelativeFileField(RelativeURLMixin, serializers.FileField):
+    pass
 
 
-class PortfolioItemSerializer(serializers.ModelSerializer):
+class RelativeImageField(RelativeURLMixin, serializers.ImageField):
+    pass
+
+
+class RelativeURLModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer, у которого файловые поля отдают относительные URL"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.FileField: RelativeFileField,
+        models.ImageField: RelativeImageField,
+    }
+
+
+class PortfolioItemSerializer(SparseFieldsetMixin, RelativeURLModelSerializer):
     class Meta:
         model = PortfolioItem
         fields = [
@@ -32,31 +72,17 @@ class PortfolioItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def validate_content_data(self, value):
-        """Валидация данных контента в зависимости от типа"""
+        """Валидация данных контента по схеме для типа контента"""
         if not isinstance(value, dict):
             value = {}
+        if not value:
+            # Пустые данные допустимы для любого типа
+            return value
         content_type = self.initial_data.get('content_type', self.instance.content_type if self.instance else 'image')
-        
-        if content_type == 'video':
-            if not value.get('url') and 'video_file' not in self.initial_data:
-                # Если нет ни URL, ни файла, это нормально для существующих элементов или пустых значений
-                if not self.instance or not value:
-                    pass  # Разрешаем пустое значение
-        elif content_type == 'link':
-            if value and 'url' not in value:
-                raise serializers.ValidationError('Для ссылки требуется URL')
-        elif content_type == 'gallery':
-            if value and not isinstance(value.get('images', []), list):
-                raise serializers.ValidationError('Галерея должна содержать список изображений')
-        elif content_type == 'pdf':
-            if not value.get('file') and 'pdf_file' not in self.initial_data:
-                if not self.instance or not value:
-                    pass  # Разрешаем пустое значение
-        elif content_type == 'text':
-            if value and 'text' not in value:
-                raise serializers.ValidationError('Для текстового контента требуется поле text')
-        
-        return value
+        return validate_json('content_data', value, content_type)
+    
+    def validate_tags(self, value):
+        return validate_json('tags', value)
     
     def validate_title(self, value):
         """Валидация названия работы"""
@@ -67,7 +93,7 @@ class PortfolioItemSerializer(serializers.ModelSerializer):
         return value.strip()
 
 
-class PortfolioSerializer(serializers.ModelSerializer):
+class PortfolioSerializer(SparseFieldsetMixin, RelativeURLModelSerializer):
     items = PortfolioItemSerializer(many=True, read_only=True)
     template_name = serializers.CharField(source='template.name', read_only=True, allow_null=True)
     
@@ -77,9 +103,13 @@ class PortfolioSerializer(serializers.ModelSerializer):
             'id', 'name', 'description', 'template', 'template_name', 'color_scheme', 'avatar',
             'phone', 'email', 'website', 'location', 'social_links',
             'skills', 'experience', 'education', 'certificates', 'languages',
-            'design_settings', 'items', 'created_at', 'updated_at'
+            'design_settings', 'items', 'sync_seq', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'sync_seq', 'created_at', 'updated_at']
+        # Краткое представление для списков (библиотека, админка)
+        summary_fields = ['id', 'name', 'template', 'template_name', 'created_at', 'updated_at']
+        # Вложенные данные: в списках только по ?expand=
+        expandable_fields = ['items']
         
     def validate(self, data):
         """Дополнительная валидация данных"""
@@ -89,16 +119,29 @@ class PortfolioSerializer(serializers.ModelSerializer):
     
     def validate_color_scheme(self, value):
         """Валидация цветовой схемы"""
-        if isinstance(value, dict):
-            color_fields = ['primary_color', 'secondary_color', 'accent_color', 'text_color', 'background_color']
-            for field in color_fields:
-                if field in value:
-                    validate_hex_color(value[field])
-        return value
+        return validate_json('color_scheme', value)
     
     def validate_social_links(self, value):
         """Валидация ссылок на социальные сети"""
-        return validate_url_list(value)
+        return validate_json('social_links', value)
+    
+    def validate_design_settings(self, value):
+        return validate_json('design_settings', value)
+    
+    def validate_skills(self, value):
+        return validate_json('skills', value)
+    
+    def validate_experience(self, value):
+        return validate_json('experience', value)
+    
+    def validate_education(self, value):
+        return validate_json('education', value)
+    
+    def validate_certificates(self, value):
+        return validate_json('certificates', value)
+    
+    def validate_languages(self, value):
+        return validate_json('languages', value)
     
     def validate_website(self, value):
         """Валидация веб-сайта"""
@@ -0,0 +1,63 @@
+"""
+Сигналы приложения portfolio: учет ссылок на медиафайлы (см. portfolio.media).
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+
+from . import media
+
+# Атрибут экземпляра с именами файлов на момент загрузки из БД
+ORIGINAL_FILES_ATTR = '_media_original_files'
+_UNKNOWN = object()
+
+
+def _file_name(value):
+    return getattr(value, 'name', value) or ''
+
+
+def _remember_files(sender, instance, **kwargs):
+    fields = _fields_by_model.get(sender, ())
+    # Отложенные поля (.only()/.defer()) не загружаем: старое значение неизвестно
+    instance.__dict__[ORIGINAL_FILES_ATTR] = {
+        field.attname: _file_name(instance.__dict__[field.attname]) if field.attname in instance.__dict__ else _UNKNOWN
+        for field in fields
+    }
+
+
+def _update_refs(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    original = instance.__dict__.get(ORIGINAL_FILES_ATTR, {})
+    added, removed = [], []
+    for field in _fields_by_model.get(sender, ()):
+        if update_fields is not None and field.name not in update_fields:
+            continue
+        new_name = _file_name(instance.__dict__.get(field.attname))
+        old_name = '' if created else original.get(field.attname, _UNKNOWN)
+        if old_name is _UNKNOWN:
+            # Старое значение не загружалось - изменение поля не отследить
+            continue
+        if new_name != old_name:
+            added.append(new_name)
+            removed.append(old_name)
+    if added or removed:
+        transaction.on_commit(lambda: (media.incref(added), media.decref(removed)))
+    _remember_files(sender, instance)
+
+
+def _release_refs(sender, instance, **kwargs):
+    names = [_file_name(instance.__dict__.get(field.attname)) for field in _fields_by_model.get(sender, ())]
+    transaction.on_commit(lambda: media.decref(names))
+
+
+_fields_by_model = {}
+
+
+def connect():
+    """Подключает обработчики ко всем моделям с полями на ContentAddressedStorage"""
+    for model, field in media.media_fields():
+        _fields_by_model.setdefault(model, []).append(field)
+    for model in _fields_by_model:
+        post_init.connect(_remember_files, sender=model, dispatch_uid=f'media_init_{model._meta.label}')
+        post_save.connect(_update_refs, sender=model, dispatch_uid=f'media_save_{model._meta.label}')
+        post_delete.connect(_release_refs, sender=model, dispatch_uid=f'media_delete_{model._meta.label}')
@@ -0,0 +1,19 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle_scripts(bundle_name):
+    """
+    Подключение JS-бандла из settings.STATIC_BUNDLES.
+    В продакшене - один минифицированный файл с хешем в имени,
+    при разработке - исходные файлы по отдельности.
+    """
+    if getattr(settings, 'STATIC_BUNDLES_ENABLED', not settings.DEBUG):
+        return format_html('<script src="{}" defer></script>', static(bundle_name))
+    sources = settings.STATIC_BUNDLES[bundle_name]
+    return format_html_join('\n', '<script src="{}" defer></script>', ((static(src),) for src in sources))
@@ -0,0 +1,90 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import TestCase, override_settings
+
+from . import link_preview
+from .models import LinkPreview
+
+PAGE = b"""<!DOCTYPE html>
+<html><head>
+<title>Fallback title</title>
+<meta property="og:title" content="Stub page">
+<meta property="og:description" content="Stub description">
+<meta property="og:image" content="/cover.png">
+<meta property="og:site_name" content="Stub">
+</head><body><meta property="og:title" content="Ignored"></body></html>"""
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Страница с метатегами по /page, 404 по остальным адресам"""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path == '/page':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LinkPreviewTests(TestCase):
+    """Превью ссылок на локальном stub-сервере (адрес 127.0.0.1)"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        cls.server.requests = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests.clear()
+
+    @override_settings(LINK_PREVIEW={'ALLOW_PRIVATE_NETWORKS': True})
+    def test_extracts_metadata(self):
+        data = link_preview.get_preview(f'{self.base_url}/page')
+        self.assertEqual(data['title'], 'Stub page')
+        self.assertEqual(data['description'], 'Stub description')
+        self.assertEqual(data['image'], f'{self.base_url}/cover.png')
+        self.assertEqual(data['site_name'], 'Stub')
+
+    def test_private_address_blocked(self):
+        with self.assertRaisesMessage(link_preview.LinkPreviewError, 'внутренней сети'):
+            link_preview.get_preview(f'{self.base_url}/page')
+        self.assertFalse(LinkPreview.objects.get().ok)
+
+    @override_settings(LINK_PREVIEW={'ALLOW_PRIVATE_NETWORKS': True})
+    def test_cache_hit_skips_request(self):
+        url = f'{self.base_url}/page'
+        first = link_preview.get_preview(url)
+        second = link_preview.get_preview(url)
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.requests, ['/page'])
+
+    @override_settings(LINK_PREVIEW={'ALLOW_PRIVATE_NETWORKS': True})
+    def test_failure_cached_with_negative_ttl(self):
+        url = f'{self.base_url}/missing'
+        for _ in range(2):
+            with self.assertRaisesMessage(link_preview.LinkPreviewError, '404'):
+                link_preview.get_preview(url)
+        self.assertEqual(self.server.requests, ['/missing'])
+        preview = LinkPreview.objects.get()
+        self.assertFalse(preview.ok)
+        ttl = (preview.expires_at - preview.fetched_at).total_seconds()
+        self.assertAlmostEqual(ttl, link_preview.DEFAULTS['NEGATIVE_TTL'], delta=5)
@@ -3,9 +3,10 @@ from rest_framework.routers import DefaultRouter
 from . import views
 
 router = DefaultRouter()
-router.register(r'', views.PortfolioViewSet, basename='portfolio')
+# Пустой префикс регистрируется последним, иначе items/ и templates/ попадают в detail портфолио
 router.register(r'items', views.PortfolioItemViewSet, basename='portfolio-item')
 router.register(r'templates', views.TemplateViewSet, basename='template')
+router.register(r'', views.PortfolioViewSet, basename='portfolio')
 
 urlpatterns = [
     path('', views.home_view, name='home'),
@@ -1,22 +1,29 @@
 from django.shortcuts import render, redirect
+from django.http import Http404, HttpResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
+from django.templatetags.static import static
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.core.exceptions import ValidationError
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError as DRFValidationError
 import json
-from .models import Portfolio, PortfolioItem, Template
+from .models import GalleryImage, Portfolio, PortfolioItem, Template
+from . import documents, link_preview, read_model
+from .readers import UnsupportedField, get_read_plan
 from .serializers import PortfolioSerializer, PortfolioItemSerializer, TemplateSerializer
+from portfolio_builder.uploads import MAX_IMAGE_SIZE, MAX_PDF_SIZE, MAX_VIDEO_SIZE, validate_image
+from admin_panel import rollups
 
 User = get_user_model()
 
-# Максимальные размеры файлов (в байтах)
-MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5 MB
-MAX_VIDEO_SIZE = 50 * 1024 * 1024  # 50 MB
-MAX_PDF_SIZE = 10 * 1024 * 1024  # 10 MB
+MAX_GALLERY_IMAGES = 50
+MAX_BATCH_OPERATIONS = 500
 
 
 @login_required
@@ -83,16 +90,169 @@ def create_portfolio_view(request):
     return render(request, 'portfolio/editor.html', {
         'portfolio': portfolio,
         'templates': templates,
+        'editor_bootstrap': _editor_bootstrap(portfolio),
     })
 
 
-class PortfolioViewSet(viewsets.ModelViewSet):
+def _editor_bootstrap(portfolio):
+    """Начальные данные редактора (выводятся через json_script, а не внутри JS)"""
+    items = [{
+        'id': item.id,
+        'title': item.title,
+        'description': item.description,
+        'image': item.image.url if item.image else None,
+        'content_type': item.content_type or 'image',
+        'content_data': item.content_data or {},
+        'category': item.category,
+        'tags': item.tags or [],
+    } for item in portfolio.items.all()]
+    return {
+        'portfolio_id': portfolio.id,
+        'template_id': portfolio.template_id,
+        'color_scheme': portfolio.color_scheme or {},
+        'design_settings': portfolio.design_settings or {},
+        'sync_seq': portfolio.sync_seq,
+        'items': items,
+        'assets': {
+            # Модуль экспорта загружается лениво, при первом экспорте
+            'export': static('js/portfolio-export.js'),
+        },
+    }
+
+
+def clean_image(uploaded_file):
+    """Проверенное и очищенное изображение (portfolio_builder.uploads) для API"""
+    try:
+        return validate_image(uploaded_file, MAX_IMAGE_SIZE)
+    except ValidationError as exc:
+        raise DRFValidationError(exc.messages[0])
+
+
+def _split_param(value):
+    return {part.strip() for part in value.split(',') if part.strip()} if value else set()
+
+
+class SparseFieldsetViewMixin:
+    """
+    Выбор полей ответа для GET-запросов:
+    ?fields=a,b - только перечисленные поля, ?omit=a,b - все, кроме перечисленных,
+    ?expand=items - добавить вложенные данные (Meta.expandable_fields).
+    Списки по умолчанию отдаются в кратком виде (Meta.summary_fields).
+    Запрос к БД сужается через only()/select_related, prefetch - только для нужных связей.
+    """
+    
+    def get_fieldset(self):
+        """Множество полей ответа или None, если выбор полей не применяется"""
+        if self.request is None or self.request.method not in ('GET', 'HEAD'):
+            return None
+        if hasattr(self, '_fieldset'):
+            return self._fieldset
+        meta = self.get_serializer_class().Meta
+        all_fields = list(meta.fields)
+        params = self.request.query_params
+        requested = _split_param(params.get('fields'))
+        expandable = set(getattr(meta, 'expandable_fields', ()))
+        
+        if requested:
+            fieldset = {name for name in all_fields if name in requested}
+        elif self.action == 'list':
+            fieldset = set(getattr(meta, 'summary_fields', all_fields))
+        else:
+            fieldset = set(all_fields)
+        fieldset |= _split_param(params.get('expand')) & expandable
+        fieldset -= _split_param(params.get('omit'))
+        fieldset.add('id')
+        self._fieldset = fieldset
+        return fieldset
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            context['fields'] = fieldset
+        return context
+    
+    def narrow_queryset(self, queryset):
+        """only()/select_related/prefetch_related по выбранным полям"""
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+        model = queryset.model
+        serializer_fields = self.get_serializer_class()().fields
+        only = {model._meta.pk.name}
+        select, prefetch = set(), set()
+        for name in fieldset:
+            field = serializer_fields.get(name)
+            if field is None:
+                continue
+            source = field.source
+            if '.' in source:
+                # template.name -> select_related('template'), only('template__name')
+                relation, _, attr = source.partition('.')
+                select.add(relation)
+                only.add(relation)
+                only.add(f'{relation}__{attr.replace(".", "__")}')
+                continue
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete:
+                only.add(source)
+            elif model_field.is_relation:
+                prefetch.add(source)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*only)
+
+
+class FastReadViewMixin:
+    """
+    list/retrieve без создания моделей: QuerySet.values() и план полей
+    (portfolio.readers). Если план построить нельзя - обычный сериализатор.
+    """
+    
+    def fast_read(self, queryset):
+        """Список dict в формате сериализатора или None"""
+        fieldset = self.get_fieldset() if hasattr(self, 'get_fieldset') else None
+        try:
+            plan = get_read_plan(self.get_serializer_class(), fieldset)
+        except UnsupportedField:
+            return None
+        return plan.read(queryset, self.request)
+    
+    def list(self, request, *args, **kwargs):
+        data = None
+        if self.paginator is None:
+            data = self.fast_read(self.filter_queryset(self.get_queryset()))
+        if data is None:
+            return super().list(request, *args, **kwargs)
+        return Response(data)
+    
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            data = self.fast_read(queryset)
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if data is None:
+            return super().retrieve(request, *args, **kwargs)
+        if not data:
+            raise Http404
+        return Response(data[0])
+
+
+class PortfolioViewSet(FastReadViewMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet для портфолио"""
     serializer_class = PortfolioSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Portfolio.objects.filter(user=self.request.user)
+        return self.narrow_queryset(Portfolio.objects.filter(user=self.request.user))
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -100,18 +260,26 @@ class PortfolioViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get', 'post'])
     def my_portfolio(self, request):
         """Получить или создать портфолио пользователя"""
+        if request.method == 'GET' and not request.query_params.keys() & {'fields', 'omit', 'expand'}:
+            # Полный ответ - готовый документ (portfolio.read_model), один запрос
+            document = read_model.get_document(request.user.id)
+            if document is not None:
+                return HttpResponse(document.body, content_type='application/json')
         portfolio, created = Portfolio.objects.get_or_create(user=request.user)
         if request.method == 'GET':
+            data = self.fast_read(self.get_queryset().filter(pk=portfolio.pk))
+            if data:
+                return Response(data[0])
             serializer = self.get_serializer(portfolio)
             return Response(serializer.data)
         else:
             # Валидация загружаемых файлов
+            avatar = None
             if 'avatar' in request.FILES:
-                avatar_file = request.FILES['avatar']
-                if not avatar_file.content_type.startswith('image/'):
-                    return Response({'error': 'Файл должен быть изображением'}, status=status.HTTP_400_BAD_REQUEST)
-                if avatar_file.size > MAX_IMAGE_SIZE:
-                    return Response({'error': f'Размер файла не должен превышать {MAX_IMAGE_SIZE // (1024*1024)}MB'}, status=status.HTTP_400_BAD_REQUEST)
+                try:
+                    avatar = validate_image(request.FILES['avatar'], MAX_IMAGE_SIZE)
+                except ValidationError as exc:
+                    return Response({'error': exc.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
             
             # Обработка данных из FormData
             data = {}
@@ -123,6 +291,8 @@ class PortfolioViewSet(viewsets.ModelViewSet):
                         data[key] = value
                 else:
                     data[key] = value
+            if avatar is not None:
+                data['avatar'] = avatar
             
             serializer = self.get_serializer(portfolio, data=data, partial=True)
             if serializer.is_valid():
@@ -131,16 +301,23 @@ class PortfolioViewSet(viewsets.ModelViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PortfolioItemViewSet(viewsets.ModelViewSet):
+class PortfolioItemViewSet(FastReadViewMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet для работ в портфолио"""
     serializer_class = PortfolioItemSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
+        queryset = PortfolioItem.objects.filter(portfolio__user=self.request.user)
         portfolio_id = self.request.query_params.get('portfolio')
         if portfolio_id:
-            return PortfolioItem.objects.filter(portfolio_id=portfolio_id, portfolio__user=self.request.user)
-        return PortfolioItem.objects.filter(portfolio__user=self.request.user)
+            queryset = queryset.filter(portfolio_id=portfolio_id)
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            # search_text - текст загруженных документов (portfolio.documents)
+            queryset = queryset.filter(
+                Q(title__icontains=search) | Q(description__icontains=search) | Q(search_text__icontains=search)
+            )
+        return self.narrow_queryset(queryset)
     
     def perform_create(self, serializer):
         portfolio_id = self.request.data.get('portfolio')
@@ -149,12 +326,9 @@ class PortfolioItemViewSet(viewsets.ModelViewSet):
         # Валидация файлов в зависимости от типа контента
         content_type = self.request.data.get('content_type', 'image')
         
+        extra = {}
         if content_type == 'image' and 'image' in self.request.FILES:
-            image_file = self.request.FILES['image']
-            if not image_file.content_type.startswith('image/'):
-                raise DRFValidationError('Файл должен быть изображением')
-            if image_file.size > MAX_IMAGE_SIZE:
-                raise DRFValidationError(f'Размер изображения не должен превышать {MAX_IMAGE_SIZE // (1024*1024)}MB')
+            extra['image'] = clean_image(self.request.FILES['image'])
         
         elif content_type == 'video' and 'video_file' in self.request.FILES:
             video_file = self.request.FILES['video_file']
@@ -170,18 +344,17 @@ class PortfolioItemViewSet(viewsets.ModelViewSet):
             if pdf_file.size > MAX_PDF_SIZE:
                 raise DRFValidationError(f'Размер PDF не должен превышать {MAX_PDF_SIZE // (1024*1024)}MB')
         
-        serializer.save(portfolio=portfolio)
+        item = serializer.save(portfolio=portfolio, **extra)
+        if content_type == 'pdf' and 'pdf_file' in self.request.FILES:
+            documents.attach_document(item, self.request.FILES['pdf_file'])
     
     def perform_update(self, serializer):
         # Валидация файлов при обновлении
         content_type = self.request.data.get('content_type', serializer.instance.content_type if serializer.instance else 'image')
         
+        extra = {}
         if content_type == 'image' and 'image' in self.request.FILES:
-            image_file = self.request.FILES['image']
-            if not image_file.content_type.startswith('image/'):
-                raise DRFValidationError('Файл должен быть изображением')
-            if image_file.size > MAX_IMAGE_SIZE:
-                raise DRFValidationError(f'Размер изображения не должен превышать {MAX_IMAGE_SIZE // (1024*1024)}MB')
+            extra['image'] = clean_image(self.request.FILES['image'])
         elif content_type == 'video' and 'video_file' in self.request.FILES:
             video_file = self.request.FILES['video_file']
             if not video_file.content_type.startswith('video/'):
@@ -195,7 +368,9 @@ class PortfolioItemViewSet(viewsets.ModelViewSet):
             if pdf_file.size > MAX_PDF_SIZE:
                 raise DRFValidationError(f'Размер PDF не должен превышать {MAX_PDF_SIZE // (1024*1024)}MB')
         
-        serializer.save()
+        item = serializer.save(**extra)
+        if content_type == 'pdf' and 'pdf_file' in self.request.FILES:
+            documents.attach_document(item, self.request.FILES['pdf_file'])
     
     @action(detail=False, methods=['post'])
     def reorder(self, request):
@@ -220,13 +395,170 @@ class PortfolioItemViewSet(viewsets.ModelViewSet):
         id_to_order = {int(item_id): order for order, item_id in enumerate(item_ids) if item_id}
         
         updated_count = 0
-        for item in items:
-            if item.id in id_to_order:
-                item.order = id_to_order[item.id]
-                item.save(update_fields=['order'])
-                updated_count += 1
+        # Одна транзакция - документ портфолио пересобирается один раз
+        with transaction.atomic():
+            for item in items:
+                if item.id in id_to_order:
+                    item.order = id_to_order[item.id]
+                    item.save(update_fields=['order'])
+                    updated_count += 1
         
         return Response({'success': True, 'updated_count': updated_count})
+    
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Пакетное создание, изменение и удаление работ одним запросом.
+        Тело: {"portfolio": id, "operations": [{"op": "create", "data": {...}},
+        {"op": "update", "id": 1, "data": {...}}, {"op": "delete", "id": 2}]}.
+        Все операции проверяются заранее; при любой ошибке ничего не сохраняется.
+        """
+        operations = request.data.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return Response({'error': 'operations должен быть непустым списком'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return Response({'error': f'Не больше {MAX_BATCH_OPERATIONS} операций за запрос'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            portfolio = Portfolio.objects.get(id=request.data.get('portfolio'), user=request.user)
+        except (Portfolio.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'Портфолио не найдено'}, status=status.HTTP_404_NOT_FOUND)
+        
+        # Все изменяемые и удаляемые работы - одним запросом
+        ids = set()
+        for operation in operations:
+            if isinstance(operation, dict) and operation.get('op') in ('update', 'delete'):
+                try:
+                    ids.add(int(operation.get('id')))
+                except (TypeError, ValueError):
+                    pass
+        existing = PortfolioItem.objects.filter(portfolio=portfolio).in_bulk(ids)
+        
+        results = []
+        to_create, to_update, to_delete = [], [], []
+        update_fields = set()
+        seen_ids = set()
+        has_errors = False
+        for index, operation in enumerate(operations):
+            op = operation.get('op') if isinstance(operation, dict) else None
+            error = None
+            if op not in ('create', 'update', 'delete'):
+                error = 'op должен быть create, update или delete'
+            elif op == 'create':
+                serializer = self.get_serializer(data=operation.get('data') or {})
+                if serializer.is_valid():
+                    to_create.append((index, PortfolioItem(portfolio=portfolio, **serializer.validated_data)))
+                else:
+                    error = serializer.errors
+            else:
+                try:
+                    item_id = int(operation.get('id'))
+                except (TypeError, ValueError):
+                    item_id = None
+                item = existing.get(item_id)
+                if item is None:
+                    error = 'Работа не найдена'
+                elif item_id in seen_ids:
+                    error = 'Работа встречается в пакете несколько раз'
+                elif op == 'delete':
+                    to_delete.append((index, item))
+                else:
+                    serializer = self.get_serializer(item, data=operation.get('data') or {}, partial=True)
+                    if serializer.is_valid():
+                        for field, value in serializer.validated_data.items():
+                            setattr(item, field, value)
+                            update_fields.add(field)
+                        to_update.append((index, item))
+                    else:
+                        error = serializer.errors
+                seen_ids.add(item_id)
+            
+            if error:
+                has_errors = True
+                results.append({'index': index, 'op': op, 'status': 'error', 'errors': error})
+            else:
+                results.append({'index': index, 'op': op, 'status': 'ok'})
+        
+        if has_errors:
+            return Response({'success': False, 'results': results}, status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            if to_delete:
+                PortfolioItem.objects.filter(pk__in=[item.pk for _, item in to_delete]).delete()
+            if to_update:
+                # bulk_update не заполняет auto_now
+                now = timezone.now()
+                for _, item in to_update:
+                    item.updated_at = now
+                PortfolioItem.objects.bulk_update([item for _, item in to_update], [*update_fields, 'updated_at'])
+            if to_create:
+                PortfolioItem.objects.bulk_create([item for _, item in to_create])
+            # bulk_update и bulk_create не посылают post_save - документ и метрики
+            # изменений обновляем явно. QuerySet.delete() посылает pre_delete/post_delete
+            # для каждой строки: удаления учитывают обработчики сигналов
+            read_model.invalidate(portfolio.pk)
+            rollups.items_saved(created=[item for _, item in to_create], updated=[item for _, item in to_update])
+        
+        for index, item in to_create + to_update:
+            results[index]['data'] = self.get_serializer(item).data
+        for index, item in to_delete:
+            results[index]['id'] = item.pk
+        return Response({'success': True, 'results': results})
+    
+    @action(detail=False, methods=['post'], url_path='link-preview')
+    def link_preview(self, request):
+        """
+        Метаданные страницы по ссылке (Open Graph/Twitter, с кешем).
+        Если передан item (работа-ссылка), превью сохраняется в ее content_data.
+        """
+        try:
+            preview = link_preview.get_preview(request.data.get('url'))
+        except link_preview.LinkPreviewError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        item_id = request.data.get('item')
+        if item_id:
+            try:
+                item = self.get_queryset().get(pk=item_id, content_type='link')
+            except (PortfolioItem.DoesNotExist, ValueError, TypeError):
+                return Response({'error': 'Работа-ссылка не найдена'}, status=status.HTTP_404_NOT_FOUND)
+            item.content_data = link_preview.apply_to_content_data(item.content_data, preview)
+            item.save(update_fields=['content_data', 'updated_at'])
+        return Response(preview)
+    
+    @action(detail=True, methods=['post'], url_path='gallery')
+    def gallery_upload(self, request, pk=None):
+        """Загрузка нескольких изображений в галерею (поле images, multipart)"""
+        item = self.get_object()
+        if item.content_type != 'gallery':
+            return Response({'error': 'Работа не является галереей'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        files = request.FILES.getlist('images')
+        if not files:
+            return Response({'error': 'Не переданы изображения'}, status=status.HTTP_400_BAD_REQUEST)
+        if item.gallery_images.count() + len(files) > MAX_GALLERY_IMAGES:
+            return Response({'error': f'В галерее может быть не больше {MAX_GALLERY_IMAGES} изображений'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        files = [clean_image(image_file) for image_file in files]
+        
+        last = item.gallery_images.order_by('-order').first()
+        start = last.order + 1 if last else 0
+        with transaction.atomic():
+            for offset, image_file in enumerate(files):
+                GalleryImage.objects.create(item=item, image=image_file, order=start + offset)
+            item.sync_gallery()
+        return Response(self.get_serializer(item).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['delete'], url_path=r'gallery/(?P<image_id>\d+)')
+    def gallery_delete(self, request, pk=None, image_id=None):
+        """Удаление изображения из галереи"""
+        item = self.get_object()
+        deleted, _ = item.gallery_images.filter(pk=image_id).delete()
+        if not deleted:
+            return Response({'error': 'Изображение не найдено'}, status=status.HTTP_404_NOT_FOUND)
+        item.sync_gallery()
+        return Response(self.get_serializer(item).data)
 
 
 class TemplateViewSet(viewsets.ReadOnlyModelViewSet):
@@ -0,0 +1,106 @@
+"""
+Админка для больших таблиц.
+
+Списки объектов не считают точный COUNT(*) по всей таблице: сначала
+считается не больше EXACT_COUNT_LIMIT строк (COUNT по подзапросу с LIMIT),
+а если их больше - берется оценка планировщика (PostgreSQL: reltuples для
+таблицы без фильтров, EXPLAIN для выборки с фильтрами; SQLite: sqlite_stat1
+после ANALYZE). Полный счетчик "всего N" отключен (show_full_result_count).
+
+Встроенные формы связанных объектов выводятся постранично
+(PaginatedInlineMixin), а не все сразу.
+"""
+import json
+
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimate_count(queryset):
+    """Оценка числа строк выборки по статистике СУБД или None"""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                if not queryset.query.where:
+                    cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+                    row = cursor.fetchone()
+                    return int(row[0]) if row and row[0] >= 0 else None
+                sql, params = queryset.order_by().query.sql_with_params()
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return int(plan[0]['Plan']['Plan Rows'])
+            if connection.vendor == 'sqlite' and not queryset.query.where:
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+                row = cursor.fetchone()
+                return int(row[0].split()[0]) if row else None
+    except (DatabaseError, ValueError, KeyError, IndexError):
+        return None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Точный счетчик до EXACT_COUNT_LIMIT строк, дальше - оценка планировщика"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+        # values('pk') убирает из подзапроса вычисляемые колонки списка
+        capped = queryset.order_by().values('pk')[:EXACT_COUNT_LIMIT + 1].count()
+        if capped <= EXACT_COUNT_LIMIT:
+            return capped
+        return max(estimate_count(queryset) or 0, capped)
+
+
+class LargeTableAdminMixin:
+    """ModelAdmin для больших таблиц: оценочный счетчик, без полного COUNT(*)"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Встроенный формсет, показывающий одну страницу связанных объектов"""
+    per_page = 20
+    page_number = 1
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            queryset = super().get_queryset()
+            self.paginator = Paginator(queryset, self.per_page)
+            self.page = self.paginator.get_page(self.page_number)
+            objects = list(self.page.object_list)
+            # Связь с родителем уже известна - без запроса на каждую строку (__str__ и т.п.)
+            for obj in objects:
+                self.fk.set_cached_value(obj, self.instance)
+            self._queryset = objects
+        return self._queryset
+
+
+class PaginatedInlineMixin:
+    """
+    Постраничный inline: номер страницы - в GET-параметре <prefix>_page
+    (сохраняется при отправке формы, т.к. форма админки отправляется на тот же URL)
+    """
+    formset = PaginatedInlineFormSet
+    per_page = 20
+    template = 'admin/edit_inline/tabular_paginated.html'
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        page_param = f'{formset.get_default_prefix()}_page'
+        return type(formset.__name__, (formset,), {
+            'per_page': self.per_page,
+            'page_number': request.GET.get(page_param) or 1,
+            'page_param': page_param,
+        })
+
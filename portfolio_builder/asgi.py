@@ -2,6 +2,8 @@
 ASGI config for portfolio_builder project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django, WebSocket connections go to the editor sync channel
+(see ``portfolio.realtime``).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -13,5 +15,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio_builder.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
 
+# Компиляция шаблонов до первого запроса (portfolio_builder.template_warmup)
+from portfolio_builder.template_warmup import warm_up  # noqa: E402
+
+warm_up()
+
+# Импорт после инициализации Django: модуль использует модели
+from portfolio.realtime import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,237 @@
+"""
+Чтение с реплик БД для безопасных запросов (GET, HEAD, OPTIONS).
+
+ReplicaMiddleware решает, можно ли запросу читать с реплики: метод
+безопасный, представление есть в READ_REPLICAS['VIEWS'] (или это список
+объектов стандартной админки) и пользователь не закреплен за основной БД.
+ReplicaRouter направляет чтение на выбранную реплику, запись - всегда в
+default. Вне запросов (команды, фоновые потоки) все идет в default.
+
+Чтение своих записей: после записи запрос до конца читает из default, а
+ответ ставит cookie, которая PIN_SECONDS секунд держит пользователя на
+основной БД. Записью считается выполненный на default INSERT/UPDATE/DELETE
+(execute_wrapper), а не обращение к db_for_write: get_or_create и
+select_for_update без изменений пользователя не закрепляют. Внутри
+транзакции на default чтение тоже идет в default. Представление, которому
+нужны только что созданные данные (прогресс задания сразу после его
+создания), вызывает use_primary().
+Реплика может отставать на MAX_LAG плюс рост отставания с последней
+проверки (до LAG_CHECK_INTERVAL), поэтому PIN_SECONDS по умолчанию равен
+этой сумме, а меньшее значение - ошибка конфигурации.
+
+Отставание реплики проверяется не чаще раза в LAG_CHECK_INTERVAL секунд;
+реплика с отставанием больше MAX_LAG (или недоступная) пропускается, а
+если подходящих нет - чтение идет в default. Отставание определяется для
+PostgreSQL по времени последней примененной транзакции, для SQLite - по
+времени изменения файлов (локальная проверка: копия базы командой
+sync_replicas); для остальных СУБД считается нулевым.
+
+Настройки: settings.READ_REPLICAS (см. DEFAULTS).
+"""
+import contextvars
+import logging
+import math
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ALIASES': [],              # алиасы реплик в DATABASES
+    'VIEWS': [],                # представления (пути к классам/функциям), читающие с реплик
+    'ADMIN_CHANGELISTS': True,  # списки объектов стандартной админки
+    'PIN_SECONDS': None,        # сколько читать из default после записи (None - MAX_LAG + LAG_CHECK_INTERVAL)
+    'MAX_LAG': 5,               # допустимое отставание реплики, секунд
+    'LAG_CHECK_INTERVAL': 5,    # секунд между проверками отставания
+    'COOKIE_NAME': 'db_pin',
+}
+
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'READ_REPLICAS', {})}
+
+
+def pin_seconds(config):
+    """Срок закрепления за default после записи; ImproperlyConfigured, если реплика может отстать сильнее"""
+    minimum = math.ceil(config['MAX_LAG'] + config['LAG_CHECK_INTERVAL'])
+    if config['PIN_SECONDS'] is None:
+        return minimum
+    if config['PIN_SECONDS'] < minimum:
+        raise ImproperlyConfigured(
+            f"READ_REPLICAS['PIN_SECONDS'] ({config['PIN_SECONDS']}) меньше MAX_LAG + LAG_CHECK_INTERVAL "
+            f"({minimum}): после записи пользователь может прочитать с реплики устаревшие данные"
+        )
+    return config['PIN_SECONDS']
+
+
+class _RequestState:
+    """Состояние маршрутизации текущего запроса"""
+
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self):
+        self.replica = None  # алиас реплики для чтения или None
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('replica_routing', default=None)
+
+
+# ==================== Отставание реплик ====================
+
+def _lag_postgresql(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+def _lag_sqlite(connection):
+    primary = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+    replica = connection.settings_dict['NAME']
+    if connection.is_in_memory_db() or connections[DEFAULT_DB_ALIAS].is_in_memory_db():
+        return 0.0
+    return max(os.path.getmtime(primary) - os.path.getmtime(replica), 0.0)
+
+
+LAG_CHECKS = {
+    'postgresql': _lag_postgresql,
+    'sqlite': _lag_sqlite,
+}
+
+
+def replica_lag(alias):
+    """Отставание реплики в секундах (inf, если реплика недоступна)"""
+    connection = connections[alias]
+    check = LAG_CHECKS.get(connection.vendor)
+    if check is None:
+        return 0.0
+    try:
+        return check(connection)
+    except (DatabaseError, OSError):
+        logger.warning('Реплика %s недоступна', alias, exc_info=True)
+        return float('inf')
+
+
+_lag_lock = threading.Lock()
+_lags = {}  # alias -> (время проверки, отставание)
+
+
+def _healthy_replicas(config):
+    now = time.monotonic()
+    healthy = []
+    for alias in config['ALIASES']:
+        checked = _lags.get(alias)
+        if checked is None or now - checked[0] >= config['LAG_CHECK_INTERVAL']:
+            with _lag_lock:
+                checked = _lags.get(alias)
+                if checked is None or now - checked[0] >= config['LAG_CHECK_INTERVAL']:
+                    checked = _lags[alias] = (now, replica_lag(alias))
+        if checked[1] <= config['MAX_LAG']:
+            healthy.append(alias)
+    return healthy
+
+
+def choose_replica(config=None):
+    """Алиас реплики с допустимым отставанием или None"""
+    healthy = _healthy_replicas(config or get_config())
+    return random.choice(healthy) if healthy else None
+
+
+# ==================== Маршрутизация ====================
+
+class ReplicaRouter:
+    """Чтение - с реплики, выбранной ReplicaMiddleware; запись - в default"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        # Явно: иначе объект, прочитанный с реплики, сохранился бы в нее
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными
+        if db in get_config()['ALIASES']:
+            return False
+        return None
+
+
+def use_primary():
+    """До конца текущего запроса читать из default"""
+    state = _state.get()
+    if state is not None:
+        state.replica = None
+
+
+def _track_writes(execute, sql, params, many, context):
+    state = _state.get()
+    if state is not None and not state.wrote and sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        state.wrote = True
+    return execute(sql, params, many, context)
+
+
+def _view_name(view_func):
+    view = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None) or view_func
+    return f'{view.__module__}.{view.__qualname__}'
+
+
+class ReplicaMiddleware:
+    """Выбирает реплику для безопасных запросов к представлениям из READ_REPLICAS['VIEWS']"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = get_config()
+        self.config = config
+        self.enabled = bool(config['ALIASES'])
+        self.views = frozenset(config['VIEWS'])
+        self.pin_seconds = pin_seconds(config)
+
+    def wants_replica(self, request, view_func):
+        if request.method not in SAFE_METHODS or self.config['COOKIE_NAME'] in request.COOKIES:
+            return False
+        if _view_name(view_func) in self.views:
+            return True
+        match = request.resolver_match
+        return (self.config['ADMIN_CHANGELISTS'] and match is not None and match.namespace == 'admin'
+                and (match.url_name or '').endswith('_changelist'))
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        state = _RequestState()
+        token = _state.set(state)
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(_track_writes):
+                response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            response.set_cookie(self.config['COOKIE_NAME'], '1', max_age=self.pin_seconds,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        if state is not None and self.wants_replica(request, view_func):
+            state.replica = choose_replica(self.config)
+        return None
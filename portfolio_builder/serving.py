@@ -0,0 +1,194 @@
+"""
+Раздача статики и медиа в продакшене.
+
+Статика: предварительно сжатые при collectstatic файлы (.br/.gz) отдаются
+с нужным Content-Encoding. Медиа: поддержка HTTP Range (перемотка видео) и
+передача отдачи файла веб-серверу через X-Accel-Redirect (nginx) или
+X-Sendfile (Apache, lighttpd).
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Варианты сжатия в порядке предпочтения: (кодировка, расширение файла)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _resolve(root, path):
+    """Абсолютный путь к файлу внутри root или 404"""
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    if not os.path.isfile(fullpath):
+        raise Http404('Файл не найден')
+    return path, fullpath
+
+
+def _accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _not_modified(request, stat):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return _etag(stat) in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(stat.st_mtime) <= if_modified_since
+
+
+def _set_validators(response, stat):
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = _etag(stat)
+
+
+def _parse_range(header, size):
+    """(start, end) для одиночного диапазона bytes=..., None - заголовок не подходит, False - 416"""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-500: последние 500 байт
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _range_response(request, fullpath, stat, content_type):
+    """Ответ с поддержкой Range: 206 для корректного диапазона, 416 для некорректного"""
+    size = stat.st_size
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (not if_range or if_range == _etag(stat)):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is not None:
+            start, end = byte_range
+            f = open(fullpath, 'rb')
+            f.seek(start)
+            response = StreamingHttpResponse(_limited_reader(f, end - start + 1), status=206,
+                                             content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+            response['Accept-Ranges'] = 'bytes'
+            _set_validators(response, stat)
+            return response
+
+    response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+    response['Content-Length'] = str(size)
+    response['Accept-Ranges'] = 'bytes'
+    _set_validators(response, stat)
+    return response
+
+
+def _limited_reader(f, length, chunk_size=64 * 1024):
+    """Читает из файла не более length байт и закрывает его"""
+    try:
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+@require_safe
+def serve_static(request, path):
+    """Статика из STATIC_ROOT с выбором предварительно сжатого варианта"""
+    path, fullpath = _resolve(settings.STATIC_ROOT, path)
+    content_type, _ = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+
+    accepted = _accepted_encodings(request)
+    encoding = None
+    for coding, suffix in ENCODINGS:
+        if coding in accepted and os.path.isfile(fullpath + suffix):
+            encoding = coding
+            fullpath += suffix
+            break
+
+    stat = os.stat(fullpath)
+    if _not_modified(request, stat):
+        response = HttpResponseNotModified()
+        _set_validators(response, stat)
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+    response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+    response['Content-Length'] = str(stat.st_size)
+    response['Vary'] = 'Accept-Encoding'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    _set_validators(response, stat)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Медиа из MEDIA_ROOT: Range-запросы или передача отдачи веб-серверу"""
+    path, fullpath = _resolve(settings.MEDIA_ROOT, path)
+    content_type, _ = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+    stat = os.stat(fullpath)
+
+    backend = getattr(settings, 'MEDIA_SENDFILE_BACKEND', None)
+    if backend == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(path)
+        _set_validators(response, stat)
+        return response
+    if backend == 'xsendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = fullpath
+        _set_validators(response, stat)
+        return response
+
+    if _not_modified(request, stat):
+        response = HttpResponseNotModified()
+        _set_validators(response, stat)
+        return response
+    response = _range_response(request, fullpath, stat, content_type)
+    if path.startswith('cas/'):
+        # Имя файла - хеш содержимого, он никогда не меняется
+        patch_cache_control(response, public=True, max_age=settings.STATIC_IMMUTABLE_MAX_AGE, immutable=True)
+    return response
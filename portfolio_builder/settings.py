@@ -33,6 +33,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'accounts',
     'portfolio',
     'admin_panel',
@@ -40,14 +41,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'portfolio.middleware.StaticCacheControlMiddleware',
+    'portfolio_builder.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    # Временно отключен для отладки
-    # 'portfolio.middleware.AuthRequiredMiddleware',
+    'portfolio.middleware.AuthRequiredMiddleware',
 ]
 
 ROOT_URLCONF = 'portfolio_builder.urls'
@@ -56,7 +58,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -64,11 +65,23 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Скомпилированные шаблоны хранятся в памяти процесса; при DEBUG
+            # кеш сбрасывается автоперезагрузчиком при изменении файлов
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Компиляция всех шаблонов при старте процесса (wsgi.py/asgi.py)
+TEMPLATE_WARMUP = not DEBUG
+
 WSGI_APPLICATION = 'portfolio_builder.wsgi.application'
+ASGI_APPLICATION = 'portfolio_builder.asgi.application'
 
 
 # Database
@@ -81,6 +94,34 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения (portfolio_builder.replicas): DB_REPLICAS - пути к файлам
+# SQLite через запятую (копии основной базы, см. команду sync_replicas)
+for _index, _name in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica_{_index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _name.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['portfolio_builder.replicas.ReplicaRouter']
+
+READ_REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    'VIEWS': [
+        'portfolio.views.PortfolioViewSet',
+        'portfolio.views.PortfolioItemViewSet',
+        'portfolio.views.TemplateViewSet',
+        'admin_panel.views.admin_users_view',
+        'admin_panel.views.admin_portfolios_view',
+        'admin_panel.views.admin_templates_view',
+        'admin_panel.views.AdminUserViewSet',
+    ],
+    'ADMIN_CHANGELISTS': True,
+    # PIN_SECONDS по умолчанию - MAX_LAG + LAG_CHECK_INTERVAL (меньше нельзя)
+    'MAX_LAG': 5,
+    'LAG_CHECK_INTERVAL': 5,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -120,15 +161,92 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic собирает бандлы, минифицирует JS/CSS и добавляет хеш в имена файлов
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'portfolio_builder.storage.BundledManifestStaticFilesStorage',
+    },
+    # Аватары, изображения работ и превью шаблонов (дедупликация по содержимому)
+    'media': {
+        'BACKEND': 'portfolio_builder.storage.ContentAddressedStorage',
+    },
+}
+STATIC_BUNDLES = {
+    'js/editor.bundle.js': [
+        'js/portfolio-service.js',
+        'js/portfolio-renderer.js',
+        'js/portfolio-sync.js',
+        'js/editor/editor.js',
+    ],
+}
+# В DEBUG шаблоны подключают исходные файлы, в продакшене - собранные бандлы
+STATIC_BUNDLES_ENABLED = not DEBUG
+STATIC_MINIFY = True
+# Срок кеширования статики с хешем в имени (секунды)
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# collectstatic сохраняет рядом с файлами сжатые копии .gz (и .br, если установлен brotli)
+STATIC_PRECOMPRESS = True
+# Раздача статики из STATIC_ROOT самим Django (portfolio_builder.serving)
+SERVE_STATIC_FILES = True
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+SERVE_MEDIA_FILES = True
+# None - файл отдает Django (с поддержкой Range), 'nginx' - X-Accel-Redirect,
+# 'xsendfile' - X-Sendfile (Apache mod_xsendfile, lighttpd)
+MEDIA_SENDFILE_BACKEND = os.environ.get('MEDIA_SENDFILE_BACKEND') or None
+# internal location в nginx, указывающий на MEDIA_ROOT
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+# Файлы без ссылок удаляются командой gc_media не раньше, чем через это время (секунды)
+MEDIA_GC_GRACE_PERIOD = 24 * 60 * 60
 
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 10240
 
+# Кеши: локальные по умолчанию; для нескольких процессов/узлов - общий (Redis, Memcached)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+# Общий кеш сессий, обязателен для SESSION_TIER=cached_db (например, redis://localhost:6379/1)
+if os.environ.get('SESSION_CACHE_URL'):
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['SESSION_CACHE_URL'],
+    }
+
+# Сессии (accounts.sessions): 'cached_db', 'signed_cookies' или 'db'. По умолчанию
+# запросы не читают таблицу сессий: cached_db с общим кешем, если он задан, иначе
+# данные сессии в подписанной cookie
+SESSION_TIER = os.environ.get('SESSION_TIER') or ('cached_db' if os.environ.get('SESSION_CACHE_URL') else 'signed_cookies')
+SESSION_ENGINE = {
+    'cached_db': 'accounts.sessions',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[SESSION_TIER]
+SESSION_CACHE_ALIAS = 'sessions'
+# Срок жизни записи сессии в кеше (cached_db); None - без ограничения
+SESSION_CACHE_MAX_AGE = 5 * 60
+# Фоновая очистка истекших сессий пачками (или команда sweep_sessions)
+SESSION_SWEEP_INTERVAL = 60 * 60
+SESSION_SWEEP_BATCH_SIZE = 1000
+
+# Изображения (portfolio_builder.uploads): проверка по заголовку до декодирования
+UPLOAD_IMAGE_MAX_PIXELS = 40_000_000
+UPLOAD_IMAGE_MAX_FRAMES = 300
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -146,6 +264,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson, если установлен (portfolio_builder.renderers)
+    'DEFAULT_RENDERER_CLASSES': [
+        'portfolio_builder.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'portfolio_builder.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # JWT Settings
@@ -157,10 +285,65 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Проверка черного списка через фильтр Блума (accounts.tokens)
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.tokens.TokenRefreshSerializer',
+}
+
+# Черный список refresh-токенов (accounts.tokens); истекшие токены удаляет
+# команда purge_expired_tokens
+JWT_BLACKLIST = {
+    'CAPACITY': 100000,
+    'ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 1,
+    'SYNC_OVERLAP': 60,
+    'REBUILD_INTERVAL': 600,
 }
 
+# Синхронизация редактора в реальном времени (WebSocket, только под ASGI-сервером)
+# Для нескольких узлов: 'BROKER': 'portfolio.realtime.RedisBroker',
+#                       'OPTIONS': {'URL': 'redis://localhost:6379/0'}
+REALTIME_SYNC = {
+    'BROKER': os.environ.get('REALTIME_SYNC_BROKER', 'portfolio.realtime.InMemoryBroker'),
+    'OPTIONS': {},
+    # Перепроверка доступа открытых соединений и ожидание токена, секунд
+    'AUTH_RECHECK_INTERVAL': 10,
+    'AUTH_TIMEOUT': 10,
+}
+
+# Превью ссылок (portfolio.link_preview): лимиты загрузки и срок жизни кеша
+LINK_PREVIEW = {
+    'TIMEOUT': 5,
+    'MAX_BYTES': 512 * 1024,
+    'CONCURRENCY': 8,
+    'TTL': 7 * 24 * 60 * 60,
+    'NEGATIVE_TTL': 60 * 60,
+}
+
+# Обработка PDF-работ (portfolio.documents): пул фоновых потоков
+# или команда process_documents по расписанию
+PDF_PROCESS_IN_BACKGROUND = True
+PDF_PROCESSING_WORKERS = 2
+
+# Удаление пользователей: пометка сразу, данные - пачками в фоновом потоке
+# (или командой purge_deleted_users по расписанию)
+USER_PURGE_IN_BACKGROUND = True
+USER_PURGE_BATCH_SIZE = 500
+
+# Импорт портфолио (portfolio.importer): каталог с файлами, на которые
+# ссылаются записи, и размер пачки (одна транзакция)
+IMPORT_MEDIA_ROOT = os.environ.get('IMPORT_MEDIA_ROOT') or None
+IMPORT_BATCH_SIZE = 500
+
 # Login URLs
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/auth/login/'
 
+# Страницы, доступные без входа (portfolio.middleware.AuthRequiredMiddleware).
+# Префиксы проверяются до загрузки сессии: статика, медиа и API не обращаются к БД
+AUTH_REQUIRED = {
+    'PUBLIC_PREFIXES': [STATIC_URL, MEDIA_URL, '/admin/', '/api/', '/auth/api/'],
+    'EXEMPT_PATHS': ['/auth/login/', '/auth/register/', '/auth/logout/'],
+    'LOGIN_URL': LOGIN_URL,
+}
+
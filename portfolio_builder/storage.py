@@ -0,0 +1,342 @@
+"""
+Хранилища файлов проекта.
+
+ContentAddressedStorage - медиа: файл сохраняется под именем из SHA-256
+содержимого, повторная загрузка того же файла не занимает места. Ссылки
+учитываются в portfolio.MediaBlob, осиротевшие файлы удаляет команда gc_media.
+
+BundledManifestStaticFilesStorage - статика для продакшена: при collectstatic
+собирает бандлы из settings.STATIC_BUNDLES, минифицирует JS/CSS, добавляет
+хеш содержимого в имена файлов (ManifestStaticFilesStorage) и сохраняет рядом
+сжатые копии .gz/.br для portfolio_builder.serving.
+"""
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.apps import apps
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import locks
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, storages
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Сжимаем только текстовые форматы: картинки и шрифты woff2 уже сжаты
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.svg', '.json', '.map', '.html', '.txt', '.xml', '.ttf', '.eot')
+# Маленькие файлы не сжимаем: выигрыш меньше накладных расходов
+COMPRESS_MIN_SIZE = 256
+
+
+# ==================== Минификация ====================
+
+# Символы, после которых "/" начинает регулярное выражение, а не деление
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+
+
+def _minify_js_fallback(source):
+    """
+    Консервативная минификация JS без внешних зависимостей: удаляет комментарии,
+    отступы и пустые строки. Переводы строк сохраняются (ASI), содержимое строк,
+    шаблонных литералов и регулярных выражений не изменяется.
+    """
+    out = []
+    stack = []  # '`' - внутри шаблонной строки, число - глубина скобок внутри ${...}
+    i = 0
+    n = len(source)
+    line_start = True
+    last_significant = ''
+
+    while i < n:
+        ch = source[i]
+        in_template = bool(stack) and stack[-1] == '`'
+
+        if in_template:
+            if ch == '\\':
+                out.append(source[i:i + 2])
+                i += 2
+                continue
+            if ch == '`':
+                stack.pop()
+                out.append(ch)
+                last_significant = ch
+                i += 1
+                continue
+            if source.startswith('${', i):
+                stack.append(0)
+                out.append('${')
+                i += 2
+                continue
+            out.append(ch)
+            i += 1
+            continue
+
+        # Обычный код (верхний уровень или выражение внутри ${...})
+        if ch == '\n':
+            # Убираем хвостовые пробелы и пустые строки
+            while out and out[-1] in (' ', '\t'):
+                out.pop()
+            if out and out[-1] != '\n':
+                out.append('\n')
+            line_start = True
+            i += 1
+            continue
+        if ch in ' \t\r':
+            if not line_start and out and out[-1] not in (' ', '\n'):
+                out.append(' ')
+            i += 1
+            continue
+        line_start = False
+
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if ch in '\'"':
+            j = i + 1
+            while j < n and source[j] != ch and source[j] != '\n':
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            last_significant = ch
+            i = j + 1
+            continue
+        if ch == '/' and (last_significant in _REGEX_PRECEDERS or last_significant == ''):
+            j = i + 1
+            in_class = False
+            while j < n and source[j] != '\n':
+                c = source[j]
+                if c == '\\':
+                    j += 2
+                    continue
+                if c == '[':
+                    in_class = True
+                elif c == ']':
+                    in_class = False
+                elif c == '/' and not in_class:
+                    break
+                j += 1
+            out.append(source[i:j + 1])
+            last_significant = '/'
+            i = j + 1
+            continue
+        if ch == '`':
+            stack.append('`')
+        elif stack and ch == '{':
+            stack[-1] += 1
+        elif stack and ch == '}':
+            if stack[-1] == 0:
+                stack.pop()
+            else:
+                stack[-1] -= 1
+        elif ch.isalnum() or ch in '_$':
+            # Идентификатор или ключевое слово целиком (return /re/ и т.п.)
+            j = i
+            while j < n and (source[j].isalnum() or source[j] in '_$'):
+                j += 1
+            word = source[i:j]
+            out.append(word)
+            last_significant = '(' if word in ('return', 'typeof', 'case', 'in', 'of', 'else') else 'a'
+            i = j
+            continue
+        out.append(ch)
+        last_significant = ch
+        i += 1
+
+    return ''.join(out).strip() + '\n'
+
+
+def minify_js(source):
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+    return _minify_js_fallback(source)
+
+
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE_RE = re.compile(r'\s+')
+_CSS_PUNCT_RE = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(source):
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+    source = _CSS_COMMENT_RE.sub('', source)
+    source = _CSS_SPACE_RE.sub(' ', source)
+    source = _CSS_PUNCT_RE.sub(r'\1', source)
+    return source.replace(';}', '}').strip() + '\n'
+
+
+# ==================== Статика ====================
+
+class BundledManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage со сборкой бандлов и минификацией при collectstatic"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            self._build_bundles(paths)
+            if getattr(settings, 'STATIC_MINIFY', True):
+                self._minify(paths)
+
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run=dry_run, **options):
+            if not isinstance(processed, Exception):
+                processed_names.add(name)
+                if hashed_name:
+                    processed_names.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if not dry_run and getattr(settings, 'STATIC_PRECOMPRESS', True):
+            for name in sorted(processed_names):
+                self._compress(name)
+
+    def _build_bundles(self, paths):
+        for bundle_name, sources in getattr(settings, 'STATIC_BUNDLES', {}).items():
+            parts = []
+            for source in sources:
+                with self.open(source) as f:
+                    parts.append(f.read().decode('utf-8'))
+            content = ';\n'.join(parts)
+            if self.exists(bundle_name):
+                self.delete(bundle_name)
+            self._save(bundle_name, ContentFile(content.encode('utf-8')))
+            paths[bundle_name] = (self, bundle_name)
+
+    def _minify(self, paths):
+        project_dirs = {os.path.abspath(d if isinstance(d, (str, os.PathLike)) else d[1])
+                        for d in settings.STATICFILES_DIRS}
+        for name, (storage, path) in list(paths.items()):
+            # Статику сторонних приложений (admin, DRF) оставляем как есть
+            if os.path.abspath(getattr(storage, 'location', '')) not in project_dirs:
+                continue
+            if name.endswith('.min.js') or name.endswith('.min.css'):
+                continue
+            if name.endswith('.js'):
+                minifier = minify_js
+            elif name.endswith('.css'):
+                minifier = minify_css
+            else:
+                continue
+            with self.open(name) as f:
+                content = f.read().decode('utf-8')
+            if self.exists(name):
+                self.delete(name)
+            self._save(name, ContentFile(minifier(content).encode('utf-8')))
+            paths[name] = (self, name)
+
+    def _compress(self, name):
+        """Сохраняет рядом с файлом name.gz и name.br, если это уменьшает размер"""
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS) or not self.exists(name):
+            return
+        with self.open(name) as f:
+            content = f.read()
+        if len(content) < COMPRESS_MIN_SIZE:
+            return
+
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+
+# ==================== Медиа ====================
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Медиа с адресацией по содержимому: cas/ab/cd/<sha256>.<ext>.
+    Одинаковые файлы хранятся один раз; upload_to поля не влияет на имя.
+
+    Сохранение и удаление файла (gc_media) выполняются под блокировкой имени
+    между процессами (lock): сохранение либо успевает освежить запись
+    MediaBlob, и сборщик ее не трогает, либо ждет удаления и пишет файл заново.
+    """
+    prefix = 'cas'
+    hash_chunk_size = 64 * 1024
+    # Файлы блокировок: по одному на первые два символа хеша
+    lock_dir = 'locks'
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks(self.hash_chunk_size) if hasattr(content, 'chunks') else [content.read()]:
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        hexdigest = digest.hexdigest()
+        ext = os.path.splitext(name)[1].lower()[:10]
+        return posixpath.join(self.prefix, hexdigest[:2], hexdigest[2:4], hexdigest + ext)
+
+    def is_blob(self, name):
+        return bool(name) and name.startswith(self.prefix + '/')
+
+    @contextmanager
+    def lock(self, name):
+        """Исключительная блокировка имени файла (между потоками и процессами)"""
+        path = self.path(posixpath.join(self.prefix, self.lock_dir, os.path.basename(name)[:2] + '.lock'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def get_available_name(self, name, max_length=None):
+        # Имя однозначно определяется содержимым - переименование не нужно
+        return name
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        MediaBlob = apps.get_model('portfolio', 'MediaBlob')
+        with self.lock(name):
+            if not self.exists(name):
+                # Пишем во временный файл и атомарно переименовываем: читатели
+                # не увидят недописанный файл
+                tmp_name = posixpath.join(self.prefix, 'tmp', uuid.uuid4().hex + os.path.splitext(name)[1])
+                tmp_name = super()._save(tmp_name, content)
+                os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+                os.replace(self.path(tmp_name), self.path(name))
+            # Свежий updated_at защищает файл от gc_media до учета ссылки
+            MediaBlob.objects.update_or_create(name=name, defaults={'size': self.size(name)})
+        return name
+
+    def delete(self, name):
+        """Файл, на который есть ссылки, не удаляется (его может использовать другая запись)"""
+        if not self.is_blob(name):
+            super().delete(name)
+            return
+        MediaBlob = apps.get_model('portfolio', 'MediaBlob')
+        with self.lock(name):
+            if not MediaBlob.objects.filter(name=name, ref_count__gt=0).exists():
+                super().delete(name)
+
+
+def media_storage():
+    """Хранилище для загружаемых пользователями файлов (STORAGES['media'])"""
+    return storages['media']
@@ -0,0 +1,54 @@
+"""
+Прогрев кеша шаблонов при старте процесса.
+
+Кешированный загрузчик компилирует шаблон при первом обращении, поэтому
+первый запрос к каждой странице был медленнее остальных. warm_templates()
+компилирует все .html из каталогов шаблонов проекта и приложений заранее;
+вызывается из wsgi.py/asgi.py, если включен TEMPLATE_WARMUP.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.utils import get_app_template_dirs
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def _template_names(directories):
+    names = set()
+    for directory in directories:
+        directory = str(directory)
+        for root, _dirs, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(TEMPLATE_EXTENSIONS):
+                    names.add(os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def warm_templates():
+    """Компилирует все шаблоны Django-движков; возвращает число загруженных"""
+    started = time.perf_counter()
+    loaded = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for name in _template_names([*engine.engine.dirs, *get_app_template_dirs('templates')]):
+            try:
+                engine.get_template(name)
+                loaded += 1
+            except (TemplateDoesNotExist, TemplateSyntaxError) as exc:
+                # Ошибка в отдельном шаблоне не должна мешать запуску процесса
+                logger.debug('Шаблон %s не прогрет: %s', name, exc)
+    logger.info('Прогрето шаблонов: %s за %.2f с', loaded, time.perf_counter() - started)
+    return loaded
+
+
+def warm_up():
+    if getattr(settings, 'TEMPLATE_WARMUP', not settings.DEBUG):
+        warm_templates()
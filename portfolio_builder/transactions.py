@@ -0,0 +1,52 @@
+"""
+Действия после коммита, зарегистрированные один раз на транзакцию.
+
+on_commit_once(key, factory) ставит factory() в transaction.on_commit при
+первом вызове с этим ключом и возвращает тот же объект при повторных, так
+что изменения транзакции можно копить в одном объекте и выполнять пакетом.
+
+Реестр свой (по соединению, в памяти потока) и хранит слабые ссылки: Django
+отпускает функцию после ее вызова при коммите, а при откате транзакции или
+точки сохранения - сразу, и запись исчезает вместе с ней. Во внутреннюю
+очередь соединения (run_on_commit) не заглядываем.
+
+Ключ записи включает стек точек сохранения (connection.savepoint_ids):
+- per_savepoint=False - подходит объект, зарегистрированный на текущем или
+  любом внешнем уровне (его откат откатывает и текущий уровень);
+- per_savepoint=True - у каждой точки сохранения свой объект: накопленное
+  внутри нее пропадает вместе с ее откатом.
+"""
+import threading
+import weakref
+
+from django.db import transaction
+
+_local = threading.local()
+
+
+def _registry():
+    registry = getattr(_local, 'registry', None)
+    if registry is None:
+        registry = _local.registry = weakref.WeakValueDictionary()
+    return registry
+
+
+def on_commit_once(key, factory, per_savepoint=False, using=None):
+    """
+    Объект, который выполнится после коммита текущей транзакции (вне
+    транзакции - сразу, как transaction.on_commit). factory() должен
+    возвращать вызываемый объект, на который можно взять слабую ссылку.
+    """
+    connection = transaction.get_connection(using)
+    registry = _registry()
+    savepoints = tuple(connection.savepoint_ids) if connection.in_atomic_block else ()
+    levels = [savepoints] if per_savepoint else [savepoints[:size] for size in range(len(savepoints) + 1)]
+    for level in levels:
+        func = registry.get((connection.alias, level, key))
+        if func is not None:
+            return func
+    func = factory()
+    if connection.in_atomic_block:
+        registry[(connection.alias, savepoints, key)] = func
+    transaction.on_commit(func, using=using)
+    return func
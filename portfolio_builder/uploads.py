@@ -0,0 +1,135 @@
+"""
+Проверка загружаемых изображений (аватары, изображения работ, галереи) и
+ограничения размеров загружаемых файлов (API и импорт портфолио).
+
+Content-Type и имя файла от клиента не используются: формат определяется по
+сигнатуре (первые байты), размеры - по заголовку без декодирования пикселей
+(Image.open читает только заголовок). Слишком большие по числу пикселей
+изображения отклоняются до декодирования, поэтому маленький файл, который
+распаковывается в гигантское изображение, не попадает в память.
+
+Статичные изображения перекодируются: поворот по EXIF Orientation применяется
+к пикселям, метаданные (EXIF с геопозицией, XMP, комментарии) не
+переносятся, ICC-профиль сохраняется. Результат пишется в
+SpooledTemporaryFile: небольшие файлы остаются в памяти, большие - на диске.
+
+Настройки: UPLOAD_IMAGE_MAX_PIXELS, UPLOAD_IMAGE_MAX_FRAMES.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Максимальные размеры файлов (в байтах)
+MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5 MB
+MAX_VIDEO_SIZE = 50 * 1024 * 1024  # 50 MB
+MAX_PDF_SIZE = 10 * 1024 * 1024  # 10 MB
+
+DEFAULT_MAX_PIXELS = 40_000_000   # ~ 8000x5000; RGB в памяти - до 120 МБ
+DEFAULT_MAX_FRAMES = 300
+
+# Перекодированный файл держим в памяти до этого размера
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# Сигнатура -> (формат Pillow, расширение, MIME)
+SIGNATURES = (
+    (b'\xff\xd8\xff', ('JPEG', 'jpg', 'image/jpeg')),
+    (b'\x89PNG\r\n\x1a\n', ('PNG', 'png', 'image/png')),
+    (b'GIF87a', ('GIF', 'gif', 'image/gif')),
+    (b'GIF89a', ('GIF', 'gif', 'image/gif')),
+)
+
+
+def _limits():
+    return (getattr(settings, 'UPLOAD_IMAGE_MAX_PIXELS', DEFAULT_MAX_PIXELS),
+            getattr(settings, 'UPLOAD_IMAGE_MAX_FRAMES', DEFAULT_MAX_FRAMES))
+
+
+def sniff_image_format(header):
+    """(формат, расширение, MIME) по первым байтам файла или None"""
+    for signature, image_format in SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP', 'webp', 'image/webp'
+    return None
+
+
+def _save_options(image, image_format):
+    options = {}
+    icc_profile = image.info.get('icc_profile')
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    if image_format == 'JPEG':
+        options.update(quality=90, progressive=True)
+    elif image_format == 'WEBP':
+        options.update(quality=90, method=4)
+    elif image_format == 'PNG':
+        if 'transparency' in image.info:
+            options['transparency'] = image.info['transparency']
+    return options
+
+
+def _reencode(image, image_format):
+    """Поворот по EXIF и сохранение без метаданных; возвращает файл"""
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    # exif_transpose возвращает новое изображение без тега Orientation
+    image = ImageOps.exif_transpose(image)
+    options = _save_options(image, image_format)
+    # Pillow переносит info (комментарий JPEG и т.п.) при сохранении
+    image.info = {}
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    image.save(output, format=image_format, **options)
+    return output
+
+
+def validate_image(uploaded_file, max_size=MAX_IMAGE_SIZE):
+    """
+    Проверяет загруженное изображение и возвращает очищенный файл
+    (InMemoryUploadedFile с правильным расширением и MIME).
+    ValidationError с сообщением для пользователя, если файл не подходит.
+    """
+    if uploaded_file.size > max_size:
+        raise ValidationError(f'Размер файла не должен превышать {max_size // (1024 * 1024)}MB')
+
+    uploaded_file.seek(0)
+    detected = sniff_image_format(uploaded_file.read(16))
+    uploaded_file.seek(0)
+    if detected is None:
+        raise ValidationError('Файл должен быть изображением (JPEG, PNG, GIF или WebP)')
+    image_format, extension, mime = detected
+    max_pixels, max_frames = _limits()
+
+    try:
+        with Image.open(uploaded_file, formats=[image_format]) as image:
+            width, height = image.size
+            if width <= 0 or height <= 0 or width * height > max_pixels:
+                raise ValidationError(
+                    f'Слишком большое изображение: {width}x{height}, '
+                    f'допускается не больше {max_pixels // 1_000_000} мегапикселей'
+                )
+            if getattr(image, 'is_animated', False):
+                # Анимацию не перекодируем (потеряются кадры), только ограничиваем объем
+                if image.n_frames > max_frames:
+                    raise ValidationError('Слишком длинная анимация')
+                output = None
+            else:
+                output = _reencode(image, image_format)
+    except Image.DecompressionBombError:
+        raise ValidationError('Слишком большое изображение')
+    except (UnidentifiedImageError, OSError, ValueError, SyntaxError):
+        raise ValidationError('Файл поврежден или не является изображением')
+
+    name = f'{os.path.splitext(os.path.basename(uploaded_file.name or "image"))[0] or "image"}.{extension}'
+    if output is None:
+        uploaded_file.seek(0)
+        output, size = uploaded_file.file, uploaded_file.size
+    else:
+        size = output.tell()
+        output.seek(0)
+    field_name = getattr(uploaded_file, 'field_name', None)
+    return InMemoryUploadedFile(output, field_name, name, mime, size, None)
@@ -1,11 +1,13 @@
 """
 URL configuration for portfolio_builder project.
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from accounts import views as accounts_views
+from . import serving
 
 # Настройка админ-панели
 admin.site.site_header = "Админ-панель конструктора портфолио"
@@ -23,7 +25,15 @@ urlpatterns = [
     path('', include('portfolio.urls')),  # Главные страницы (в конце)
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+# Медиа: Range-запросы для видео или X-Accel-Redirect/X-Sendfile (MEDIA_SENDFILE_BACKEND).
+# Статика из STATIC_ROOT с предварительно сжатыми .br/.gz; при DEBUG runserver
+# отдает её сам из исходных каталогов.
+if settings.SERVE_MEDIA_FILES:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serving.serve_media),
+    ]
+if settings.SERVE_STATIC_FILES:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), serving.serve_static),
+    ]
 
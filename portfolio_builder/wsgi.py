@@ -15,3 +15,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio_builder.settings')
 
 application = get_wsgi_application()
 
+# Компиляция шаблонов до первого запроса (portfolio_builder.template_warmup)
+from portfolio_builder.template_warmup import warm_up  # noqa: E402
+
+warm_up()
+
@@ -0,0 +1,3098 @@
+/**
+ * Portfolio Editor - editor page logic
+ * Server data comes from the JSON bootstrap block rendered by create_portfolio_view
+ */
+
+const editorBootstrap = JSON.parse(document.getElementById('editor-bootstrap')?.textContent || '{}');
+const editorColorScheme = editorBootstrap.color_scheme || {};
+
+let selectedTemplate = editorBootstrap.template_id ?? null;
+let customColors = {
+    primary: editorColorScheme.primary_color || '#4f46e5',
+    secondary: editorColorScheme.secondary_color || '#7c3aed',
+    accent: editorColorScheme.accent_color || '#ec4899',
+    text: editorColorScheme.text_color || '#ffffff',
+    background: editorColorScheme.background_color || '#1e1b4b'
+};
+let designSettings = editorBootstrap.design_settings || {};
+if (typeof designSettings === 'string') {
+    try {
+        designSettings = JSON.parse(designSettings);
+    } catch(e) {
+        designSettings = {};
+    }
+}
+// Custom blocks array
+let customBlocks = Array.isArray(designSettings.custom_blocks) ? designSettings.custom_blocks : [];
+// Make available globally
+window.customBlocks = customBlocks;
+
+let portfolioItems = editorBootstrap.items || [];
+
+// Инициализация
+document.addEventListener('DOMContentLoaded', async function() {
+    // Предотвращение скролла страницы
+    document.body.classList.add('portfolio-editor-page');
+    
+    // Инициализация color picker
+    initColorPickers();
+    
+    // Инициализация настроек дизайна
+    initDesignSettings();
+    
+    // CRITICAL: Load portfolio FIRST before rendering default state
+    // Check if we need to load a saved portfolio
+    const urlParams = new URLSearchParams(window.location.search);
+    const portfolioId = urlParams.get('portfolio');
+    let portfolioLoaded = false;
+    
+    if (portfolioId && window.portfolioService) {
+        try {
+            const portfolio = window.portfolioService.getPortfolio(portfolioId);
+            if (portfolio && portfolio.editorState) {
+                // Load portfolio data BEFORE rendering
+                window.portfolioService.loadPortfolioIntoEditor(portfolio);
+                window.portfolioService.currentPortfolioId = portfolioId;
+                portfolioLoaded = true;
+            } else {
+                console.warn('Portfolio not found:', portfolioId);
+            }
+        } catch (error) {
+            console.error('Error loading portfolio:', error);
+            showSaveToast('Ошибка при загрузке портфолио: ' + error.message, true);
+        }
+    }
+    
+    // Only render default state if no portfolio was loaded
+    if (!portfolioLoaded) {
+        // Initialize with default template if specified
+        if (selectedTemplate) {
+            selectTemplate(selectedTemplate);
+        }
+        
+        // Initialize with default data
+        renderItems();
+        renderCustomBlocks();
+    }
+    
+    // Initialize sortable after rendering
+    initSortable();
+    
+    // Load font after state is loaded
+    const fontFamily = document.getElementById('text-font-family')?.value || 'Inter';
+    if (window.PortfolioRenderer && fontFamily !== 'Inter') {
+        await window.PortfolioRenderer.loadFont(fontFamily);
+    }
+    
+    // Update preview AFTER all data is loaded
+    // CRITICAL: Wait a bit to ensure all DOM updates (especially backgroundType) are complete
+    setTimeout(() => {
+        updatePreview();
+    }, portfolioLoaded ? 100 : 0);
+    
+    // Обработка загрузки аватара
+    document.getElementById('avatar-input').addEventListener('change', function(e) {
+        const file = e.target.files[0];
+        if (file) {
+            const reader = new FileReader();
+            reader.onload = function(e) {
+                const preview = document.getElementById('avatar-preview');
+                if (preview.tagName === 'IMG') {
+                    preview.src = e.target.result;
+                } else {
+                    preview.innerHTML = `<img src="${e.target.result}" alt="Avatar" class="w-20 h-20 rounded-full object-cover">`;
+                }
+                updatePreview();
+            };
+            reader.readAsDataURL(file);
+        }
+    });
+    
+    // Обновление предпросмотра при изменении + автосохранение
+    function markChanged() {
+        if (window.portfolioService) {
+            window.portfolioService.markUnsaved();
+            window.portfolioService.saveStatus = 'unsaved';
+            window.portfolioService.updateSaveStatus();
+            
+            // Autosave after delay
+            const portfolioData = window.portfolioService.serializeEditorState();
+            portfolioData.title = document.getElementById('portfolio-name')?.value || 'Мое портфолио';
+            const urlParams = new URLSearchParams(window.location.search);
+            const portfolioId = urlParams.get('portfolio');
+            if (portfolioId) {
+                portfolioData.id = portfolioId;
+                window.portfolioService.autosave(portfolioData);
+            }
+        }
+    }
+    
+    // Совместное редактирование: изменения полей уходят на сервер отдельными операциями
+    const syncFieldInputs = {
+        'portfolio-name': 'name',
+        'portfolio-description': 'description',
+        'portfolio-phone': 'phone',
+        'portfolio-email': 'email',
+        'portfolio-website': 'website',
+        'portfolio-location': 'location'
+    };
+    initPortfolioSync(syncFieldInputs);
+    
+    document.getElementById('portfolio-name')?.addEventListener('input', function() {
+        updatePreview();
+        markChanged();
+    });
+    document.getElementById('portfolio-profession')?.addEventListener('input', function() {
+        updatePreview();
+        markChanged();
+    });
+    document.getElementById('portfolio-description')?.addEventListener('input', function() {
+        updatePreview();
+        markChanged();
+    });
+    ['portfolio-phone', 'portfolio-email', 'portfolio-website', 'portfolio-location'].forEach(id => {
+        const el = document.getElementById(id);
+        if (el) el.addEventListener('input', function() {
+            updatePreview();
+            markChanged();
+        });
+    });
+    
+    // Мгновенное обновление для всех полей
+    document.addEventListener('input', function(e) {
+        if (e.target.classList.contains('skill-input') || 
+            e.target.classList.contains('social-url') ||
+            e.target.classList.contains('color-hex-input')) {
+            updatePreview();
+        }
+    });
+    
+    // Мгновенное обновление при изменении цветов (строгая система: Primary, Accent, Background, Card Background)
+    ['color-primary', 'color-accent', 'color-background', 'color-background-2', 'color-card-background'].forEach(id => {
+        const el = document.getElementById(id);
+        if (el) {
+            el.addEventListener('input', function() {
+                // Синхронизировать с текстовым полем
+                const textInput = document.getElementById(id + '-text');
+                if (textInput) textInput.value = this.value;
+                // Обновить customColors
+                if (id === 'color-primary') customColors.primary = this.value;
+                else if (id === 'color-accent') customColors.accent = this.value;
+                else if (id === 'color-background') {
+                    customColors.background = this.value;
+                    // Обновить превью фона
+                    const preview = document.getElementById('background-preview');
+                    if (preview) {
+                        const bgType = document.getElementById('background-type')?.value || 'solid';
+                        if (bgType === 'gradient') {
+                            const bg2 = document.getElementById('color-background-2')?.value || '#f3f4f6';
+                            preview.style.background = `linear-gradient(135deg, ${this.value} 0%, ${bg2} 100%)`;
+                        } else {
+                            preview.style.background = this.value;
+                        }
+                    }
+                    // CRITICAL: Update preview and mark as changed to save
+                    updatePreview();
+                    markChanged();
+                }
+                else if (id === 'color-background-2') {
+                    customColors.background2 = this.value;
+                    // Обновить превью градиента
+                    const gradientPreview = document.getElementById('gradient-preview');
+                    if (gradientPreview) {
+                        const bg1 = document.getElementById('color-background')?.value || '#ffffff';
+                        gradientPreview.style.background = `linear-gradient(135deg, ${bg1} 0%, ${this.value} 100%)`;
+                    }
+                    // Также обновить background-preview если градиент активен
+                    const preview = document.getElementById('background-preview');
+                    if (preview) {
+                        const bgType = document.getElementById('background-type')?.value || 'solid';
+                        if (bgType === 'gradient') {
+                            const bg1 = document.getElementById('color-background')?.value || '#ffffff';
+                            preview.style.background = `linear-gradient(135deg, ${bg1} 0%, ${this.value} 100%)`;
+                        }
+                    }
+                    // CRITICAL: Update preview and mark as changed to save
+                    updatePreview();
+                    markChanged();
+                }
+                else if (id === 'color-card-background') {
+                    customColors.cardBackground = this.value;
+                    // Обновить превью цвета карточек
+                    const cardPreview = document.getElementById('card-background-preview');
+                    if (cardPreview) {
+                        cardPreview.style.background = this.value;
+                    }
+                }
+                // Валидация контраста для кастомных цветов
+                if (document.getElementById('custom-colors-section') && !document.getElementById('custom-colors-section').classList.contains('hidden')) {
+                    validateColorContrast();
+                }
+                updatePreview();
+                markChanged();
+            });
+        }
+    });
+    
+    // Обработчики для текстовых полей цветов
+    ['color-primary-text', 'color-accent-text', 'color-background-text', 'color-background-2-text', 'color-card-background-text'].forEach(id => {
+        const el = document.getElementById(id);
+        if (el) {
+            el.addEventListener('input', function() {
+                if (/^#[0-9A-Fa-f]{6}$/.test(this.value)) {
+                    const colorInputId = id.replace('-text', '');
+                    const colorInput = document.getElementById(colorInputId);
+                    if (colorInput) {
+                        colorInput.value = this.value;
+                        colorInput.dispatchEvent(new Event('input'));
+                        // Обновить customColors и превью уже обработается через событие input
+                    }
+                }
+            });
+        }
+    });
+    
+    // Мгновенное обновление при изменении социальных сетей
+    document.addEventListener('change', function(e) {
+        if (e.target.classList.contains('social-platform')) {
+            updatePreview();
+        }
+    });
+    
+    // Обработчики для range слайдеров
+    ['design-h1-size', 'design-body-size', 'design-padding', 'design-border-radius'].forEach(id => {
+        const slider = document.getElementById(id);
+        const valueDisplay = document.getElementById(id + '-value');
+        if (slider && valueDisplay) {
+            slider.addEventListener('input', function() {
+                valueDisplay.textContent = this.value + 'px';
+                updatePreview();
+            });
+        }
+    });
+    
+    ['design-font-family', 'design-box-shadow'].forEach(id => {
+        const el = document.getElementById(id);
+        if (el) el.addEventListener('change', updatePreview);
+    });
+    
+    // Обработчики для новых настроек текста
+    ['text-font-family', 'text-font-weight', 'text-h1-size', 'text-h2-size', 'text-body-size'].forEach(id => {
+        const el = document.getElementById(id);
+        if (el) {
+            if (id.includes('size')) {
+                const valueDisplay = document.getElementById(id + '-value');
+                el.addEventListener('input', function() {
+                    if (valueDisplay) valueDisplay.textContent = this.value + 'px';
+                    updatePreview();
+                });
+            } else if (id === 'text-font-family') {
+                // Загрузить шрифт при изменении
+                el.addEventListener('change', async function() {
+                    const fontFamily = this.value;
+                    if (window.PortfolioRenderer) {
+                        await window.PortfolioRenderer.loadFont(fontFamily);
+                    }
+                    updatePreview();
+                });
+            } else {
+                el.addEventListener('change', updatePreview);
+            }
+        }
+    });
+    
+    
+    // Обработчики для line-height и letter-spacing
+    ['text-line-height', 'text-letter-spacing'].forEach(id => {
+        const el = document.getElementById(id);
+        const valueDisplay = document.getElementById(id + '-value');
+        if (el) {
+            el.addEventListener('input', function() {
+                if (valueDisplay) {
+                    if (id === 'text-letter-spacing') {
+                        valueDisplay.textContent = this.value + 'px';
+                    } else {
+                        valueDisplay.textContent = parseFloat(this.value).toFixed(1);
+                    }
+                }
+                updatePreview();
+            });
+        }
+    });
+    
+    // Обработчик для формы аватара
+    document.getElementById('avatar-shape')?.addEventListener('change', updatePreview);
+    
+    // Обработчик для типа фона - CRITICAL: Must save backgroundType
+    document.getElementById('background-type')?.addEventListener('change', function() {
+        const gradientControl = document.getElementById('gradient-opacity-control');
+        const preview = document.getElementById('background-preview');
+        const gradientPreview = document.getElementById('gradient-preview');
+        const bg1 = document.getElementById('color-background')?.value || '#ffffff';
+        const bg2 = document.getElementById('color-background-2')?.value || '#f3f4f6';
+        
+        if (this.value === 'gradient') {
+            gradientControl?.classList.remove('hidden');
+            if (preview) {
+                preview.style.background = `linear-gradient(135deg, ${bg1} 0%, ${bg2} 100%)`;
+            }
+            if (gradientPreview) {
+                gradientPreview.style.background = `linear-gradient(135deg, ${bg1} 0%, ${bg2} 100%)`;
+            }
+        } else {
+            gradientControl?.classList.add('hidden');
+            if (preview) {
+                preview.style.background = bg1;
+            }
+        }
+        // CRITICAL: Update preview and mark as changed to save backgroundType
+        updatePreview();
+        markChanged();
+    });
+    
+    // Обработчики для настроек макета
+    document.getElementById('layout-type')?.addEventListener('change', updatePreview);
+    document.getElementById('item-preview-size')?.addEventListener('input', function() {
+        const valueDisplay = document.getElementById('item-preview-size-value');
+        if (valueDisplay) valueDisplay.textContent = this.value + 'px';
+        updatePreview();
+    });
+    document.getElementById('block-spacing')?.addEventListener('input', function() {
+        const valueDisplay = document.getElementById('block-spacing-value');
+        if (valueDisplay) valueDisplay.textContent = this.value + 'px';
+        updatePreview();
+    });
+    
+    // Обработчики для включения/отключения блоков
+    ['block-contacts', 'block-skills', 'block-experience', 'block-education', 'block-certificates', 'block-languages', 'block-works'].forEach(id => {
+        const el = document.getElementById(id);
+        if (el) el.addEventListener('change', updatePreview);
+    });
+    
+    // Обработчики для настроек цветов (градиенты) - уже обработано выше
+    
+    // Инициализация активных кнопок
+    setTimeout(() => {
+        document.querySelector('.text-align-btn[data-align="center"]')?.classList.add('active', 'bg-indigo-100');
+        document.querySelector('.grid-cols-btn[data-cols="2"]')?.classList.add('active', 'bg-indigo-100');
+    }, 100);
+    
+    // Добавить обработчики для всех существующих динамических полей
+    setTimeout(() => {
+        document.querySelectorAll('.skill-input').forEach(input => {
+            if (!input.hasAttribute('data-listener-added')) {
+                input.addEventListener('input', updatePreview);
+                input.setAttribute('data-listener-added', 'true');
+            }
+        });
+        document.querySelectorAll('.social-url').forEach(input => {
+            if (!input.hasAttribute('data-listener-added')) {
+                input.addEventListener('input', updatePreview);
+                input.setAttribute('data-listener-added', 'true');
+            }
+        });
+        document.querySelectorAll('.social-platform').forEach(select => {
+            if (!select.hasAttribute('data-listener-added')) {
+                select.addEventListener('change', updatePreview);
+                select.setAttribute('data-listener-added', 'true');
+            }
+        });
+        document.querySelectorAll('.experience-item input, .experience-item textarea').forEach(input => {
+            if (!input.hasAttribute('data-listener-added')) {
+                input.addEventListener('input', updatePreview);
+                input.setAttribute('data-listener-added', 'true');
+            }
+        });
+        document.querySelectorAll('.education-item input, .education-item textarea').forEach(input => {
+            if (!input.hasAttribute('data-listener-added')) {
+                input.addEventListener('input', updatePreview);
+                input.setAttribute('data-listener-added', 'true');
+            }
+        });
+        document.querySelectorAll('.certificate-item input').forEach(input => {
+            if (!input.hasAttribute('data-listener-added')) {
+                input.addEventListener('input', updatePreview);
+                input.addEventListener('change', updatePreview);
+                input.setAttribute('data-listener-added', 'true');
+            }
+        });
+        document.querySelectorAll('.lang-language').forEach(input => {
+            if (!input.hasAttribute('data-listener-added')) {
+                input.addEventListener('input', updatePreview);
+                input.setAttribute('data-listener-added', 'true');
+            }
+        });
+        document.querySelectorAll('.lang-level').forEach(select => {
+            if (!select.hasAttribute('data-listener-added')) {
+                select.addEventListener('change', updatePreview);
+                select.setAttribute('data-listener-added', 'true');
+            }
+        });
+    }, 200);
+    
+    // Валидация email
+    document.getElementById('portfolio-email')?.addEventListener('blur', function() {
+        const email = this.value;
+        if (email && !/^[^\s@]+@[^\s@]+\.[^\s@]+$/.test(email)) {
+            this.style.borderColor = '#ef4444';
+            alert('Неверный формат email');
+        } else {
+            this.style.borderColor = '';
+        }
+    });
+    
+    // Валидация URL
+    ['portfolio-website'].forEach(id => {
+        const el = document.getElementById(id);
+        if (el) {
+            el.addEventListener('blur', function() {
+                const url = this.value;
+                if (url && !/^https?:\/\/.+/.test(url)) {
+                    if (url && !url.startsWith('http')) {
+                        this.value = 'https://' + url;
+                    }
+                }
+            });
+        }
+    });
+    
+    // Валидация URL социальных сетей
+    document.addEventListener('blur', function(e) {
+        if (e.target && e.target.classList.contains('social-url')) {
+            const url = e.target.value;
+            if (url && !/^https?:\/\/.+/.test(url)) {
+                e.target.style.borderColor = '#ef4444';
+            } else {
+                e.target.style.borderColor = '';
+            }
+        }
+    }, true);
+});
+
+function selectTemplate(templateId) {
+    selectedTemplate = templateId;
+    document.querySelectorAll('.template-card').forEach(card => {
+        card.classList.remove('selected');
+    });
+    document.querySelector(`[data-template-id="${templateId}"]`).classList.add('selected');
+    updatePreview();
+}
+
+function updatePreview() {
+    try {
+        const name = document.getElementById('portfolio-name')?.value || 'Мое портфолио';
+        const profession = document.getElementById('portfolio-profession')?.value || '';
+        const description = document.getElementById('portfolio-description')?.value || '';
+        const avatar = document.getElementById('avatar-preview');
+        const avatarSrc = avatar && avatar.tagName === 'IMG' ? avatar.src : (avatar && avatar.querySelector('img') ? avatar.querySelector('img').src : '');
+    
+    // Получить цвета из color picker (строгая система: Primary, Accent, Background)
+    const primaryColor = document.getElementById('color-primary')?.value || customColors.primary || '#2563EB';
+    const accentColor = document.getElementById('color-accent')?.value || customColors.accent || '#1E40AF';
+    const bgColor = document.getElementById('color-background')?.value || customColors.background || '#ffffff';
+    const backgroundType = document.getElementById('background-type')?.value || 'solid';
+    const bgColor2 = document.getElementById('color-background-2')?.value || '#f3f4f6';
+    
+    // Автоматически определить оптимальный цвет текста на основе фона (WCAG)
+    const textColor = getOptimalTextColor(bgColor);
+    
+    // Валидация контраста для кастомных цветов (только если кастомные цвета включены)
+    const customColorsSection = document.getElementById('custom-colors-section');
+    if (customColorsSection && !customColorsSection.classList.contains('hidden')) {
+        try {
+            const contrastCheck = validateColorContrast();
+            if (contrastCheck && !contrastCheck.isValid) {
+                console.warn('WCAG contrast validation failed. Please adjust colors to meet accessibility requirements.');
+            }
+        } catch (error) {
+            console.error('Error validating color contrast:', error);
+        }
+    }
+    
+    // Получить настройки текста
+    const textFontFamily = document.getElementById('text-font-family')?.value || 'Inter';
+    const textFontWeight = document.getElementById('text-font-weight')?.value || '400';
+    const textLineHeight = document.getElementById('text-line-height')?.value || '1.6';
+    const textLetterSpacing = document.getElementById('text-letter-spacing')?.value || '0';
+    const textH1Size = document.getElementById('text-h1-size')?.value || '48';
+    const textH2Size = document.getElementById('text-h2-size')?.value || '24';
+    const textBodySize = document.getElementById('text-body-size')?.value || '16';
+    const textAlign = document.querySelector('.text-align-btn.active')?.dataset.align || 'center';
+    
+    // Получить настройки аватара
+    const avatarShape = document.getElementById('avatar-shape')?.value || 'circle';
+    
+    // Получить настройки макета
+    const cardStyle = document.querySelector('.card-style-btn.active')?.dataset.style || 'elevated';
+    const borderRadiusPreset = document.querySelector('.border-radius-btn.active')?.dataset.radius || 'medium';
+    
+    // Получить настройки макета
+    const layoutType = document.getElementById('layout-type')?.value || 'centered';
+    const gridColumns = document.querySelector('.grid-cols-btn.active')?.dataset.cols || '2';
+    const itemPreviewSize = document.getElementById('item-preview-size')?.value || '128';
+    const blockSpacing = document.getElementById('block-spacing')?.value || '24';
+    
+    // Получить настройки видимости блоков
+    const showContacts = document.getElementById('block-contacts')?.checked !== false;
+    const showSkills = document.getElementById('block-skills')?.checked !== false;
+    const showExperience = document.getElementById('block-experience')?.checked !== false;
+    const showEducation = document.getElementById('block-education')?.checked !== false;
+    const showCertificates = document.getElementById('block-certificates')?.checked !== false;
+    const showLanguages = document.getElementById('block-languages')?.checked !== false;
+    const showWorks = document.getElementById('block-works')?.checked !== false;
+    // Get custom blocks from global variable
+    const customBlocks = window.customBlocks || [];
+    
+    // backgroundType уже получен выше (строка 1145), backgroundOpacity не используется
+    
+    // Получить настройки дизайна (старые, для совместимости)
+    const fontFamily = textFontFamily;
+    const h1Size = textH1Size;
+    const bodySize = textBodySize;
+    const padding = document.getElementById('design-padding')?.value || '32';
+    const borderRadius = document.getElementById('design-border-radius')?.value || '8';
+    const boxShadow = document.getElementById('design-box-shadow')?.value || 'sm';
+    
+    const shadowClasses = {
+        none: '',
+        sm: 'shadow-sm',
+        md: 'shadow-md',
+        lg: 'shadow-lg',
+        xl: 'shadow-2xl'
+    };
+    
+    // Контактная информация
+    const phone = document.getElementById('portfolio-phone')?.value || '';
+    const email = document.getElementById('portfolio-email')?.value || '';
+    const website = document.getElementById('portfolio-website')?.value || '';
+    const location = document.getElementById('portfolio-location')?.value || '';
+    
+    // Получить социальные сети
+    const socialLinks = {};
+    document.querySelectorAll('.social-link-item').forEach(item => {
+        const platformEl = item.querySelector('.social-platform');
+        const urlEl = item.querySelector('.social-url');
+        if (platformEl && urlEl && urlEl.value) {
+            socialLinks[platformEl.value] = urlEl.value;
+        }
+    });
+    
+    // Получить навыки
+    const skills = Array.from(document.querySelectorAll('.skill-input')).map(input => input?.value || '').filter(v => v && v.trim());
+    
+    // Получить опыт работы
+    const experience = Array.from(document.querySelectorAll('.experience-item')).map(item => ({
+        position: item.querySelector('.exp-position')?.value || '',
+        company: item.querySelector('.exp-company')?.value || '',
+        period: item.querySelector('.exp-period')?.value || '',
+        description: item.querySelector('.exp-description')?.value || ''
+    })).filter(exp => exp.position || exp.company);
+    
+    // Получить образование
+    const education = Array.from(document.querySelectorAll('.education-item')).map(item => {
+        const instEl = item.querySelector('.edu-institution');
+        const specEl = item.querySelector('.edu-specialty');
+        const periodEl = item.querySelector('.edu-period');
+        const descEl = item.querySelector('.edu-description');
+        return {
+            institution: instEl?.value || '',
+            specialty: specEl?.value || '',
+            period: periodEl?.value || '',
+            description: descEl?.value || ''
+        };
+    }).filter(edu => edu.institution);
+    
+    // Получить сертификаты
+    const certificates = Array.from(document.querySelectorAll('.certificate-item')).map(item => {
+        const nameEl = item.querySelector('.cert-name');
+        const orgEl = item.querySelector('.cert-organization');
+        const dateEl = item.querySelector('.cert-date');
+        const linkEl = item.querySelector('.cert-link');
+        return {
+            name: nameEl?.value?.trim() || '',
+            organization: orgEl?.value?.trim() || '',
+            date: dateEl?.value || '',
+            link: linkEl?.value?.trim() || ''
+        };
+    }).filter(cert => cert.name);
+    
+    // Получить языки
+    const languages = Array.from(document.querySelectorAll('.language-item')).map(item => {
+        const langEl = item.querySelector('.lang-language');
+        const levelEl = item.querySelector('.lang-level');
+        return {
+            language: langEl?.value?.trim() || '',
+            level: levelEl?.value || 'beginner'
+        };
+    }).filter(lang => lang.language);
+    
+    // Определить фон (строгие правила: solid или linear gradient, макс. 2 цвета)
+    // CRITICAL: Ensure bgColor2 has a fallback for gradients
+    const gradientColor2 = bgColor2 || '#f3f4f6';
+    let backgroundStyle = '';
+    if (backgroundType === 'gradient' && bgColor) {
+        backgroundStyle = `background: linear-gradient(135deg, ${bgColor} 0%, ${gradientColor2} 100%);`;
+    } else {
+        backgroundStyle = `background: ${bgColor || '#ffffff'};`;
+    }
+    
+    // Определить стиль макета
+    let layoutStyle = '';
+    if (layoutType === 'left-right') {
+        layoutStyle = 'display: flex; align-items: center; gap: 32px;';
+    } else if (layoutType === 'top-bottom') {
+        layoutStyle = 'display: flex; flex-direction: column;';
+    } else if (layoutType === 'cards') {
+        layoutStyle = 'display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 24px;';
+    } else if (layoutType === 'list') {
+        layoutStyle = 'display: flex; flex-direction: column; gap: 16px;';
+    }
+    
+    // Применить фиксированную систему дизайна (строгие правила)
+    const fixedBgColor = backgroundStyle; // Фон из настроек (solid или gradient)
+    const fixedPrimaryColor = primaryColor; // Primary color для заголовков, кнопок, ключевых элементов
+    const fixedAccentColor = accentColor; // Accent color для иконок, ссылок, тегов (используется умеренно)
+    const fixedTextColor = textColor; // Автоматически определенный цвет текста (WCAG)
+    const isLightBg = getLuminance(bgColor) > 0.5;
+    // Card background color (цвет фона карточек/секций)
+    const cardBgInput = document.getElementById('color-card-background');
+    let fixedCardBg = cardBgInput?.value;
+    if (!fixedCardBg) {
+        // Auto-detect based on background if not set
+        fixedCardBg = isLightBg ? '#f9fafb' : '#374151';
+    }
+    // Card text color (цвет текста для карточек - определяется на основе фона карточек)
+    const fixedCardTextColor = getOptimalTextColor(fixedCardBg);
+    
+    // Border radius presets
+    const borderRadiusMap = {
+        'none': '0px',
+        'small': '4px',
+        'medium': '12px',
+        'large': '24px'
+    };
+    const fixedBorderRadius = borderRadiusMap[borderRadiusPreset] || '12px';
+    
+    // Card style (flat or elevated)
+    const fixedShadow = cardStyle === 'elevated' 
+        ? '0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06)' 
+        : 'none';
+    
+    // Avatar shape styles
+    const avatarBorderRadiusMap = {
+        'circle': '50%',
+        'rounded': '16px',
+        'square': '0px'
+    };
+    const avatarBorderRadius = avatarBorderRadiusMap[avatarShape] || '50%';
+    
+    const preview = document.getElementById('portfolio-preview');
+    if (!preview) {
+        console.error('Preview container not found!');
+        // Попробовать найти контейнер снова через небольшую задержку
+        setTimeout(() => {
+            const retryPreview = document.getElementById('portfolio-preview');
+            if (retryPreview) {
+                updatePreview();
+            }
+        }, 100);
+        return;
+    }
+    
+    // Принудительно обновить предпросмотр
+    preview.innerHTML = `
+        <div style="${fixedBgColor} color: ${fixedTextColor}; padding: ${padding}px; border-radius: ${fixedBorderRadius}; box-shadow: ${fixedShadow}; max-width: 1200px; margin: 0 auto; width: 100%; box-sizing: border-box; word-wrap: break-word; overflow-wrap: break-word; overflow-x: hidden;" class="rounded-lg">
+            <!-- Hero Block -->
+            <div style="text-align: ${textAlign}; margin-bottom: ${blockSpacing}px; padding: 40px 24px; background: ${fixedCardBg}; border-radius: ${fixedBorderRadius}; box-shadow: ${fixedShadow};">
+                ${avatarSrc ? `<img src="${avatarSrc}" alt="Avatar" style="width: 140px; height: 140px; border-radius: ${avatarBorderRadius}; object-fit: cover; object-position: center; border: 4px solid ${fixedPrimaryColor}; margin-bottom: 20px; display: block; ${textAlign === 'center' ? 'margin-left: auto; margin-right: auto;' : textAlign === 'right' ? 'margin-left: auto; margin-right: 0;' : 'margin-left: 0; margin-right: auto;'}; box-shadow: ${fixedShadow}; vertical-align: middle;">` : `<div style="width: 140px; height: 140px; border-radius: ${avatarBorderRadius}; background: ${fixedPrimaryColor}; margin: ${textAlign === 'center' ? '0 auto 20px;' : textAlign === 'right' ? '0 0 20px auto;' : '0 0 20px 0;'}; box-shadow: ${fixedShadow};"></div>`}
+                <h1 style="font-size: ${textH1Size}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 12px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${name}</h1>
+                ${profession ? `<p style="font-size: ${parseInt(textH2Size)}px; font-family: '${textFontFamily}', sans-serif; margin-top: 8px; margin-bottom: 16px; color: ${fixedCardTextColor}; font-weight: ${textFontWeight}; opacity: 0.8; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${profession}</p>` : ''}
+                ${description ? `<p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; margin-top: 12px; ${textAlign === 'center' ? 'max-width: 700px; margin-left: auto; margin-right: auto;' : ''} color: ${fixedCardTextColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px; opacity: 0.9;">${description}</p>` : ''}
+            </div>
+            
+            ${showContacts && (phone || email || website || location || Object.keys(socialLinks).length > 0) ? `
+                <div style="margin-bottom: ${blockSpacing}px; padding: 24px; background: ${fixedCardBg}; border-radius: ${fixedBorderRadius}; box-shadow: ${fixedShadow};">
+                    <h2 style="font-size: ${textH2Size}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 16px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">Контакты</h2>
+                    ${phone ? `<p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; margin: 8px 0; color: ${fixedCardTextColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">📞 ${phone}</p>` : ''}
+                    ${email ? `<p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; margin: 8px 0; color: ${fixedCardTextColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">📧 ${email}</p>` : ''}
+                    ${website ? `<p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; margin: 8px 0; color: ${fixedCardTextColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">🌐 <a href="${website}" target="_blank" style="color: ${fixedAccentColor}; text-decoration: none; border-bottom: 1px solid ${fixedAccentColor};">${website}</a></p>` : ''}
+                    ${location ? `<p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; margin: 8px 0; color: ${fixedCardTextColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">📍 ${location}</p>` : ''}
+                    ${Object.keys(socialLinks).length > 0 ? `<div style="margin-top: 12px; display: flex; flex-wrap: wrap; gap: 8px;">${Object.entries(socialLinks).map(([platform, url]) => `<a href="${url}" target="_blank" style="padding: 6px 12px; background: ${fixedAccentColor}; color: white; border-radius: 6px; text-decoration: none; font-size: ${parseInt(textBodySize) * 0.9}px; font-family: '${textFontFamily}', sans-serif;">${platform}</a>`).join('')}</div>` : ''}
+                </div>
+            ` : ''}
+            
+            ${showSkills && skills.length > 0 ? `
+                <div style="margin-bottom: ${blockSpacing}px; padding: 24px; background: ${fixedCardBg}; border-radius: ${fixedBorderRadius}; box-shadow: ${fixedShadow};">
+                    <h2 style="font-size: ${textH2Size}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 16px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">Навыки</h2>
+                    <div style="display: flex; flex-wrap: wrap; gap: 10px;">
+                        ${skills.map(skill => `<span style="padding: 10px 18px; background: ${fixedPrimaryColor}; color: white; border-radius: ${fixedBorderRadius}; font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; box-shadow: 0 2px 4px rgba(0,0,0,0.1); line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${skill}</span>`).join('')}
+                    </div>
+                </div>
+            ` : ''}
+            
+            ${showExperience && experience.length > 0 ? `
+                <div style="margin-bottom: ${blockSpacing}px; padding: 24px; background: ${fixedCardBg}; border-radius: ${fixedBorderRadius}; box-shadow: ${fixedShadow};">
+                    <h2 style="font-size: ${textH2Size}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 20px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">Опыт работы</h2>
+                    ${experience.map(exp => `
+                        <div style="margin-bottom: 20px; padding: 20px; background: ${isLightBg ? 'white' : '#4B5563'}; border-left: 4px solid ${fixedPrimaryColor}; border-radius: ${fixedBorderRadius}; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">
+                            <h3 style="font-size: ${parseInt(textH2Size) * 0.95}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 8px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${exp.position || 'Должность'}</h3>
+                            <p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; margin: 6px 0; color: ${fixedCardTextColor}; font-weight: ${textFontWeight}; opacity: 0.8; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${exp.company || ''} ${exp.period ? `• ${exp.period}` : ''}</p>
+                            ${exp.description ? `<p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; margin-top: 12px; color: ${fixedCardTextColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${exp.description}</p>` : ''}
+                        </div>
+                    `).join('')}
+                </div>
+            ` : ''}
+            
+            ${showEducation && education.length > 0 ? `
+                <div style="margin-bottom: ${blockSpacing}px; padding: 24px; background: ${fixedCardBg}; border-radius: ${fixedBorderRadius}; box-shadow: ${fixedShadow};">
+                    <h2 style="font-size: ${textH2Size}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 20px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">Образование</h2>
+                    ${education.map(edu => `
+                        <div style="margin-bottom: 20px; padding: 20px; background: ${isLightBg ? 'white' : '#4B5563'}; border-left: 4px solid ${fixedPrimaryColor}; border-radius: ${fixedBorderRadius}; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">
+                            <h3 style="font-size: ${parseInt(textH2Size) * 0.95}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 8px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${edu.institution || 'Учреждение'}</h3>
+                            <p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; margin: 6px 0; color: ${fixedCardTextColor}; font-weight: ${textFontWeight}; opacity: 0.8; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${edu.specialty || ''} ${edu.period ? `• ${edu.period}` : ''}</p>
+                            ${edu.description ? `<p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; margin-top: 12px; color: ${fixedCardTextColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${edu.description}</p>` : ''}
+                        </div>
+                    `).join('')}
+                </div>
+            ` : ''}
+            
+            ${showCertificates && certificates.length > 0 ? `
+                <div style="margin-bottom: ${blockSpacing}px; padding: 24px; background: ${fixedCardBg}; border-radius: ${fixedBorderRadius}; box-shadow: ${fixedShadow};">
+                    <h2 style="font-size: ${textH2Size}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 20px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">Сертификаты</h2>
+                    ${certificates.map(cert => `
+                        <div style="margin-bottom: 20px; padding: 20px; background: ${isLightBg ? 'white' : '#4B5563'}; border-left: 4px solid ${fixedPrimaryColor}; border-radius: ${fixedBorderRadius}; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">
+                            <h3 style="font-size: ${parseInt(textH2Size) * 0.95}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 8px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${cert.name || 'Сертификат'}</h3>
+                            <p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; margin: 6px 0; color: ${fixedCardTextColor}; font-weight: ${textFontWeight}; opacity: 0.8; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${cert.organization || ''} ${cert.date ? `• ${cert.date}` : ''}</p>
+                            ${cert.link ? `<p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; margin-top: 8px;"><a href="${cert.link}" target="_blank" style="color: ${fixedAccentColor}; text-decoration: none; border-bottom: 1px solid ${fixedAccentColor};">🔗 Ссылка на сертификат</a></p>` : ''}
+                        </div>
+                    `).join('')}
+                </div>
+            ` : ''}
+            
+            ${showLanguages && languages.length > 0 ? `
+                <div style="margin-bottom: ${blockSpacing}px; padding: 24px; background: ${fixedCardBg}; border-radius: ${fixedBorderRadius}; box-shadow: ${fixedShadow};">
+                    <h2 style="font-size: ${textH2Size}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 16px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">Языки</h2>
+                    <div style="display: flex; flex-wrap: wrap; gap: 10px;">
+                        ${languages.map(lang => {
+                            const levelNames = { beginner: 'Начальный', intermediate: 'Средний', advanced: 'Продвинутый', native: 'Родной' };
+                            return `<span style="padding: 10px 18px; background: ${fixedPrimaryColor}; color: white; border-radius: ${fixedBorderRadius}; font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; box-shadow: 0 2px 4px rgba(0,0,0,0.1); line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${lang.language} (${levelNames[lang.level] || lang.level})</span>`;
+                        }).join('')}
+                    </div>
+                </div>
+            ` : ''}
+            
+            ${showWorks && portfolioItems.length > 0 ? `
+                <div style="margin-bottom: ${blockSpacing}px; padding: 24px; background: ${fixedCardBg}; border-radius: ${fixedBorderRadius}; box-shadow: ${fixedShadow};">
+                    <h2 style="font-size: ${textH2Size}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 24px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">Мои работы</h2>
+                    <div style="display: flex; flex-direction: column; gap: ${blockSpacing}px;">
+                        ${portfolioItems.map(item => {
+                            // Определить изображение для отображения
+                            let imageSrc = '';
+                            if (item.content_type === 'image' && item.image) {
+                                imageSrc = item.image;
+                            } else if (item.content_type === 'gallery' && item.content_data?.images?.length > 0) {
+                                imageSrc = item.content_data.images[0];
+                            }
+                            
+                            // Текстовая часть (слева)
+                            const textSection = `
+                                <div style="flex: 1; padding-right: 24px;">
+                                    <h3 style="font-weight: ${textFontWeight}; font-size: ${parseInt(textH2Size) * 1.1}px; font-family: '${textFontFamily}', sans-serif; margin-bottom: 12px; color: ${fixedPrimaryColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${item.title}</h3>
+                                    ${item.description ? `<p style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; color: ${fixedCardTextColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px; margin-bottom: 16px; opacity: 0.9;">${item.description}</p>` : ''}
+                                    ${item.content_type === 'link' && item.content_data?.url ? `
+                                        <a href="${item.content_data.url}" target="_blank" style="display: inline-block; padding: 10px 20px; background: ${fixedAccentColor}; color: white; border-radius: 6px; text-decoration: none; font-size: ${parseInt(textBodySize) * 0.9}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-top: 8px;">🔗 Live View</a>
+                                    ` : ''}
+                                    ${item.category ? `<span style="font-size: ${parseInt(textBodySize) * 0.875}px; padding: 6px 12px; background: ${fixedPrimaryColor}; color: white; border-radius: 6px; margin-top: 12px; display: inline-block; font-weight: ${textFontWeight}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px;">${item.category}</span>` : ''}
+                                    ${item.tags && item.tags.length > 0 ? `<div style="margin-top: 12px; display: flex; flex-wrap: wrap; gap: 6px;">${item.tags.map(tag => `<span style="font-size: ${parseInt(textBodySize) * 0.8}px; padding: 4px 10px; background: ${fixedCardBg}; color: ${fixedAccentColor}; border-radius: 6px; border: 1px solid ${fixedAccentColor};">#${tag}</span>`).join('')}</div>` : ''}
+                                </div>
+                            `;
+                            
+                            // Изображение (справа)
+                            const imageSection = imageSrc ? `
+                                <div style="flex: 0 0 40%; min-width: 300px; display: flex; align-items: center; justify-content: center;">
+                                    <img src="${imageSrc}" alt="${item.title}" style="width: 100%; height: 280px; object-fit: cover; object-position: center; border-radius: ${fixedBorderRadius}; box-shadow: ${fixedShadow}; display: block; vertical-align: middle;">
+                                </div>
+                            ` : item.content_type === 'video' && item.content_data?.url ? `
+                                <div style="flex: 0 0 40%; min-width: 300px; height: 280px; background: ${fixedCardBg}; border-radius: ${fixedBorderRadius}; display: flex; align-items: center; justify-content: center; color: ${fixedAccentColor}; border: 2px dashed ${fixedAccentColor};">
+                                    <div style="text-align: center;">
+                                        <div style="font-size: 48px; margin-bottom: 8px;">▶️</div>
+                                        <div style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif;">Видео</div>
+                                    </div>
+                                </div>
+                            ` : item.content_type === 'link' && item.content_data?.url ? `
+                                <div style="flex: 0 0 40%; min-width: 300px; height: 280px; background: ${fixedCardBg}; border-radius: ${fixedBorderRadius}; display: flex; align-items: center; justify-content: center; color: ${fixedAccentColor}; border: 2px solid ${fixedAccentColor};">
+                                    <div style="text-align: center;">
+                                        <div style="font-size: 48px; margin-bottom: 8px;">🔗</div>
+                                        <div style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif;">Ссылка</div>
+                                    </div>
+                                </div>
+                            ` : '';
+                            
+                            return `
+                                <div style="display: flex; gap: 24px; background: ${isLightBg ? 'white' : '#4B5563'}; border-radius: ${fixedBorderRadius}; padding: 32px; box-shadow: ${fixedShadow}; align-items: center;">
+                                    ${textSection}
+                                    ${imageSection}
+                                </div>
+                            `;
+                        }).join('')}
+                    </div>
+                </div>
+            ` : ''}
+            
+            ${customBlocks && customBlocks.length > 0 ? customBlocks.map(block => {
+                const blockTitle = block.title || '';
+                const blockDescription = block.description || '';
+                const blockImage = block.image || '';
+                
+                // Custom block specific settings (ONLY for custom blocks)
+                const titleFontSize = block.titleFontSize || 24;
+                const imageSizeRatio = block.imageSizeRatio || 55; // Image: 55% (matches reference)
+                const textSizeRatio = 100 - imageSizeRatio; // Text: 45%
+                const blockPadding = block.blockPadding || 12; // Compact padding
+                
+                // Block background color - use custom if set, otherwise use default
+                const blockBgColor = block.backgroundColor || fixedCardBg;
+                // Calculate text color based on background color
+                const blockTextColor = window.PortfolioRenderer ? window.PortfolioRenderer.getOptimalTextColor(blockBgColor) : fixedCardTextColor;
+                
+                // FIXED LAYOUT: TEXT LEFT, IMAGE RIGHT (always, regardless of saved layout)
+                // Compact horizontal card - NOT a large section
+                
+                // Image section - large relative to block, but block itself is compact
+                // Image height is LIMITED to keep block compact (max 180px for compact card)
+                const imageSection = blockImage ? `
+                    <div class="custom-block-image-area" style="overflow: hidden; border-radius: ${fixedBorderRadius};">
+                        <img src="${blockImage}" alt="${blockTitle}" style="width: 100%; height: auto; max-height: 180px; object-fit: cover; object-position: center; display: block;">
+                    </div>
+                ` : '';
+                
+                // Text section - left side, aligned to TOP (not center), compact
+                const textSection = `
+                    <div class="custom-block-text-area" style="display: flex; flex-direction: column; justify-content: flex-start; padding-right: 24px;">
+                        ${blockTitle ? `<h2 class="custom-block-title" style="font-size: ${titleFontSize}px; font-family: '${textFontFamily}', sans-serif; font-weight: ${textFontWeight}; margin-bottom: 12px; color: ${fixedPrimaryColor}; line-height: 1.3; letter-spacing: ${textLetterSpacing}px; text-align: left; word-wrap: break-word; overflow-wrap: break-word;">${blockTitle}</h2>` : ''}
+                        ${blockDescription ? `<div style="font-size: ${textBodySize}px; font-family: '${textFontFamily}', sans-serif; color: ${blockTextColor}; line-height: ${textLineHeight}; letter-spacing: ${textLetterSpacing}px; opacity: 0.9; word-wrap: break-word; overflow-wrap: break-word; text-align: left;">${blockDescription.replace(/\n/g, '<br>')}</div>` : ''}
+                    </div>
+                `;
+                
+                // CSS Grid: TEXT LEFT (45%), IMAGE RIGHT (55%)
+                // Compact layout - NO min-height, height defined by content
+                const contentLayout = blockImage ? `
+                    <div class="custom-block-grid" style="display: grid; grid-template-columns: ${textSizeRatio}% ${imageSizeRatio}%; gap: 24px; align-items: start;">
+                        ${textSection}
+                        ${imageSection}
+                    </div>
+                ` : `
+                    <div style="padding: 16px;">
+                        ${textSection}
+                    </div>
+                `;
+                
+                return `
+                    <div class="custom-block-container" style="margin-bottom: ${blockSpacing}px; width: 100%;">
+                        <div style="background: ${blockBgColor}; border-radius: ${fixedBorderRadius}; box-shadow: ${fixedShadow}; padding: ${blockPadding}px; overflow: hidden;">
+                            ${contentLayout}
+                        </div>
+                    </div>
+                `;
+            }).join('') : ''}
+        </div>
+    `;
+    
+        // Применить шрифт
+        if (textFontFamily !== 'Inter') {
+            const link = document.createElement('link');
+            link.href = `https://fonts.googleapis.com/css2?family=${textFontFamily.replace(' ', '+')}:wght@400;600;700&display=swap`;
+            link.rel = 'stylesheet';
+            if (!document.querySelector(`link[href*="${textFontFamily}"]`)) {
+                document.head.appendChild(link);
+            }
+        }
+    } catch (error) {
+        console.error('Error updating preview:', error);
+        const preview = document.getElementById('portfolio-preview');
+        if (preview) {
+            preview.innerHTML = `<div class="text-center py-20 text-red-500"><p>Ошибка обновления предпросмотра. Проверьте консоль.</p><p class="text-xs mt-2">${error.message || error}</p></div>`;
+        }
+    }
+}
+
+function addNewItem() {
+    document.getElementById('item-modal-title').textContent = 'Добавить работу';
+    document.getElementById('item-edit-id').value = '';
+    document.getElementById('item-modal').classList.remove('hidden');
+    document.getElementById('item-content-type').value = 'image';
+    document.getElementById('item-title').value = '';
+    document.getElementById('item-description').value = '';
+    document.getElementById('item-category').value = '';
+    document.getElementById('item-tags').value = '';
+    document.getElementById('item-image').value = '';
+    document.getElementById('item-image-preview').innerHTML = '';
+    document.getElementById('item-video-url').value = '';
+    document.getElementById('item-video-file').value = '';
+    document.getElementById('item-video-preview').innerHTML = '';
+    document.getElementById('item-link-url').value = '';
+    document.getElementById('item-link-preview').classList.add('hidden');
+    document.getElementById('item-gallery-images').value = '';
+    document.getElementById('item-gallery-preview').innerHTML = '';
+    document.getElementById('item-pdf-file').value = '';
+    document.getElementById('item-pdf-preview').innerHTML = '';
+    document.getElementById('item-text-content').value = '';
+    changeContentType();
+}
+
+function editItem(index) {
+    const item = portfolioItems[index];
+    if (!item) return;
+    
+    document.getElementById('item-modal-title').textContent = 'Редактировать работу';
+    document.getElementById('item-edit-id').value = index;
+    document.getElementById('item-modal').classList.remove('hidden');
+    document.getElementById('item-content-type').value = item.content_type || 'image';
+    document.getElementById('item-title').value = item.title || '';
+    document.getElementById('item-description').value = item.description || '';
+    document.getElementById('item-category').value = item.category || '';
+    document.getElementById('item-tags').value = item.tags ? item.tags.join(', ') : '';
+    document.getElementById('item-link-url').value = item.content_data?.url || '';
+    
+    // Показать превью текущего изображения
+    const preview = document.getElementById('item-image-preview');
+    if (item.image) {
+        preview.innerHTML = `<img src="${item.image}" alt="Preview" class="max-w-full h-48 object-cover rounded-lg border border-gray-300">`;
+    } else {
+        preview.innerHTML = '';
+    }
+    
+    changeContentType();
+    
+    // Загрузить данные контента в зависимости от типа
+    if (item.content_type === 'image' && item.image) {
+        document.getElementById('item-image-preview').innerHTML = `<img src="${item.image}" alt="Preview" style="max-width: 100%; max-height: 200px; border-radius: 8px;">`;
+    } else if (item.content_type === 'video') {
+        if (item.content_data?.url) {
+            document.getElementById('item-video-url').value = item.content_data.url;
+        }
+    } else if (item.content_type === 'link') {
+        if (item.content_data?.url) {
+            document.getElementById('item-link-url').value = item.content_data.url;
+            if (item.content_data.preview) {
+                showLinkPreview(item.content_data.preview);
+            }
+        }
+    } else if (item.content_type === 'gallery' && item.content_data?.images) {
+        // Показать изображения галереи
+    } else if (item.content_type === 'text' && item.content_data?.text) {
+        document.getElementById('item-text-content').value = item.content_data.text;
+    }
+}
+
+function closeItemModal() {
+    document.getElementById('item-modal').classList.add('hidden');
+}
+
+async function saveItem() {
+    const title = document.getElementById('item-title').value;
+    const description = document.getElementById('item-description').value;
+    const category = document.getElementById('item-category').value;
+    const tagsStr = document.getElementById('item-tags').value;
+    const tags = tagsStr ? tagsStr.split(',').map(t => t.trim()).filter(t => t) : [];
+    const contentType = document.getElementById('item-content-type').value;
+    const editId = document.getElementById('item-edit-id').value;
+    
+    if (!title) {
+        alert('Введите название работы');
+        return;
+    }
+    
+    const item = {
+        title: title,
+        description: description,
+        category: category,
+        tags: tags,
+        content_type: contentType,
+        content_data: {},
+        image: null,
+        imageFile: null
+    };
+    
+    // Обработать контент в зависимости от типа
+    if (contentType === 'image') {
+        const imageInput = document.getElementById('item-image');
+        if (imageInput.files[0]) {
+            const reader = new FileReader();
+            reader.onload = function(e) {
+                item.image = e.target.result;
+                item.imageFile = imageInput.files[0];
+                finishSaveItem(item, editId);
+            };
+            reader.readAsDataURL(imageInput.files[0]);
+        } else {
+            // Если редактируем и не выбрали новое изображение, сохранить старое
+            if (editId !== '' && portfolioItems[editId]?.image) {
+                item.image = portfolioItems[editId].image;
+            }
+            finishSaveItem(item, editId);
+        }
+    } else if (contentType === 'video') {
+        const videoUrl = document.getElementById('item-video-url').value;
+        const videoFile = document.getElementById('item-video-file').files[0];
+        if (videoUrl) {
+            item.content_data = { url: videoUrl };
+            finishSaveItem(item, editId);
+        } else if (videoFile) {
+            item.content_data = { file: videoFile };
+            item.videoFile = videoFile;
+            finishSaveItem(item, editId);
+        } else {
+            if (editId !== '' && portfolioItems[editId]?.content_data) {
+                item.content_data = portfolioItems[editId].content_data;
+            }
+            finishSaveItem(item, editId);
+        }
+    } else if (contentType === 'link') {
+        const linkUrl = document.getElementById('item-link-url').value;
+        if (linkUrl) {
+            const preview = document.getElementById('item-link-preview');
+            item.content_data = {
+                url: linkUrl,
+                title: document.getElementById('link-preview-title')?.textContent || '',
+                description: document.getElementById('link-preview-description')?.textContent || '',
+                preview: preview.classList.contains('hidden') ? null : {
+                    image: document.getElementById('link-preview-image')?.src || '',
+                    title: document.getElementById('link-preview-title')?.textContent || '',
+                    description: document.getElementById('link-preview-description')?.textContent || ''
+                }
+            };
+        }
+        finishSaveItem(item, editId);
+    } else if (contentType === 'gallery') {
+        const galleryInput = document.getElementById('item-gallery-images');
+        const serverId = editId !== '' ? portfolioItems[editId]?.id : null;
+        if (galleryInput.files.length > 0 && serverId) {
+            // Saved item: upload files to the server, content_data gets plain URLs
+            const saved = await uploadGalleryImages(serverId, galleryInput.files);
+            if (!saved) {
+                return;
+            }
+            item.content_data = saved.content_data;
+            finishSaveItem(item, editId);
+        } else if (galleryInput.files.length > 0) {
+            // New item: create it on the server first, then upload the files to it -
+            // content_data only holds file URLs (the API rejects base64 data URLs)
+            const created = await createServerItem(item);
+            if (!created) {
+                return;
+            }
+            item.id = created.id;
+            const saved = await uploadGalleryImages(created.id, galleryInput.files);
+            if (saved) {
+                item.content_data = saved.content_data;
+            }
+            finishSaveItem(item, editId);
+        } else {
+            if (editId !== '' && portfolioItems[editId]?.content_data) {
+                item.content_data = portfolioItems[editId].content_data;
+            }
+            finishSaveItem(item, editId);
+        }
+    } else if (contentType === 'pdf') {
+        const pdfFile = document.getElementById('item-pdf-file').files[0];
+        const serverId = editId !== '' ? portfolioItems[editId]?.id : null;
+        if (pdfFile && serverId) {
+            // Saved item: the server stores the file and renders a thumbnail in the background
+            const saved = await uploadItemFile(serverId, 'pdf_file', pdfFile, contentType);
+            if (!saved) {
+                return;
+            }
+            item.content_data = saved.content_data;
+        } else if (pdfFile) {
+            item.content_data = { file: pdfFile };
+            item.pdfFile = pdfFile;
+        } else {
+            if (editId !== '' && portfolioItems[editId]?.content_data) {
+                item.content_data = portfolioItems[editId].content_data;
+            }
+        }
+        finishSaveItem(item, editId);
+    } else if (contentType === 'text') {
+        const textContent = document.getElementById('item-text-content').value;
+        item.content_data = { text: textContent };
+        finishSaveItem(item, editId);
+    }
+}
+
+/**
+ * Upload a file for a saved item (multipart PATCH).
+ * @returns {Promise<Object|null>} updated item or null on error
+ */
+async function uploadItemFile(itemId, field, file, contentType) {
+    const formData = new FormData();
+    formData.append(field, file);
+    formData.append('content_type', contentType);
+    try {
+        const response = await fetch(`/api/portfolio/api/items/${itemId}/`, {
+            method: 'PATCH',
+            headers: {
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: formData
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            alert(data.error || data.detail || 'Ошибка при загрузке файла');
+            return null;
+        }
+        return data;
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Ошибка при загрузке файла');
+        return null;
+    }
+}
+
+/**
+ * Create an item on the server (JSON fields only, files are uploaded afterwards).
+ * @returns {Promise<Object|null>} created item or null on error
+ */
+async function createServerItem(item) {
+    try {
+        const response = await fetch('/api/portfolio/api/items/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({
+                portfolio: editorBootstrap.portfolio_id,
+                title: item.title,
+                description: item.description,
+                category: item.category,
+                tags: item.tags,
+                content_type: item.content_type,
+                order: portfolioItems.length
+            })
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            alert(data.error || data.detail || 'Ошибка при создании работы');
+            return null;
+        }
+        return data;
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Ошибка при создании работы');
+        return null;
+    }
+}
+
+/**
+ * Upload gallery images as multipart files.
+ * @returns {Promise<Object|null>} updated item or null on error
+ */
+async function uploadGalleryImages(itemId, files) {
+    const formData = new FormData();
+    Array.from(files).forEach(file => formData.append('images', file));
+    try {
+        const response = await fetch(`/api/portfolio/api/items/${itemId}/gallery/`, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: formData
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            alert(data.error || data.detail || 'Ошибка при загрузке изображений');
+            return null;
+        }
+        return data;
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Ошибка при загрузке изображений');
+        return null;
+    }
+}
+
+function finishSaveItem(item, editId) {
+    if (editId !== '') {
+        // Редактирование существующего элемента
+        const oldItem = portfolioItems[editId];
+        if (oldItem?.id) {
+            item.id = oldItem.id;
+            syncItemChanges(oldItem, item);
+        }
+        portfolioItems[editId] = item;
+        queueItemReplace(oldItem, item);
+    } else {
+        // Добавление нового элемента
+        portfolioItems.push(item);
+        queueItemCreate(item);
+    }
+    renderItems();
+    updatePreview();
+    closeItemModal();
+}
+
+async function fetchLinkPreview() {
+    const url = document.getElementById('item-link-url').value;
+    if (!url) {
+        alert('Введите URL');
+        return;
+    }
+    
+    const preview = document.getElementById('item-link-preview');
+    const titleEl = document.getElementById('link-preview-title');
+    const descEl = document.getElementById('link-preview-description');
+    const imgEl = document.getElementById('link-preview-image');
+    
+    // Metadata is fetched and cached on the server (Open Graph/Twitter tags)
+    let data = null;
+    try {
+        const response = await fetch('/api/portfolio/api/items/link-preview/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ url: url })
+        });
+        if (response.ok) {
+            data = await response.json();
+        }
+    } catch (error) {
+        console.error('Error:', error);
+    }
+    
+    preview.classList.remove('hidden');
+    if (data) {
+        titleEl.textContent = data.title || new URL(url).hostname;
+        descEl.textContent = data.description || url;
+        imgEl.src = data.image || '';
+    } else {
+        // Fallback: hostname only
+        titleEl.textContent = new URL(url).hostname;
+        descEl.textContent = url;
+        imgEl.src = '';
+    }
+    
+    updatePreview();
+}
+
+function renderItems() {
+    const container = document.getElementById('portfolio-items');
+    if (!container) return;
+    
+    if (portfolioItems.length === 0) {
+        container.innerHTML = '<p class="text-gray-500 text-sm">Нет добавленных работ</p>';
+        return;
+    }
+    
+    container.innerHTML = portfolioItems.map((item, index) => {
+        // Определить изображение для превью
+        let imageSrc = '';
+        if (item.content_type === 'image' && item.image) {
+            imageSrc = item.image;
+        } else if (item.content_type === 'gallery' && item.content_data?.images?.length > 0) {
+            imageSrc = item.content_data.images[0];
+        } else if (item.content_type === 'pdf' && item.content_data?.thumbnail) {
+            imageSrc = item.content_data.thumbnail;
+        }
+        
+        // Превью изображения
+        const imagePreview = imageSrc ? 
+            `<img src="${imageSrc}" alt="${escapeHtml(item.title)}" class="w-24 h-24 object-cover rounded-lg border border-gray-300">` :
+            `<div class="w-24 h-24 bg-gray-200 rounded-lg border border-gray-300 flex items-center justify-center text-gray-400 text-xs">📷</div>`;
+        
+        return `
+            <div class="portfolio-item bg-white p-3 rounded-lg border border-gray-200 hover:border-indigo-300 transition cursor-move" data-item-id="${item.id || ''}">
+                <div class="flex gap-3 items-start">
+                    <div class="flex-shrink-0">
+                        ${imagePreview}
+                    </div>
+                    <div class="flex-1 min-w-0">
+                        <div class="flex justify-between items-start mb-1">
+                            <div class="flex-1 min-w-0">
+                                <h3 class="font-semibold text-sm text-gray-900 truncate">${escapeHtml(item.title)}</h3>
+                                ${item.category ? `<span class="text-xs text-gray-500">${escapeHtml(item.category)}</span>` : ''}
+                            </div>
+                            <div class="flex gap-1 flex-shrink-0 ml-2">
+                                <button onclick="editItem(${index})" class="px-1.5 py-1 text-blue-600 hover:text-blue-800 text-xs" title="Редактировать" type="button">✏️</button>
+                                <button onclick="removeItem(${index})" class="px-1.5 py-1 text-red-600 hover:text-red-800 text-xs" title="Удалить" type="button">×</button>
+                            </div>
+                        </div>
+                        ${item.description ? `<p class="text-xs text-gray-600 mt-1 line-clamp-2">${escapeHtml(item.description)}</p>` : ''}
+                        ${item.tags && item.tags.length > 0 ? `<div class="mt-1.5 flex flex-wrap gap-1">${item.tags.slice(0, 3).map(tag => `<span class="text-xs px-1.5 py-0.5 bg-gray-100 rounded">#${escapeHtml(tag)}</span>`).join('')}${item.tags.length > 3 ? `<span class="text-xs text-gray-400">+${item.tags.length - 3}</span>` : ''}</div>` : ''}
+                    </div>
+                </div>
+            </div>
+        `;
+    }).join('');
+    
+    // Переинициализировать sortable после рендеринга
+    initSortable();
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function removeItem(index) {
+    const item = portfolioItems[index];
+    // Удаление уходит на сервер вместе с другими изменениями работ (/items/batch/)
+    queueItemDelete(item);
+    portfolioItems.splice(index, 1);
+    renderItems();
+    updatePreview();
+}
+
+// Save to LocalStorage library
+async function saveToLibrary() {
+    try {
+        if (!window.portfolioService) {
+            alert('Сервис портфолио не загружен. Перезагрузите страницу.');
+            return;
+        }
+        
+        // Get portfolio title
+        const name = document.getElementById('portfolio-name')?.value || 'Мое портфолио';
+        const title = prompt('Введите название портфолио:', name);
+        if (!title || !title.trim()) {
+            return; // User cancelled
+        }
+        
+        // CRITICAL: Serialize FULL editor state before saving
+        let portfolioData;
+        try {
+            portfolioData = window.portfolioService.serializeEditorState();
+            
+            // Validate critical data is present
+            if (!portfolioData.editorState) {
+                throw new Error('Editor state is missing');
+            }
+            
+        } catch (error) {
+            console.error('Error serializing portfolio:', error);
+            showSaveToast('Ошибка при подготовке данных: ' + error.message, true);
+            return;
+        }
+        
+        portfolioData.title = title.trim();
+        
+        // Get current portfolio ID from URL or create new
+        const urlParams = new URLSearchParams(window.location.search);
+        const portfolioId = urlParams.get('portfolio') || window.portfolioService.currentPortfolioId;
+        if (portfolioId) {
+            portfolioData.id = portfolioId;
+        }
+        
+        // CRITICAL: Save to library and verify success
+        let saved;
+        try {
+            saved = window.portfolioService.savePortfolio(portfolioData);
+            
+            // Verify save was successful
+            if (!saved || !saved.id) {
+                throw new Error('Save returned invalid data');
+            }
+            
+            // Verify data was actually saved
+            const verifyPortfolio = window.portfolioService.getPortfolio(saved.id);
+            if (!verifyPortfolio) {
+                throw new Error('Portfolio was not found after save');
+            }
+            
+        } catch (error) {
+            console.error('Error saving portfolio:', error);
+            showSaveToast('Ошибка при сохранении: ' + error.message, true);
+            return;
+        }
+        
+        // Show success message ONLY after verified save
+        showSaveToast('Портфолио сохранено в библиотеку!', false);
+        
+        // Update URL if new portfolio
+        if (!portfolioId && saved.id) {
+            const newUrl = window.location.pathname + '?portfolio=' + saved.id;
+            window.history.replaceState({}, '', newUrl);
+        }
+        
+        window.portfolioService.currentPortfolioId = saved.id;
+        window.portfolioService.unsavedChanges = false;
+        
+    } catch (error) {
+        console.error('Error saving to library:', error);
+        showSaveToast('Ошибка при сохранении: ' + error.message, true);
+    }
+}
+
+function showSaveToast(message, isError) {
+    // Create toast element
+    const toast = document.createElement('div');
+    toast.style.cssText = `
+        position: fixed;
+        bottom: 2rem;
+        right: 2rem;
+        background: ${isError ? '#ef4444' : '#10b981'};
+        color: white;
+        padding: 1rem 1.5rem;
+        border-radius: 8px;
+        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
+        z-index: 10000;
+        animation: slideIn 0.3s ease;
+    `;
+    toast.textContent = message;
+    document.body.appendChild(toast);
+    
+    setTimeout(() => {
+        toast.style.animation = 'slideIn 0.3s ease reverse';
+        setTimeout(() => toast.remove(), 300);
+    }, 3000);
+}
+
+// Load portfolio from library on page load
+// NOTE: This function is now called directly in DOMContentLoaded BEFORE rendering
+// Keeping for backward compatibility but should not be called separately
+function loadPortfolioFromLibrary() {
+    try {
+        const urlParams = new URLSearchParams(window.location.search);
+        const portfolioId = urlParams.get('portfolio');
+        
+        if (!portfolioId || !window.portfolioService) {
+            return; // No portfolio to load
+        }
+        
+        const portfolio = window.portfolioService.getPortfolio(portfolioId);
+        if (!portfolio) {
+            console.warn('Portfolio not found:', portfolioId);
+            return;
+        }
+        
+        // Load portfolio into editor
+        window.portfolioService.loadPortfolioIntoEditor(portfolio);
+        window.portfolioService.currentPortfolioId = portfolioId;
+        
+        // Show notification
+        showSaveToast('Портфолио загружено из библиотеки', false);
+        
+    } catch (error) {
+        console.error('Error loading portfolio:', error);
+        showSaveToast('Ошибка при загрузке портфолио: ' + error.message, true);
+    }
+}
+
+// Export functions
+/**
+ * Модуль экспорта нужен редко - загружаем его только при первом экспорте
+ */
+let exportServicePromise = null;
+function loadExportService() {
+    if (window.portfolioExportService) return Promise.resolve(window.portfolioExportService);
+    if (!exportServicePromise) {
+        exportServicePromise = new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = editorBootstrap.assets?.export || '/static/js/portfolio-export.js';
+            script.onload = () => resolve(window.portfolioExportService);
+            script.onerror = () => {
+                exportServicePromise = null;
+                reject(new Error('Не удалось загрузить модуль экспорта'));
+            };
+            document.head.appendChild(script);
+        });
+    }
+    return exportServicePromise;
+}
+
+async function exportPortfolioHTML() {
+    try {
+        await loadExportService();
+        
+        // Validate export readiness
+        const validation = window.portfolioExportService.validateExportReadiness();
+        if (!validation.valid) {
+            showSaveToast('Ошибка: ' + validation.error, true);
+            return;
+        }
+        
+        if (validation.warnings) {
+            console.warn('Export warnings:', validation.warnings);
+        }
+        
+        // Ensure preview is up to date
+        updatePreview();
+        
+        // Wait a bit for preview to render
+        await new Promise(resolve => setTimeout(resolve, 200));
+        
+        const portfolioId = window.portfolioService.currentPortfolioId;
+        if (!portfolioId) {
+            // Save first to get ID
+            const portfolioData = window.portfolioService.serializeEditorState();
+            portfolioData.title = document.getElementById('portfolio-name')?.value || 'Мое портфолио';
+            const saved = window.portfolioService.savePortfolio(portfolioData);
+            await window.portfolioExportService.exportAsHTML(saved.id);
+        } else {
+            await window.portfolioExportService.exportAsHTML(portfolioId);
+        }
+        showSaveToast('Портфолио экспортировано как HTML', false);
+    } catch (error) {
+        console.error('Export error:', error);
+        showSaveToast('Ошибка при экспорте HTML: ' + error.message, true);
+    }
+}
+
+async function exportPortfolioPDF() {
+    try {
+        await loadExportService();
+        
+        // Validate export readiness
+        const validation = window.portfolioExportService.validateExportReadiness();
+        if (!validation.valid) {
+            showSaveToast('Ошибка: ' + validation.error, true);
+            return;
+        }
+        
+        if (validation.warnings) {
+            console.warn('Export warnings:', validation.warnings);
+        }
+        
+        // Show loading indicator
+        showSaveToast('Подготовка PDF...', false);
+        
+        // Ensure preview is up to date
+        updatePreview();
+        
+        // Wait for preview to render and stabilize
+        await new Promise(resolve => setTimeout(resolve, 300));
+        
+        const portfolioId = window.portfolioService.currentPortfolioId;
+        if (!portfolioId) {
+            // Save first to get ID
+            const portfolioData = window.portfolioService.serializeEditorState();
+            portfolioData.title = document.getElementById('portfolio-name')?.value || 'Мое портфолио';
+            const saved = window.portfolioService.savePortfolio(portfolioData);
+            await window.portfolioExportService.exportAsPDF(saved.id);
+        } else {
+            await window.portfolioExportService.exportAsPDF(portfolioId);
+        }
+        showSaveToast('Портфолио экспортировано как PDF', false);
+    } catch (error) {
+        console.error('Export error:', error);
+        showSaveToast('Ошибка при экспорте PDF: ' + error.message, true);
+    }
+}
+
+function viewPortfolio() {
+    const portfolioId = window.portfolioService.currentPortfolioId;
+    if (!portfolioId) {
+        alert('Сначала сохраните портфолио в библиотеку');
+        return;
+    }
+    window.open(`/view/${portfolioId}/`, '_blank');
+}
+
+// Undo/Redo functions
+function undoAction() {
+    if (window.portfolioService && window.portfolioService.undo()) {
+        showSaveToast('Действие отменено', false);
+    }
+}
+
+function redoAction() {
+    if (window.portfolioService && window.portfolioService.redo()) {
+        showSaveToast('Действие повторено', false);
+    }
+}
+
+// Keyboard shortcuts
+document.addEventListener('keydown', function(e) {
+    // Ctrl+Z for undo
+    if (e.ctrlKey && e.key === 'z' && !e.shiftKey) {
+        e.preventDefault();
+        undoAction();
+    }
+    // Ctrl+Y or Ctrl+Shift+Z for redo
+    if ((e.ctrlKey && e.key === 'y') || (e.ctrlKey && e.shiftKey && e.key === 'z')) {
+        e.preventDefault();
+        redoAction();
+    }
+    // Ctrl+S for save
+    if (e.ctrlKey && e.key === 's') {
+        e.preventDefault();
+        saveToLibrary();
+    }
+});
+
+// Warn about unsaved changes
+window.addEventListener('beforeunload', function(e) {
+    if (window.portfolioService && window.portfolioService.hasUnsavedChanges()) {
+        e.preventDefault();
+        e.returnValue = 'У вас есть несохраненные изменения. Вы уверены, что хотите покинуть страницу?';
+        return e.returnValue;
+    }
+});
+
+// ==================== Color Picker Functions ====================
+function initColorPickers() {
+    // Инициализация только для кастомных цветов (если они включены)
+    const colorFields = ['primary', 'accent', 'background'];
+    colorFields.forEach(color => {
+        const colorInput = document.getElementById(`color-${color}`);
+        const textInput = document.getElementById(`color-${color}-text`);
+        
+        if (colorInput && textInput) {
+            // Установить значения из customColors
+            if (customColors[color]) {
+                colorInput.value = customColors[color];
+                textInput.value = customColors[color];
+            }
+        }
+    });
+    
+    // Инициализация второго цвета градиента
+    const bg2Input = document.getElementById('color-background-2');
+    const bg2TextInput = document.getElementById('color-background-2-text');
+    if (bg2Input && bg2TextInput) {
+        bg2Input.value = '#f3f4f6';
+        bg2TextInput.value = '#f3f4f6';
+    }
+    
+    // Применить пресет по умолчанию
+    applyColorPreset('blue-professional');
+}
+
+// ==================== Social Links Functions ====================
+function addSocialLink() {
+    const container = document.getElementById('social-links-container');
+    const div = document.createElement('div');
+    div.className = 'flex gap-1.5 social-link-item';
+    div.style.cssText = 'min-width: 0; width: 100%; max-width: 100%; box-sizing: border-box;';
+    div.innerHTML = `
+        <select class="px-2 py-1.5 text-xs border border-gray-300 rounded-md flex-shrink-0 social-platform" style="max-width: 120px; min-width: 80px; box-sizing: border-box;">
+            <option value="vk">VK</option>
+            <option value="instagram">Instagram</option>
+            <option value="facebook">Facebook</option>
+            <option value="linkedin">LinkedIn</option>
+            <option value="github">GitHub</option>
+            <option value="twitter">Twitter/X</option>
+            <option value="telegram">Telegram</option>
+            <option value="youtube">YouTube</option>
+        </select>
+        <input type="url" placeholder="https://..." class="flex-1 px-2 py-1.5 text-xs border border-gray-300 rounded-md social-url" style="min-width: 0; max-width: 100%; box-sizing: border-box; overflow: hidden;">
+        <button onclick="removeSocialLink(this)" class="px-1.5 py-1.5 text-red-600 hover:text-red-800 text-sm flex-shrink-0" type="button">×</button>
+    `;
+    container.appendChild(div);
+    // Добавить обработчики событий для нового элемента
+    const urlInput = div.querySelector('.social-url');
+    const platformSelect = div.querySelector('.social-platform');
+    if (urlInput) {
+        urlInput.addEventListener('input', updatePreview);
+        urlInput.setAttribute('data-listener-added', 'true');
+    }
+    if (platformSelect) {
+        platformSelect.addEventListener('change', updatePreview);
+        platformSelect.setAttribute('data-listener-added', 'true');
+    }
+    updatePreview();
+}
+
+function removeSocialLink(button) {
+    button.closest('.social-link-item').remove();
+    updatePreview();
+}
+
+// ==================== Skills Functions ====================
+function addSkill() {
+    const container = document.getElementById('skills-container');
+    const div = document.createElement('div');
+    div.className = 'flex gap-2 skill-item';
+    div.innerHTML = `
+        <input type="text" placeholder="Навык" class="flex-1 px-4 py-2 border border-gray-300 rounded-lg skill-input">
+        <button onclick="removeSkill(this)" class="px-3 py-2 text-red-600 hover:text-red-800">×</button>
+    `;
+    container.appendChild(div);
+    // Добавить обработчик события для нового поля
+    const input = div.querySelector('.skill-input');
+    if (input) {
+        input.addEventListener('input', updatePreview);
+        input.setAttribute('data-listener-added', 'true');
+    }
+    updatePreview();
+}
+
+function removeSkill(button) {
+    button.parentElement.remove();
+    updatePreview();
+}
+
+// ==================== Experience Functions ====================
+function addExperience() {
+    const container = document.getElementById('experience-container');
+    const div = document.createElement('div');
+    div.className = 'bg-gray-50 p-3 rounded-lg experience-item';
+    div.innerHTML = `
+        <div class="flex justify-between items-start mb-2">
+            <span class="font-semibold text-sm">Новый опыт</span>
+            <button onclick="removeExperience(this)" class="text-red-600 hover:text-red-800 text-sm">×</button>
+        </div>
+        <input type="text" placeholder="Должность" class="w-full px-3 py-1 mb-2 border border-gray-300 rounded exp-position text-sm">
+        <input type="text" placeholder="Компания" class="w-full px-3 py-1 mb-2 border border-gray-300 rounded exp-company text-sm">
+        <input type="text" placeholder="Период (например: 2020-2023)" class="w-full px-3 py-1 mb-2 border border-gray-300 rounded exp-period text-sm">
+        <textarea placeholder="Описание" rows="2" class="w-full px-3 py-1 border border-gray-300 rounded exp-description text-sm"></textarea>
+    `;
+    container.appendChild(div);
+    // Добавить обработчики событий для новых полей
+    div.querySelectorAll('input, textarea').forEach(input => {
+        if (!input.hasAttribute('data-listener-added')) {
+            input.addEventListener('input', updatePreview);
+            input.setAttribute('data-listener-added', 'true');
+        }
+    });
+    updatePreview();
+}
+
+function removeExperience(button) {
+    button.closest('.experience-item').remove();
+    updatePreview();
+}
+
+// ==================== Education Functions ====================
+function addEducation() {
+    const container = document.getElementById('education-container');
+    const div = document.createElement('div');
+    div.className = 'bg-gray-50 p-3 rounded-lg education-item';
+    div.innerHTML = `
+        <div class="flex justify-between items-start mb-2">
+            <span class="font-semibold text-sm">Новое образование</span>
+            <button onclick="removeEducation(this)" class="text-red-600 hover:text-red-800 text-sm">×</button>
+        </div>
+        <input type="text" placeholder="Учреждение" class="w-full px-3 py-1 mb-2 border border-gray-300 rounded edu-institution text-sm">
+        <input type="text" placeholder="Специальность" class="w-full px-3 py-1 mb-2 border border-gray-300 rounded edu-specialty text-sm">
+        <input type="text" placeholder="Период (например: 2016-2020)" class="w-full px-3 py-1 mb-2 border border-gray-300 rounded edu-period text-sm">
+        <textarea placeholder="Описание" rows="2" class="w-full px-3 py-1 border border-gray-300 rounded edu-description text-sm"></textarea>
+    `;
+    container.appendChild(div);
+    // Добавить обработчики событий для новых полей
+    div.querySelectorAll('input, textarea').forEach(input => {
+        if (!input.hasAttribute('data-listener-added')) {
+            input.addEventListener('input', updatePreview);
+            input.setAttribute('data-listener-added', 'true');
+        }
+    });
+    updatePreview();
+}
+
+function removeEducation(button) {
+    button.closest('.education-item').remove();
+    updatePreview();
+}
+
+// ==================== Certificates Functions ====================
+function addCertificate() {
+    const container = document.getElementById('certificates-container');
+    const div = document.createElement('div');
+    div.className = 'bg-gray-50 p-3 rounded-lg certificate-item';
+    div.innerHTML = `
+        <div class="flex justify-between items-start mb-2">
+            <span class="font-semibold text-sm">Новый сертификат</span>
+            <button onclick="removeCertificate(this)" class="text-red-600 hover:text-red-800 text-sm">×</button>
+        </div>
+        <input type="text" placeholder="Название" class="w-full px-3 py-1 mb-2 border border-gray-300 rounded cert-name text-sm">
+        <input type="text" placeholder="Организация" class="w-full px-3 py-1 mb-2 border border-gray-300 rounded cert-organization text-sm">
+        <input type="date" placeholder="Дата" class="w-full px-3 py-1 mb-2 border border-gray-300 rounded cert-date text-sm">
+        <input type="url" placeholder="Ссылка (необязательно)" class="w-full px-3 py-1 border border-gray-300 rounded cert-link text-sm">
+    `;
+    container.appendChild(div);
+    // Добавить обработчики событий для новых полей
+    div.querySelectorAll('input').forEach(input => {
+        if (!input.hasAttribute('data-listener-added')) {
+            input.addEventListener('input', updatePreview);
+            input.addEventListener('change', updatePreview);
+            input.setAttribute('data-listener-added', 'true');
+        }
+    });
+    updatePreview();
+}
+
+function removeCertificate(button) {
+    button.closest('.certificate-item').remove();
+    updatePreview();
+}
+
+// ==================== Languages Functions ====================
+function addLanguage() {
+    const container = document.getElementById('languages-container');
+    const div = document.createElement('div');
+    div.className = 'flex gap-2 language-item';
+    div.innerHTML = `
+        <input type="text" placeholder="Язык" class="flex-1 px-4 py-2 border border-gray-300 rounded-lg lang-language">
+        <select class="px-3 py-2 border border-gray-300 rounded-lg lang-level">
+            <option value="beginner">Начальный</option>
+            <option value="intermediate">Средний</option>
+            <option value="advanced">Продвинутый</option>
+            <option value="native">Родной</option>
+        </select>
+        <button onclick="removeLanguage(this)" class="px-3 py-2 text-red-600 hover:text-red-800">×</button>
+    `;
+    container.appendChild(div);
+    // Добавить обработчики событий для новых полей
+    const languageInput = div.querySelector('.lang-language');
+    const levelSelect = div.querySelector('.lang-level');
+    if (languageInput) {
+        languageInput.addEventListener('input', updatePreview);
+        languageInput.setAttribute('data-listener-added', 'true');
+    }
+    if (levelSelect) {
+        levelSelect.addEventListener('change', updatePreview);
+        levelSelect.setAttribute('data-listener-added', 'true');
+    }
+    updatePreview();
+}
+
+function removeLanguage(button) {
+    button.parentElement.remove();
+    updatePreview();
+}
+
+// ==================== Helper Functions ====================
+function hexToRgb(hex) {
+    if (!hex || typeof hex !== 'string') {
+        return { r: 79, g: 70, b: 229 }; // Fallback color
+    }
+    const result = /^#?([a-f\d]{2})([a-f\d]{2})([a-f\d]{2})$/i.exec(hex);
+    return result ? {
+        r: parseInt(result[1], 16),
+        g: parseInt(result[2], 16),
+        b: parseInt(result[3], 16)
+    } : { r: 79, g: 70, b: 229 };
+}
+
+/**
+ * Calculate relative luminance of a color (WCAG 2.1)
+ * @param {string} hex - Hex color code
+ * @returns {number} Luminance value between 0 and 1
+ */
+function getLuminance(hex) {
+    try {
+        const rgb = hexToRgb(hex);
+        // Normalize RGB values to 0-1 range
+        const r = rgb.r / 255;
+        const g = rgb.g / 255;
+        const b = rgb.b / 255;
+        
+        // Apply gamma correction
+        const rLinear = r <= 0.03928 ? r / 12.92 : Math.pow((r + 0.055) / 1.055, 2.4);
+        const gLinear = g <= 0.03928 ? g / 12.92 : Math.pow((g + 0.055) / 1.055, 2.4);
+        const bLinear = b <= 0.03928 ? b / 12.92 : Math.pow((b + 0.055) / 1.055, 2.4);
+        
+        // Calculate relative luminance
+        return 0.2126 * rLinear + 0.7152 * gLinear + 0.0722 * bLinear;
+    } catch (error) {
+        console.error('Error calculating luminance:', error);
+        return 0.5; // Fallback to medium luminance
+    }
+}
+
+/**
+ * Get optimal text color (black or white) based on background color
+ * @param {string} bgColor - Background color in hex format
+ * @returns {string} '#000000' for light backgrounds, '#FFFFFF' for dark backgrounds
+ */
+function getOptimalTextColor(bgColor) {
+    try {
+        if (!bgColor || typeof bgColor !== 'string') {
+            return '#000000'; // Fallback to black
+        }
+        
+        const luminance = getLuminance(bgColor);
+        // If background is light (luminance > 0.5), use dark text, otherwise use light text
+        return luminance > 0.5 ? '#000000' : '#FFFFFF';
+    } catch (error) {
+        console.error('Error getting optimal text color:', error);
+        return '#000000'; // Fallback to black
+    }
+}
+
+/**
+ * Calculate contrast ratio between two colors (WCAG 2.1)
+ * @param {string} color1 - First color in hex format
+ * @param {string} color2 - Second color in hex format
+ * @returns {number} Contrast ratio (1.0 to 21.0)
+ */
+function getContrastRatio(color1, color2) {
+    try {
+        const lum1 = getLuminance(color1);
+        const lum2 = getLuminance(color2);
+        
+        const lighter = Math.max(lum1, lum2);
+        const darker = Math.min(lum1, lum2);
+        
+        return (lighter + 0.05) / (darker + 0.05);
+    } catch (error) {
+        console.error('Error calculating contrast ratio:', error);
+        return 1.0; // Fallback to minimum contrast
+    }
+}
+
+/**
+ * Validate color contrast according to WCAG 2.1 standards
+ * @returns {Object} Validation result with isValid flag and messages
+ */
+function validateColorContrast() {
+    try {
+        const primaryColor = document.getElementById('color-primary')?.value || customColors.primary || '#2563EB';
+        const accentColor = document.getElementById('color-accent')?.value || customColors.accent || '#1E40AF';
+        const bgColor = document.getElementById('color-background')?.value || customColors.background || '#ffffff';
+        
+        const issues = [];
+        let isValid = true;
+        
+        // Check normal text contrast (≥ 4.5:1)
+        const primaryContrast = getContrastRatio(primaryColor, bgColor);
+        const accentContrast = getContrastRatio(accentColor, bgColor);
+        
+        if (primaryContrast < 4.5) {
+            issues.push(`Primary color contrast (${primaryContrast.toFixed(2)}:1) is below WCAG AA standard (4.5:1) for normal text`);
+            isValid = false;
+        }
+        
+        if (accentContrast < 4.5) {
+            issues.push(`Accent color contrast (${accentContrast.toFixed(2)}:1) is below WCAG AA standard (4.5:1) for normal text`);
+            isValid = false;
+        }
+        
+        // Check UI elements contrast (≥ 3:1)
+        if (primaryContrast < 3.0) {
+            issues.push(`Primary color contrast (${primaryContrast.toFixed(2)}:1) is below WCAG AA standard (3:1) for UI elements`);
+            isValid = false;
+        }
+        
+        if (accentContrast < 3.0) {
+            issues.push(`Accent color contrast (${accentContrast.toFixed(2)}:1) is below WCAG AA standard (3:1) for UI elements`);
+            isValid = false;
+        }
+        
+        return {
+            isValid: isValid,
+            issues: issues,
+            primaryContrast: primaryContrast,
+            accentContrast: accentContrast
+        };
+    } catch (error) {
+        console.error('Error validating color contrast:', error);
+        return {
+            isValid: true, // Don't block on validation errors
+            issues: [],
+            primaryContrast: 4.5,
+            accentContrast: 4.5
+        };
+    }
+}
+
+/**
+ * Apply a predefined color preset
+ * @param {string} presetName - Name of the preset ('blue-professional', 'purple-creative', 'dark-minimal', 'green-tech')
+ */
+function applyColorPreset(presetName) {
+    try {
+        const presets = {
+            'blue-professional': {
+                primary: '#2563EB',
+                accent: '#1E40AF',
+                background: '#ffffff',
+                background2: '#f3f4f6'
+            },
+            'purple-creative': {
+                primary: '#7C3AED',
+                accent: '#5B21B6',
+                background: '#ffffff',
+                background2: '#f3f4f6'
+            },
+            'dark-minimal': {
+                primary: '#E5E7EB',
+                accent: '#60A5FA',
+                background: '#1F2937',
+                background2: '#111827'
+            },
+            'green-tech': {
+                primary: '#16A34A',
+                accent: '#15803D',
+                background: '#ffffff',
+                background2: '#f3f4f6'
+            }
+        };
+        
+        let preset = presets[presetName];
+        if (!preset) {
+            console.warn(`Preset "${presetName}" not found. Using default.`);
+            preset = presets['blue-professional'];
+        }
+        
+        // Update customColors object
+        customColors.primary = preset.primary;
+        customColors.accent = preset.accent;
+        customColors.background = preset.background;
+        customColors.background2 = preset.background2;
+        
+        // Update color picker inputs
+        const primaryInput = document.getElementById('color-primary');
+        const accentInput = document.getElementById('color-accent');
+        const backgroundInput = document.getElementById('color-background');
+        const background2Input = document.getElementById('color-background-2');
+        
+        if (primaryInput) {
+            primaryInput.value = preset.primary;
+            const primaryTextInput = document.getElementById('color-primary-text');
+            if (primaryTextInput) primaryTextInput.value = preset.primary;
+        }
+        
+        if (accentInput) {
+            accentInput.value = preset.accent;
+            const accentTextInput = document.getElementById('color-accent-text');
+            if (accentTextInput) accentTextInput.value = preset.accent;
+        }
+        
+        if (backgroundInput) {
+            backgroundInput.value = preset.background;
+            const backgroundTextInput = document.getElementById('color-background-text');
+            if (backgroundTextInput) backgroundTextInput.value = preset.background;
+            // Update background preview
+            const preview = document.getElementById('background-preview');
+            if (preview) {
+                const bgType = document.getElementById('background-type')?.value || 'solid';
+                if (bgType === 'gradient') {
+                    preview.style.background = `linear-gradient(135deg, ${preset.background} 0%, ${preset.background2} 100%)`;
+                } else {
+                    preview.style.background = preset.background;
+                }
+            }
+        }
+        
+        if (background2Input) {
+            background2Input.value = preset.background2;
+            const background2TextInput = document.getElementById('color-background-2-text');
+            if (background2TextInput) background2TextInput.value = preset.background2;
+            // Update gradient preview
+            const gradientPreview = document.getElementById('gradient-preview');
+            if (gradientPreview) {
+                const bg1 = document.getElementById('color-background')?.value || preset.background;
+                gradientPreview.style.background = `linear-gradient(135deg, ${bg1} 0%, ${preset.background2} 100%)`;
+            }
+        }
+        
+        // Update card background (auto-detect based on preset background)
+        const cardBgInput = document.getElementById('color-card-background');
+        if (cardBgInput) {
+            const isLightBg = getLuminance(preset.background) > 0.5;
+            const cardBg = isLightBg ? '#f9fafb' : '#374151';
+            cardBgInput.value = cardBg;
+            const cardBgTextInput = document.getElementById('color-card-background-text');
+            if (cardBgTextInput) cardBgTextInput.value = cardBg;
+            // Update card background preview
+            const cardPreview = document.getElementById('card-background-preview');
+            if (cardPreview) {
+                cardPreview.style.background = cardBg;
+            }
+            customColors.cardBackground = cardBg;
+        }
+        
+        // Hide custom colors section
+        const customColorsSection = document.getElementById('custom-colors-section');
+        if (customColorsSection) {
+            customColorsSection.classList.add('hidden');
+        }
+        
+        // Update active preset button
+        document.querySelectorAll('.color-preset-btn').forEach(btn => {
+            btn.classList.remove('active', 'bg-indigo-100');
+        });
+        const activeBtn = document.querySelector(`.color-preset-btn[data-preset="${presetName}"]`);
+        if (activeBtn) {
+            activeBtn.classList.add('active', 'bg-indigo-100');
+        }
+        
+        // Update preview
+        updatePreview();
+        markChanged();
+    } catch (error) {
+        console.error('Error applying color preset:', error);
+    }
+}
+
+/**
+ * Enable custom color input mode
+ */
+function enableCustomColors() {
+    try {
+        const customColorsSection = document.getElementById('custom-colors-section');
+        if (customColorsSection) {
+            customColorsSection.classList.remove('hidden');
+        }
+        
+        // Remove active state from preset buttons
+        document.querySelectorAll('.color-preset-btn').forEach(btn => {
+            btn.classList.remove('active', 'bg-indigo-100');
+        });
+        
+        // Validate contrast when custom colors are enabled
+        validateColorContrast();
+    } catch (error) {
+        console.error('Error enabling custom colors:', error);
+    }
+}
+
+function setTextAlign(align) {
+    document.querySelectorAll('.text-align-btn').forEach(btn => btn.classList.remove('active', 'bg-indigo-100'));
+    const btn = document.querySelector(`.text-align-btn[data-align="${align}"]`);
+    if (btn) {
+        btn.classList.add('active', 'bg-indigo-100');
+    }
+    updatePreview();
+}
+
+function setGridColumns(cols) {
+    document.querySelectorAll('.grid-cols-btn').forEach(btn => btn.classList.remove('active', 'bg-indigo-100'));
+    const btn = document.querySelector(`.grid-cols-btn[data-cols="${cols}"]`);
+    if (btn) {
+        btn.classList.add('active', 'bg-indigo-100');
+    }
+    updatePreview();
+}
+
+function setSpacingPreset(preset) {
+    document.querySelectorAll('.spacing-preset-btn').forEach(btn => btn.classList.remove('active', 'bg-indigo-100'));
+    const btn = document.querySelector(`.spacing-preset-btn[data-preset="${preset}"]`);
+    if (btn) {
+        btn.classList.add('active', 'bg-indigo-100');
+    }
+    
+    // Update the slider value
+    const spacingMap = {
+        'compact': 12,
+        'normal': 24,
+        'spacious': 40
+    };
+    const spacingValue = spacingMap[preset] || 24;
+    const spacingSlider = document.getElementById('block-spacing');
+    const spacingDisplay = document.getElementById('block-spacing-value');
+    if (spacingSlider) {
+        spacingSlider.value = spacingValue;
+        if (spacingDisplay) spacingDisplay.textContent = spacingValue + 'px';
+    }
+    updatePreview();
+}
+
+function setCardStyle(style) {
+    document.querySelectorAll('.card-style-btn').forEach(btn => btn.classList.remove('active', 'bg-indigo-100'));
+    const btn = document.querySelector(`.card-style-btn[data-style="${style}"]`);
+    if (btn) {
+        btn.classList.add('active', 'bg-indigo-100');
+    }
+    updatePreview();
+}
+
+function setBorderRadius(radius) {
+    document.querySelectorAll('.border-radius-btn').forEach(btn => btn.classList.remove('active', 'bg-indigo-100'));
+    const btn = document.querySelector(`.border-radius-btn[data-radius="${radius}"]`);
+    if (btn) {
+        btn.classList.add('active', 'bg-indigo-100');
+    }
+    updatePreview();
+}
+
+// Убедиться, что функции доступны глобально
+window.setTextAlign = setTextAlign;
+window.setGridColumns = setGridColumns;
+window.setSpacingPreset = setSpacingPreset;
+window.setCardStyle = setCardStyle;
+window.setBorderRadius = setBorderRadius;
+window.addSkill = addSkill;
+window.removeSkill = removeSkill;
+window.addSocialLink = addSocialLink;
+window.removeSocialLink = removeSocialLink;
+window.addExperience = addExperience;
+window.removeExperience = removeExperience;
+window.addEducation = addEducation;
+window.removeEducation = removeEducation;
+window.addCertificate = addCertificate;
+window.removeCertificate = removeCertificate;
+window.addLanguage = addLanguage;
+window.removeLanguage = removeLanguage;
+window.applyColorPreset = applyColorPreset;
+window.enableCustomColors = enableCustomColors;
+window.resetColors = resetColors;
+window.saveToLibrary = saveToLibrary;
+window.exportPortfolioHTML = exportPortfolioHTML;
+window.exportPortfolioPDF = exportPortfolioPDF;
+window.viewPortfolio = viewPortfolio;
+window.undoAction = undoAction;
+window.redoAction = redoAction;
+window.getOptimalTextColor = getOptimalTextColor;
+window.getLuminance = getLuminance;
+window.getContrastRatio = getContrastRatio;
+window.validateColorContrast = validateColorContrast;
+
+function resetColors() {
+    applyColorPreset('blue-professional');
+}
+
+// ==================== Design Settings Functions ====================
+function initDesignSettings() {
+    // Загрузить сохраненные настройки
+    if (designSettings.font_family) {
+        document.getElementById('design-font-family').value = designSettings.font_family;
+    }
+    if (designSettings.font_size) {
+        if (designSettings.font_size.h1) {
+            document.getElementById('design-h1-size').value = designSettings.font_size.h1;
+            document.getElementById('design-h1-size-value').textContent = designSettings.font_size.h1 + 'px';
+        }
+        if (designSettings.font_size.body) {
+            document.getElementById('design-body-size').value = designSettings.font_size.body;
+            document.getElementById('design-body-size-value').textContent = designSettings.font_size.body + 'px';
+        }
+    }
+    if (designSettings.padding) {
+        document.getElementById('design-padding').value = designSettings.padding;
+        document.getElementById('design-padding-value').textContent = designSettings.padding + 'px';
+    }
+    if (designSettings.border_radius) {
+        document.getElementById('design-border-radius').value = designSettings.border_radius;
+        document.getElementById('design-border-radius-value').textContent = designSettings.border_radius + 'px';
+    }
+    if (designSettings.box_shadow) {
+        document.getElementById('design-box-shadow').value = designSettings.box_shadow;
+    }
+}
+
+// ==================== Content Type Functions ====================
+function changeContentType() {
+    const contentType = document.getElementById('item-content-type').value;
+    document.querySelectorAll('.content-form').forEach(form => form.classList.add('hidden'));
+    document.getElementById(`content-form-${contentType}`).classList.remove('hidden');
+}
+
+// ==================== Item Management Functions ====================
+function initSortable() {
+    const container = document.getElementById('portfolio-items');
+    if (!container) return;
+    
+    // Удалить старый Sortable, если он существует
+    if (container.sortableInstance) {
+        container.sortableInstance.destroy();
+    }
+    
+    if (typeof Sortable !== 'undefined') {
+        container.sortableInstance = new Sortable(container, {
+            animation: 150,
+            handle: '.portfolio-item',
+            ghostClass: 'opacity-50',
+            chosenClass: 'bg-blue-50',
+            onEnd: function(evt) {
+                // Обновить порядок в массиве portfolioItems
+                const oldIndex = evt.oldIndex;
+                const newIndex = evt.newIndex;
+                if (oldIndex !== newIndex) {
+                    const movedItem = portfolioItems.splice(oldIndex, 1)[0];
+                    portfolioItems.splice(newIndex, 0, movedItem);
+                    
+                    // Обновить порядок на сервере
+                    const itemIds = portfolioItems.map(item => item.id).filter(id => id);
+                    if (itemIds.length > 0) {
+                        reorderItems(itemIds);
+                    }
+                    
+                    updatePreview();
+                }
+            }
+        });
+    }
+}
+
+function reorderItems(itemIds) {
+    itemIds.forEach((id, order) => queueItemUpdate(id, { order: order }));
+}
+
+// ==================== Сохранение работ пакетами ====================
+
+// Создание, изменение и удаление работ копятся и уходят одним запросом
+// /items/batch/ (одна транзакция на сервере) вместо запроса на каждую работу
+const ITEM_BATCH_DELAY = 500;
+const ITEM_BATCH_MAX_OPERATIONS = 500;
+const itemBatch = {
+    creates: [],          // новые работы без файлов
+    updates: new Map(),   // id -> измененные поля
+    deletes: new Set(),   // id
+    timer: null,
+    running: null
+};
+
+/**
+ * Работа без файлов, которую можно создать JSON-запросом
+ * (изображения, PDF и видеофайлы по-прежнему загружаются отдельно)
+ */
+function isJsonOnlyItem(item) {
+    if (item.imageFile || item.pdfFile || item.videoFile) return false;
+    if (item.content_type === 'image') return !item.image;
+    return ['text', 'link', 'video'].includes(item.content_type);
+}
+
+function scheduleItemBatch() {
+    if (!(editorBootstrap.portfolio_id ?? null)) return;
+    clearTimeout(itemBatch.timer);
+    itemBatch.timer = setTimeout(flushItemBatch, ITEM_BATCH_DELAY);
+}
+
+function queueItemCreate(item) {
+    if (item.id || !isJsonOnlyItem(item)) return;
+    itemBatch.creates.push(item);
+    scheduleItemBatch();
+}
+
+/**
+ * Работу заменили новым объектом (редактирование): несохраненная работа
+ * создается уже с новыми данными
+ */
+function queueItemReplace(oldItem, newItem) {
+    const index = itemBatch.creates.indexOf(oldItem);
+    if (index !== -1) {
+        itemBatch.creates.splice(index, 1);
+    }
+    if (oldItem.pendingCreate) {
+        // Запрос на создание уже отправлен - id придет в oldItem
+        oldItem.replacedBy = newItem;
+        return;
+    }
+    if (!newItem.id) queueItemCreate(newItem);
+}
+
+function queueItemUpdate(id, data) {
+    if (!id || itemBatch.deletes.has(id)) return;
+    itemBatch.updates.set(id, { ...(itemBatch.updates.get(id) || {}), ...data });
+    scheduleItemBatch();
+}
+
+function queueItemDelete(item) {
+    const index = itemBatch.creates.indexOf(item);
+    if (index !== -1) {
+        itemBatch.creates.splice(index, 1);
+        return;
+    }
+    if (item.pendingCreate) {
+        // Удалим, когда сервер вернет id
+        item.removed = true;
+        return;
+    }
+    if (!item.id) return;
+    itemBatch.updates.delete(item.id);
+    itemBatch.deletes.add(item.id);
+    scheduleItemBatch();
+}
+
+function itemCreateData(item) {
+    const order = portfolioItems.indexOf(item);
+    return {
+        title: item.title,
+        description: item.description,
+        category: item.category,
+        tags: item.tags,
+        content_type: item.content_type,
+        content_data: item.content_data,
+        order: order === -1 ? portfolioItems.length : order
+    };
+}
+
+/**
+ * Отправляет накопленные операции; пакеты идут по одному, по порядку
+ */
+async function flushItemBatch() {
+    itemBatch.timer = null;
+    if (itemBatch.running) {
+        await itemBatch.running;
+    }
+    const portfolioId = editorBootstrap.portfolio_id ?? null;
+    const entries = [
+        ...itemBatch.creates.map(item => ({ op: 'create', item: item, data: itemCreateData(item) })),
+        ...Array.from(itemBatch.updates, ([id, data]) => ({ op: 'update', id: id, data: data })),
+        ...Array.from(itemBatch.deletes, id => ({ op: 'delete', id: id }))
+    ].slice(0, ITEM_BATCH_MAX_OPERATIONS);
+    if (!portfolioId || entries.length === 0) return;
+
+    entries.forEach(entry => {
+        if (entry.op === 'create') {
+            itemBatch.creates.splice(itemBatch.creates.indexOf(entry.item), 1);
+            entry.item.pendingCreate = true;
+        } else if (entry.op === 'update') {
+            itemBatch.updates.delete(entry.id);
+        } else {
+            itemBatch.deletes.delete(entry.id);
+        }
+    });
+
+    itemBatch.running = sendItemBatch(portfolioId, entries);
+    await itemBatch.running;
+    itemBatch.running = null;
+    if (itemBatch.creates.length || itemBatch.updates.size || itemBatch.deletes.size) {
+        scheduleItemBatch();
+    }
+}
+
+async function sendItemBatch(portfolioId, entries) {
+    let data = null;
+    try {
+        const response = await fetch('/api/portfolio/api/items/batch/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({
+                portfolio: portfolioId,
+                operations: entries.map(({ op, id, data }) => (op === 'create' ? { op, data } : { op, id, data }))
+            })
+        });
+        data = await response.json();
+        if (!response.ok) {
+            console.error('Ошибка при сохранении работ:', data);
+            alert(data.error || 'Ошибка при сохранении работ');
+            data = null;
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Ошибка при сохранении работ');
+    }
+
+    entries.forEach((entry, index) => {
+        if (entry.op !== 'create') return;
+        const item = entry.item;
+        item.pendingCreate = false;
+        const created = data?.results?.[index]?.data;
+        if (!created) return;
+        item.id = created.id;
+        if (item.replacedBy) {
+            // Работу отредактировали, пока шел запрос - сохраняем новые данные
+            item.replacedBy.id = created.id;
+            const { order, ...changes } = itemCreateData(item.replacedBy);
+            queueItemUpdate(created.id, changes);
+        }
+        if (item.removed || (item.replacedBy && !portfolioItems.includes(item.replacedBy))) {
+            queueItemDelete({ id: created.id });
+        }
+    });
+    if (data) renderItems();
+}
+
+// ==================== Совместное редактирование ====================
+
+/**
+ * Подключение к каналу синхронизации портфолио
+ */
+function initPortfolioSync(fieldInputs) {
+    const portfolioId = editorBootstrap.portfolio_id ?? null;
+    if (!portfolioId || !window.PortfolioSyncClient) return;
+    
+    const applyPortfolioField = (field, value) => {
+        Object.entries(fieldInputs).forEach(([inputId, name]) => {
+            const el = document.getElementById(inputId);
+            // Не перетираем поле, которое пользователь сейчас редактирует
+            if (name === field && el && document.activeElement !== el) {
+                el.value = value ?? '';
+            }
+        });
+    };
+    
+    window.portfolioSync = new PortfolioSyncClient(portfolioId, {
+        seq: editorBootstrap.sync_seq || 0,
+        onRemoteOp: (op) => {
+            if (op.target === 'portfolio') {
+                applyPortfolioField(op.field, op.value);
+            } else if (op.target === 'item') {
+                const item = portfolioItems.find(i => i.id === op.id);
+                if (item) item[op.field] = op.value;
+                renderItems();
+            }
+            updatePreview();
+        },
+        onSnapshot: (portfolio) => {
+            Object.values(fieldInputs).forEach(field => applyPortfolioField(field, portfolio[field]));
+            (portfolio.items || []).forEach(serverItem => {
+                const item = portfolioItems.find(i => i.id === serverItem.id);
+                if (item) Object.assign(item, serverItem);
+            });
+            renderItems();
+            updatePreview();
+        },
+        onError: (errors) => {
+            console.warn('Ошибка синхронизации:', errors);
+            showSaveToast('Изменение отклонено сервером', true);
+        }
+    });
+    window.portfolioSync.connect();
+    
+    Object.entries(fieldInputs).forEach(([inputId, field]) => {
+        document.getElementById(inputId)?.addEventListener('input', function() {
+            window.portfolioSync.setField(field, this.value);
+        });
+    });
+}
+
+/**
+ * Отправить изменённые поля сохранённой работы
+ */
+function syncItemChanges(oldItem, newItem) {
+    if (!oldItem.id) return;
+    const changes = {};
+    ['title', 'description', 'category', 'tags'].forEach(field => {
+        if (JSON.stringify(oldItem[field]) !== JSON.stringify(newItem[field])) {
+            changes[field] = newItem[field];
+        }
+    });
+    // Файлы загружаются отдельно, по каналу идут только JSON-данные
+    if (['text', 'link'].includes(newItem.content_type) &&
+        JSON.stringify(oldItem.content_data) !== JSON.stringify(newItem.content_data)) {
+        changes.content_data = newItem.content_data;
+    }
+    if (!window.portfolioSync) {
+        // Без канала синхронизации - пакетом через /items/batch/
+        if (Object.keys(changes).length) queueItemUpdate(oldItem.id, changes);
+        return;
+    }
+    Object.entries(changes).forEach(([field, value]) => window.portfolioSync.setItemField(oldItem.id, field, value));
+}
+
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
+
+// ==================== Custom Blocks Functions ====================
+
+/**
+ * Open modal to add a new custom block
+ */
+function addCustomBlock() {
+    const modal = document.getElementById('custom-block-modal');
+    const title = document.getElementById('custom-block-modal-title');
+    const editId = document.getElementById('custom-block-edit-id');
+    
+    // Reset form
+    document.getElementById('custom-block-name').value = '';
+    document.getElementById('custom-block-title').value = '';
+    document.getElementById('custom-block-description').value = '';
+    document.getElementById('custom-block-image').value = '';
+    document.getElementById('custom-block-image-preview').innerHTML = '';
+    document.getElementById('custom-block-layout').value = 'image-right';
+    editId.value = '';
+    
+    // Reset alignment buttons (left is default for custom blocks)
+    document.querySelectorAll('.custom-block-align-btn').forEach(btn => {
+        btn.classList.remove('active', 'bg-indigo-100');
+    });
+    document.querySelector('.custom-block-align-btn[data-align="left"]').classList.add('active', 'bg-indigo-100');
+    
+    // Reset size buttons
+    document.querySelectorAll('.custom-block-size-btn').forEach(btn => {
+        btn.classList.remove('active', 'bg-indigo-100');
+    });
+    document.querySelector('.custom-block-size-btn[data-size="full"]').classList.add('active', 'bg-indigo-100');
+    
+    // Reset title size
+    document.getElementById('custom-block-title-size').value = 24;
+    updateCustomBlockTitleSizeValue(24);
+    document.querySelectorAll('.custom-block-title-size-btn').forEach(btn => {
+        btn.classList.remove('active', 'bg-indigo-100');
+    });
+    document.querySelector('.custom-block-title-size-btn[data-size="medium"]').classList.add('active', 'bg-indigo-100');
+    
+    // Reset image ratio (55% for reference design: 45% text / 55% image)
+    document.getElementById('custom-block-image-ratio').value = 55;
+    updateCustomBlockImageRatioValue(55);
+    
+    // Reset block padding (compact: 12px)
+    document.getElementById('custom-block-padding').value = 12;
+    updateCustomBlockPaddingValue(12);
+    
+    // Reset background color
+    resetCustomBlockBgColor();
+    
+    // Set title
+    if (title) title.textContent = 'Добавить пользовательский блок';
+    
+    // Show modal
+    if (modal) modal.classList.remove('hidden');
+}
+
+/**
+ * Close custom block modal
+ */
+function closeCustomBlockModal() {
+    const modal = document.getElementById('custom-block-modal');
+    if (modal) modal.classList.add('hidden');
+}
+
+/**
+ * Set text alignment for custom block
+ */
+function setCustomBlockAlign(align) {
+    document.querySelectorAll('.custom-block-align-btn').forEach(btn => {
+        btn.classList.remove('active', 'bg-indigo-100');
+    });
+    const btn = document.querySelector(`.custom-block-align-btn[data-align="${align}"]`);
+    if (btn) btn.classList.add('active', 'bg-indigo-100');
+}
+
+/**
+ * Set block size
+ */
+function setCustomBlockSize(size) {
+    document.querySelectorAll('.custom-block-size-btn').forEach(btn => {
+        btn.classList.remove('active', 'bg-indigo-100');
+    });
+    const btn = document.querySelector(`.custom-block-size-btn[data-size="${size}"]`);
+    if (btn) btn.classList.add('active', 'bg-indigo-100');
+}
+
+/**
+ * Set custom block title size (preset)
+ */
+function setCustomBlockTitleSize(size) {
+    document.querySelectorAll('.custom-block-title-size-btn').forEach(btn => {
+        btn.classList.remove('active', 'bg-indigo-100');
+    });
+    const btn = document.querySelector(`.custom-block-title-size-btn[data-size="${size}"]`);
+    if (btn) btn.classList.add('active', 'bg-indigo-100');
+    
+    const sizeMap = {
+        'small': 18,
+        'medium': 24,
+        'large': 32,
+        'xlarge': 40
+    };
+    const value = sizeMap[size] || 24;
+    const slider = document.getElementById('custom-block-title-size');
+    if (slider) {
+        slider.value = value;
+        updateCustomBlockTitleSizeValue(value);
+    }
+}
+
+/**
+ * Update title size value display
+ */
+function updateCustomBlockTitleSizeValue(value) {
+    const display = document.getElementById('custom-block-title-size-value');
+    if (display) display.textContent = `(${value}px)`;
+    // Update preview if editing
+    const editId = document.getElementById('custom-block-edit-id')?.value;
+    if (editId) {
+        const block = window.customBlocks.find(b => b.id === editId);
+        if (block) {
+            block.titleFontSize = parseInt(value);
+            updatePreview();
+        }
+    }
+}
+
+/**
+ * Update image ratio value display
+ */
+function updateCustomBlockImageRatioValue(value) {
+    const display = document.getElementById('custom-block-image-ratio-value');
+    if (display) display.textContent = `(${value}%)`;
+    // Update preview if editing
+    const editId = document.getElementById('custom-block-edit-id')?.value;
+    if (editId) {
+        const block = window.customBlocks.find(b => b.id === editId);
+        if (block) {
+            block.imageSizeRatio = parseInt(value);
+            updatePreview();
+        }
+    }
+}
+
+/**
+ * Update block padding value display
+ */
+function updateCustomBlockPaddingValue(value) {
+    const display = document.getElementById('custom-block-padding-value');
+    if (display) display.textContent = `(${value}px)`;
+    // Update preview if editing
+    const editId = document.getElementById('custom-block-edit-id')?.value;
+    if (editId) {
+        const block = window.customBlocks.find(b => b.id === editId);
+        if (block) {
+            block.blockPadding = parseInt(value);
+            updatePreview();
+        }
+    }
+}
+
+/**
+ * Save custom block (add or update)
+ */
+function saveCustomBlock() {
+    const name = document.getElementById('custom-block-name')?.value?.trim();
+    const title = document.getElementById('custom-block-title')?.value?.trim();
+    const description = document.getElementById('custom-block-description')?.value?.trim();
+    const imageInput = document.getElementById('custom-block-image');
+    // Fixed layout: always image-right (text left, image right) to match reference design
+    const layout = 'image-right';
+    const alignment = document.querySelector('.custom-block-align-btn.active')?.dataset.align || 'left';
+    const size = document.querySelector('.custom-block-size-btn.active')?.dataset.size || 'full';
+    const titleSize = parseInt(document.getElementById('custom-block-title-size')?.value) || 24;
+    const imageRatio = parseInt(document.getElementById('custom-block-image-ratio')?.value) || 55;
+    const blockPadding = parseInt(document.getElementById('custom-block-padding')?.value) || 16;
+    const blockBgColor = document.getElementById('custom-block-bg-color')?.value || '';
+    const editId = document.getElementById('custom-block-edit-id')?.value;
+    
+    // Validation
+    if (!name || !title) {
+        alert('Пожалуйста, заполните название блока и заголовок');
+        return;
+    }
+    
+    // Get image (if uploaded)
+    let imageSrc = '';
+    if (imageInput?.files?.length > 0) {
+        const file = imageInput.files[0];
+        const reader = new FileReader();
+        reader.onload = function(e) {
+            imageSrc = e.target.result;
+            finishSaveBlock(name, title, description, imageSrc, layout, alignment, size, titleSize, imageRatio, blockPadding, blockBgColor, editId);
+        };
+        reader.readAsDataURL(file);
+    } else {
+        // Check if there's an existing image preview
+        const preview = document.getElementById('custom-block-image-preview');
+        const existingImg = preview?.querySelector('img');
+        if (existingImg) {
+            imageSrc = existingImg.src;
+        }
+        finishSaveBlock(name, title, description, imageSrc, layout, alignment, size, titleSize, imageRatio, blockPadding, blockBgColor, editId);
+    }
+}
+
+/**
+ * Finish saving custom block
+ */
+function finishSaveBlock(name, title, description, imageSrc, layout, alignment, size, titleSize, imageRatio, blockPadding, blockBgColor, editId) {
+    // Ensure window.customBlocks exists
+    if (!window.customBlocks) {
+        window.customBlocks = [];
+    }
+    
+    const block = {
+        id: editId || 'block_' + Date.now(),
+        name: name,
+        title: title,
+        description: description,
+        image: imageSrc,
+        layout: layout,
+        alignment: alignment,
+        size: size,
+        titleFontSize: titleSize,
+        imageSizeRatio: imageRatio,
+        blockPadding: blockPadding,
+        backgroundColor: blockBgColor || null
+    };
+    
+    // Update or add block
+    if (editId) {
+        const index = window.customBlocks.findIndex(b => b.id === editId);
+        if (index !== -1) {
+            window.customBlocks[index] = block;
+        } else {
+            window.customBlocks.push(block);
+        }
+    } else {
+        window.customBlocks.push(block);
+    }
+    
+    // Update global array (sync with local variable)
+    customBlocks = window.customBlocks;
+    
+    // Render blocks list
+    renderCustomBlocks();
+    
+    // Update preview
+    updatePreview();
+    
+    // Mark as changed
+    if (window.portfolioService) {
+        window.portfolioService.markUnsaved();
+    }
+    
+    // Close modal
+    closeCustomBlockModal();
+}
+
+/**
+ * Render custom blocks list in editor
+ */
+function renderCustomBlocks() {
+    const container = document.getElementById('custom-blocks-list');
+    if (!container) return;
+    
+    container.innerHTML = '';
+    
+    if (!window.customBlocks || window.customBlocks.length === 0) {
+        container.innerHTML = '<p class="text-xs text-gray-400 text-center py-2">Нет пользовательских блоков</p>';
+        return;
+    }
+    
+    window.customBlocks.forEach((block, index) => {
+        const div = document.createElement('div');
+        div.className = 'flex items-center justify-between p-2 bg-gray-50 rounded border border-gray-200';
+        div.innerHTML = `
+            <div class="flex-1 min-w-0">
+                <p class="text-xs font-medium text-gray-900 truncate">${block.name || block.title || 'Блок ' + (index + 1)}</p>
+                <p class="text-xs text-gray-500 truncate">${block.title || ''}</p>
+            </div>
+            <div class="flex items-center gap-1 ml-2">
+                <button onclick="editCustomBlock('${block.id}')" class="px-2 py-1 text-xs text-indigo-600 hover:text-indigo-800 hover:bg-indigo-50 rounded" title="Редактировать">
+                    ✏️
+                </button>
+                <button onclick="deleteCustomBlock('${block.id}')" class="px-2 py-1 text-xs text-red-600 hover:text-red-800 hover:bg-red-50 rounded" title="Удалить">
+                    🗑️
+                </button>
+            </div>
+        `;
+        container.appendChild(div);
+    });
+    
+    // Initialize sortable for custom blocks
+    if (typeof Sortable !== 'undefined') {
+        new Sortable(container, {
+            animation: 150,
+            handle: '.flex-1',
+            onEnd: function(evt) {
+                // Reorder blocks
+                const item = window.customBlocks.splice(evt.oldIndex, 1)[0];
+                window.customBlocks.splice(evt.newIndex, 0, item);
+                customBlocks = window.customBlocks;
+                updatePreview();
+                if (window.portfolioService) {
+                    window.portfolioService.markUnsaved();
+                }
+            }
+        });
+    }
+}
+
+/**
+ * Edit custom block
+ */
+function editCustomBlock(blockId) {
+    const block = window.customBlocks.find(b => b.id === blockId);
+    if (!block) return;
+    
+    const modal = document.getElementById('custom-block-modal');
+    const title = document.getElementById('custom-block-modal-title');
+    const editId = document.getElementById('custom-block-edit-id');
+    
+    // Fill form
+    document.getElementById('custom-block-name').value = block.name || '';
+    document.getElementById('custom-block-title').value = block.title || '';
+    document.getElementById('custom-block-description').value = block.description || '';
+    // Always use image-right layout (text left, image right) to match reference design
+    document.getElementById('custom-block-layout').value = 'image-right';
+    editId.value = block.id;
+    
+    // Set image preview
+    const preview = document.getElementById('custom-block-image-preview');
+    if (block.image && preview) {
+        preview.innerHTML = `<img src="${block.image}" alt="Preview" class="max-w-full h-32 object-cover rounded border border-gray-300">`;
+    } else if (preview) {
+        preview.innerHTML = '';
+    }
+    
+    // Set alignment (left is default for custom blocks)
+    document.querySelectorAll('.custom-block-align-btn').forEach(btn => {
+        btn.classList.remove('active', 'bg-indigo-100');
+    });
+    const alignBtn = document.querySelector(`.custom-block-align-btn[data-align="${block.alignment || 'left'}"]`);
+    if (alignBtn) alignBtn.classList.add('active', 'bg-indigo-100');
+    
+    // Set size
+    document.querySelectorAll('.custom-block-size-btn').forEach(btn => {
+        btn.classList.remove('active', 'bg-indigo-100');
+    });
+    const sizeBtn = document.querySelector(`.custom-block-size-btn[data-size="${block.size || 'full'}"]`);
+    if (sizeBtn) sizeBtn.classList.add('active', 'bg-indigo-100');
+    
+    // Set title size
+    const titleSize = block.titleFontSize || 24;
+    document.getElementById('custom-block-title-size').value = titleSize;
+    updateCustomBlockTitleSizeValue(titleSize);
+    document.querySelectorAll('.custom-block-title-size-btn').forEach(btn => {
+        btn.classList.remove('active', 'bg-indigo-100');
+    });
+    const titleSizePreset = titleSize <= 20 ? 'small' : titleSize <= 28 ? 'medium' : titleSize <= 36 ? 'large' : 'xlarge';
+    const titleSizeBtn = document.querySelector(`.custom-block-title-size-btn[data-size="${titleSizePreset}"]`);
+    if (titleSizeBtn) titleSizeBtn.classList.add('active', 'bg-indigo-100');
+    
+    // Set image ratio
+    const imageRatio = block.imageSizeRatio || 55;
+    document.getElementById('custom-block-image-ratio').value = imageRatio;
+    updateCustomBlockImageRatioValue(imageRatio);
+    
+    // Set block padding
+    const blockPadding = block.blockPadding || 12;
+    document.getElementById('custom-block-padding').value = blockPadding;
+    updateCustomBlockPaddingValue(blockPadding);
+    
+    // Set background color
+    const bgColor = block.backgroundColor || '#f9fafb';
+    document.getElementById('custom-block-bg-color').value = bgColor;
+    document.getElementById('custom-block-bg-color-text').value = bgColor;
+    updateCustomBlockBgColorPreview();
+    
+    // Set title
+    if (title) title.textContent = 'Редактировать пользовательский блок';
+    
+    // Show modal
+    if (modal) modal.classList.remove('hidden');
+}
+
+/**
+ * Update custom block background color preview
+ */
+function updateCustomBlockBgColorPreview() {
+    const colorInput = document.getElementById('custom-block-bg-color');
+    const preview = document.getElementById('custom-block-bg-color-preview');
+    if (colorInput && preview) {
+        preview.style.background = colorInput.value;
+    }
+}
+
+/**
+ * Update color picker from text input
+ */
+function updateCustomBlockBgColorFromText() {
+    const textInput = document.getElementById('custom-block-bg-color-text');
+    const colorInput = document.getElementById('custom-block-bg-color');
+    if (textInput && colorInput) {
+        const color = textInput.value.trim();
+        if (/^#[0-9A-Fa-f]{6}$/.test(color)) {
+            colorInput.value = color;
+            updateCustomBlockBgColorPreview();
+        }
+    }
+}
+
+/**
+ * Reset custom block background color to default
+ */
+function resetCustomBlockBgColor() {
+    const defaultColor = '#f9fafb';
+    document.getElementById('custom-block-bg-color').value = defaultColor;
+    document.getElementById('custom-block-bg-color-text').value = defaultColor;
+    updateCustomBlockBgColorPreview();
+    updatePreview();
+}
+
+/**
+ * Delete custom block
+ */
+function deleteCustomBlock(blockId) {
+    if (!confirm('Вы уверены, что хотите удалить этот блок?')) return;
+    
+    window.customBlocks = window.customBlocks.filter(b => b.id !== blockId);
+    customBlocks = window.customBlocks;
+    
+    renderCustomBlocks();
+    updatePreview();
+    
+    if (window.portfolioService) {
+        window.portfolioService.markUnsaved();
+    }
+}
+
+// Make renderCustomBlocks globally available
+window.renderCustomBlocks = renderCustomBlocks;
+
+/**
+ * Download font files from Google Fonts
+ */
+async function downloadFont() {
+    const fontFamily = document.getElementById('text-font-family')?.value;
+    if (!fontFamily) {
+        alert('Пожалуйста, выберите шрифт');
+        return;
+    }
+    
+    // Fonts that are not from Google Fonts (system fonts)
+    const systemFonts = ['Inter']; // Inter is often a system font
+    
+    if (systemFonts.includes(fontFamily)) {
+        alert(`Шрифт "${fontFamily}" является системным и не требует скачивания. Он уже установлен в вашей системе.`);
+        return;
+    }
+    
+    try {
+        // Open Google Fonts page for the selected font
+        const fontUrl = `https://fonts.google.com/specimen/${fontFamily.replace(/\s+/g, '+')}`;
+        window.open(fontUrl, '_blank');
+        
+        // Also show instructions
+        setTimeout(() => {
+            if (confirm(`Шрифт "${fontFamily}" открыт на Google Fonts.\n\nДля скачивания:\n1. На странице Google Fonts нажмите кнопку "Download family"\n2. Или используйте кнопку "Get embed code" для веб-использования\n\nОткрыть также Google Fonts Helper для прямого скачивания?`)) {
+                const helperUrl = `https://google-webfonts-helper.herokuapp.com/fonts/${fontFamily.toLowerCase().replace(/\s+/g, '-')}`;
+                window.open(helperUrl, '_blank');
+            }
+        }, 500);
+        
+    } catch (error) {
+        console.error('Error downloading font:', error);
+        alert('Ошибка при открытии страницы шрифта. Попробуйте найти шрифт вручную на fonts.google.com');
+    }
+}
+
+// Make downloadFont globally available
+window.downloadFont = downloadFont;
+
+// Initialize custom blocks on page load
+document.addEventListener('DOMContentLoaded', function() {
+    // Handle image preview in modal
+    const imageInput = document.getElementById('custom-block-image');
+    if (imageInput) {
+        imageInput.addEventListener('change', function(e) {
+            const file = e.target.files[0];
+            if (file) {
+                const reader = new FileReader();
+                reader.onload = function(e) {
+                    const preview = document.getElementById('custom-block-image-preview');
+                    if (preview) {
+                        preview.innerHTML = `<img src="${e.target.result}" alt="Preview" class="max-w-full h-32 object-cover rounded border border-gray-300">`;
+                    }
+                };
+                reader.readAsDataURL(file);
+            }
+        });
+    }
+    
+    // Sync color picker and text input for background color
+    const bgColorInput = document.getElementById('custom-block-bg-color');
+    const bgColorText = document.getElementById('custom-block-bg-color-text');
+    if (bgColorInput && bgColorText) {
+        bgColorInput.addEventListener('input', function() {
+            bgColorText.value = this.value;
+            updateCustomBlockBgColorPreview();
+            updatePreview();
+        });
+        bgColorText.addEventListener('input', function() {
+            updateCustomBlockBgColorFromText();
+            updatePreview();
+        });
+    }
+});
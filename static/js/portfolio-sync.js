@@ -0,0 +1,158 @@
+/**
+ * Portfolio Sync - Real-time collaborative editing over WebSocket
+ * Sends field-level operations instead of the whole document and applies
+ * operations from other sessions in server sequence order.
+ */
+
+class PortfolioSyncClient {
+    constructor(portfolioId, options = {}) {
+        this.portfolioId = portfolioId;
+        // seq - highest server sequence seen (ops and acks of our own ops);
+        // synced - every operation up to it is already reflected in local state
+        this.seq = options.seq || 0;
+        this.synced = this.seq;
+        this.resyncing = false;
+        this.onRemoteOp = options.onRemoteOp || (() => {});
+        this.onSnapshot = options.onSnapshot || (() => {});
+        this.onError = options.onError || ((errors) => console.warn('Sync error:', errors));
+        // JWT clients: function returning an access token (sent in the first message, not in the URL)
+        this.getToken = options.getToken || null;
+        this.debounceDelay = options.debounceDelay || 300;
+        this.socket = null;
+        this.session = null;
+        this.connected = false;
+        this.pending = new Map(); // key -> op waiting to be sent (debounced or offline)
+        this.timers = new Map();
+        this.opCounter = 0;
+        this.reconnectDelay = 1000;
+        this.closed = false;
+    }
+
+    /**
+     * Open the WebSocket channel for this portfolio
+     */
+    connect() {
+        if (!window.WebSocket || this.closed) return;
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        this.socket = new WebSocket(`${protocol}//${window.location.host}/ws/portfolio/${this.portfolioId}/`);
+
+        this.socket.onopen = async () => {
+            if (this.getToken) this.send({ type: 'auth', token: await this.getToken() });
+        };
+        this.socket.onmessage = (event) => this.handleMessage(JSON.parse(event.data));
+        this.socket.onclose = (event) => {
+            this.connected = false;
+            // 4403 - no access; 4401 - session ended (a token client retries with a fresh token)
+            if (this.closed || event.code === 4403 || (event.code === 4401 && !this.getToken)) return;
+            setTimeout(() => this.connect(), this.reconnectDelay);
+            this.reconnectDelay = Math.min(this.reconnectDelay * 2, 30000);
+        };
+    }
+
+    close() {
+        this.closed = true;
+        if (this.socket) this.socket.close();
+    }
+
+    handleMessage(message) {
+        switch (message.type) {
+            case 'hello':
+                this.connected = true;
+                this.session = message.session;
+                this.reconnectDelay = 1000;
+                this.resyncing = false;
+                // Missed operations while offline - ask for a full state once
+                if (message.seq !== this.seq || this.synced !== this.seq) this.resync();
+                this.flush();
+                break;
+            case 'ack':
+                this.advance(message.seq);
+                break;
+            case 'op':
+                // Already applied or included in a snapshot
+                if (message.seq <= this.synced) break;
+                if (message.seq < this.seq) {
+                    // Arrived after a newer operation (e.g. the ack of our own op):
+                    // applying it would overwrite newer values, take the server state instead
+                    this.resync();
+                    break;
+                }
+                if (message.seq > this.seq + 1) {
+                    // Gap in sequence - state may be stale
+                    this.resync();
+                }
+                this.advance(message.seq);
+                this.onRemoteOp(message);
+                break;
+            case 'snapshot':
+                this.resyncing = false;
+                this.seq = this.synced = message.seq;
+                this.onSnapshot(message.portfolio);
+                break;
+            case 'resync_required':
+                this.resync();
+                break;
+            case 'error':
+                this.onError(message.errors, message.client_op_id);
+                break;
+        }
+    }
+
+    /**
+     * Record a server sequence number; synced moves only while there are no gaps
+     */
+    advance(seq) {
+        if (seq === this.seq + 1 && this.synced === this.seq) this.synced = seq;
+        this.seq = Math.max(this.seq, seq);
+    }
+
+    /**
+     * Ask for the full state (once until the snapshot arrives)
+     */
+    resync() {
+        if (this.resyncing) return;
+        this.resyncing = this.send({ type: 'resync' });
+    }
+
+    send(data) {
+        if (this.socket && this.socket.readyState === WebSocket.OPEN) {
+            this.socket.send(JSON.stringify(data));
+            return true;
+        }
+        return false;
+    }
+
+    /**
+     * Queue a field change; repeated changes of the same field are coalesced
+     */
+    setField(field, value, target = 'portfolio', id = null) {
+        const key = `${target}:${id || ''}:${field}`;
+        const op = { type: 'op', target: target, field: field, value: value };
+        if (id !== null) op.id = id;
+        this.pending.set(key, op);
+
+        if (this.timers.has(key)) clearTimeout(this.timers.get(key));
+        this.timers.set(key, setTimeout(() => {
+            this.timers.delete(key);
+            this.flushKey(key);
+        }, this.debounceDelay));
+    }
+
+    setItemField(itemId, field, value) {
+        if (!itemId) return;
+        this.setField(field, value, 'item', itemId);
+    }
+
+    flushKey(key) {
+        const op = this.pending.get(key);
+        if (!op || !this.connected) return;
+        op.client_op_id = `${this.session}-${++this.opCounter}`;
+        if (this.send(op)) this.pending.delete(key);
+    }
+
+    flush() {
+        Array.from(this.pending.keys()).forEach(key => this.flushKey(key));
+    }
+}
+
+window.PortfolioSyncClient = PortfolioSyncClient;